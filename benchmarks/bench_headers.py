@@ -0,0 +1,157 @@
+"""
+Header normalization throughput: the old per-item stdlib path (decode_header
++ parsedate_to_datetime for every value) vs connectors.header_decode
+(ASCII fast path, memoized senders, regex Date parser).
+
+The corpus mimics a real inbox: mostly ASCII subjects, some RFC 2047
+B/Q-encoded UTF-8 and ISO-8859-1 ones, senders drawn from a small pool
+and the Date shapes mail clients actually send.
+
+    python benchmarks/bench_headers.py --headers 50000
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import datetime as dt
+import random
+import time
+from email.header import decode_header
+from email.utils import parsedate_to_datetime
+
+from message_hub.connectors import header_decode
+from message_hub.connectors.header_decode import (
+    decode_address_header,
+    decode_mime_header,
+    parse_dates,
+)
+
+_DATE_SHAPES = (
+    "{wd}, {d:02d} {mon} {y} {hh:02d}:{mm:02d}:{ss:02d} +0200",
+    "{wd}, {d} {mon} {y} {hh:02d}:{mm:02d}:{ss:02d} -0700 (PDT)",
+    "{d} {mon} {y} {hh:02d}:{mm:02d}:{ss:02d} +0000",
+    "{wd}, {d} {mon} {y} {hh:02d}:{mm:02d}:{ss:02d} GMT",
+    "{wd}, {d:02d} {mon} {y} {hh:02d}:{mm:02d}:{ss:02d} +0000 (UTC)",
+    "{wd}, {d} {mon} {y} {hh:02d}:{mm:02d}:{ss:02d} CEST",  # stdlib fallback
+)
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _encoded(text: str, charset: str, b: bool) -> str:
+    raw = text.encode(charset)
+    if b:
+        return f"=?{charset}?b?{base64.b64encode(raw).decode()}?="
+    q = "".join(
+        chr(c) if 33 <= c < 127 and c not in (61, 63, 95) else "_" if c == 32 else f"={c:02X}"
+        for c in raw
+    )
+    return f"=?{charset}?q?{q}?="
+
+
+def corpus(n: int, senders: int, seed: int = 1) -> list[dict]:
+    rnd = random.Random(seed)
+    names = [
+        "Alice Martin",
+        "Jörg Müller",
+        "François Dupont",
+        "Åsa Ek",
+        "Support",
+        "GitHub",
+        "Zoë Smith",
+    ]
+    pool = []
+    for i in range(senders):
+        name = rnd.choice(names)
+        addr = f"user{i}@example{i % 13}.com"
+        if name.isascii():
+            pool.append(f"{name} <{addr}>")
+        else:
+            encoded = _encoded(name, rnd.choice(("utf-8", "iso-8859-1")), rnd.random() < 0.5)
+            pool.append(f"{encoded} <{addr}>")
+
+    items = []
+    for i in range(n):
+        r = rnd.random()
+        if r < 0.75:
+            subject = f"Re: Quarterly report #{i}"
+        elif r < 0.9:
+            subject = _encoded(f"Grüße aus Köln #{i}", "utf-8", rnd.random() < 0.5)
+        else:
+            subject = _encoded(f"Café réunion #{i}", "iso-8859-1", False)
+        shape = rnd.choices(_DATE_SHAPES, weights=(40, 20, 15, 10, 10, 5))[0]
+        date_raw = shape.format(
+            wd=rnd.choice(_WEEKDAYS),
+            d=rnd.randint(1, 28),
+            mon=rnd.choice(_MONTHS),
+            y=rnd.randint(2015, 2025),
+            hh=rnd.randint(0, 23),
+            mm=rnd.randint(0, 59),
+            ss=rnd.randint(0, 59),
+        )
+        items.append({"subject": subject, "from_addr": rnd.choice(pool), "date_raw": date_raw})
+    return items
+
+
+def _old_decode(value):
+    if not value:
+        return value
+    return "".join(
+        text.decode(enc or "utf-8", errors="replace") if isinstance(text, bytes) else text
+        for text, enc in decode_header(value)
+    )
+
+
+def _old_date(raw):
+    try:
+        d = parsedate_to_datetime(raw)
+    except Exception:
+        return None
+    return d if d.tzinfo is None else d.astimezone(dt.UTC).replace(tzinfo=None)
+
+
+def _old(items: list[dict]) -> list[tuple]:
+    return [
+        (_old_decode(it["subject"]), _old_decode(it["from_addr"]), _old_date(it["date_raw"]))
+        for it in items
+    ]
+
+
+def _new(items: list[dict]) -> list[tuple]:
+    dates = parse_dates(it["date_raw"] for it in items)
+    return [
+        (decode_mime_header(it["subject"]), decode_address_header(it["from_addr"]), d)
+        for it, d in zip(items, dates, strict=True)
+    ]
+
+
+def run(headers: int, senders: int) -> None:
+    items = corpus(headers, senders)
+    expected = None
+    for name, fn in (("stdlib", _old), ("header_decode", _new)):
+        header_decode._decode_address.cache_clear()
+        t0 = time.perf_counter()
+        out = fn(items)
+        elapsed = time.perf_counter() - t0
+        if expected is None:
+            expected = out
+        elif out != expected:
+            raise SystemExit(f"{name}: results differ from the stdlib path")
+        print(
+            f"{name:>15}: {headers} headers in {elapsed:8.3f}s  {headers / elapsed:10.0f} headers/s"
+        )
+
+    info = header_decode.cache_info()["from"]
+    print(f"{'sender cache':>15}: hits={info['hits']} misses={info['misses']}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--headers", type=int, default=50000)
+    ap.add_argument("--senders", type=int, default=500, help="distinct From values")
+    args = ap.parse_args()
+    run(args.headers, args.senders)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Header ingest throughput: per-row commit (old sync_imap_headers loop) vs the
+single-transaction bulk path in services.message_ingest.
+
+    python benchmarks/bench_ingest.py --rows 5000
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import IntegrityError
+
+from message_hub.services.imap_sync import get_or_create_account, get_or_create_folder
+from message_hub.services.message_ingest import header_rows, ingest_headers
+from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
+from message_hub.storage.models import Base, Message
+
+
+def _items(n: int, start: int = 1) -> list[dict]:
+    return [
+        {
+            "provider_msg_id": str(uid),
+            "subject": f"Quarterly report #{uid}",
+            "from_addr": f"Sender {uid % 97} <sender{uid % 97}@example.com>",
+            "date_raw": "Tue, 14 May 2024 09:12:45 +0200",
+            "message_id": f"<{uid}@example.com>",
+            "references": f"<{uid // 10 * 10}@example.com>" if uid % 10 else None,  # threads of 10
+            "is_read": uid % 3 == 0,
+        }
+        for uid in range(start, start + n)
+    ]
+
+
+def _per_row(session, account_id, folder_id, items) -> tuple[int, int]:
+    inserted = skipped = 0
+    for row in header_rows(account_id, folder_id, items):
+        session.add(Message(**row))
+        try:
+            session.commit()
+            inserted += 1
+        except IntegrityError:
+            session.rollback()
+            skipped += 1
+    return inserted, skipped
+
+
+def _bulk(session, account_id, folder_id, items) -> tuple[int, int]:
+    res = ingest_headers(session, account_id, folder_id, items)
+    session.commit()
+    return res["inserted"], res["skipped"]
+
+
+def run(rows: int, dup_ratio: float) -> None:
+    items = _items(rows)
+    dups = items[: int(rows * dup_ratio)]
+
+    for name, fn in (("per-row commit", _per_row), ("bulk upsert", _bulk)):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(DatabaseConfig(db_path=Path(tmp) / "bench.sqlite"))
+            Base.metadata.create_all(engine)
+            with make_session_factory(engine)() as session:
+                acc = get_or_create_account(session, "imap", "bench@example.com")
+                fld = get_or_create_folder(session, acc.id, "INBOX", "INBOX")
+                fn(session, acc.id, fld.id, dups)  # pre-existing rows to skip
+
+                t0 = time.perf_counter()
+                inserted, skipped = fn(session, acc.id, fld.id, items)
+                elapsed = time.perf_counter() - t0
+            engine.dispose()
+
+        print(
+            f"{name:>15}: {rows} rows in {elapsed:8.3f}s  "
+            f"{rows / elapsed:10.0f} rows/s  (inserted={inserted} skipped={skipped})"
+        )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--dup-ratio", type=float, default=0.1, help="share of rows already stored")
+    args = ap.parse_args()
+    run(args.rows, args.dup_ratio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Cost of the metrics instrumentation (message_hub.metrics), disabled and enabled.
+
+  calls: nanoseconds per inc(), per `with timer(...)` block and per call of a
+         @timed function, against an empty block / a plain call
+  sync:  a first header sync (sync_imap_headers) of --sync messages from the
+         in-process fake server with no injected latency, so the CPU share
+         of the instrumentation is as large as it gets; best of --repeat
+
+Run with MESSAGE_HUB_METRICS unset: the benchmark switches the registry
+on and off itself, and prints the enabled run's status line at the end.
+
+    python benchmarks/bench_metrics.py --sync 2000 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from message_hub.connectors.imap_pool import default_pool
+from message_hub.metrics import metrics, status_text, timed
+from message_hub.services.imap_sync import sync_imap_headers
+from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
+from message_hub.storage.migrations import ensure_schema
+from message_hub.testing.fake_imap import FakeImapServer, FakeMailbox
+
+
+def _ns_per_call(fn: Callable[[int], None], n: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        t0 = time.perf_counter_ns()
+        fn(n)
+        best = min(best, (time.perf_counter_ns() - t0) / n)
+    return best
+
+
+def _call_costs(n: int) -> dict[str, float]:
+    registry = metrics()
+
+    def plain(x):
+        return x
+
+    @timed("bench_call_seconds")
+    def decorated(x):
+        return x
+
+    def loop_empty(k):
+        for _ in range(k):
+            pass
+
+    def loop_inc(k):
+        for _ in range(k):
+            registry.inc("bench_events_total", kind="x")
+
+    def loop_timer(k):
+        for _ in range(k):
+            with registry.timer("bench_block_seconds", kind="x"):
+                pass
+
+    def loop_plain(k):
+        for i in range(k):
+            plain(i)
+
+    def loop_decorated(k):
+        for i in range(k):
+            decorated(i)
+
+    base = _ns_per_call(loop_empty, n)
+    call = _ns_per_call(loop_plain, n)
+    return {
+        "inc": _ns_per_call(loop_inc, n) - base,
+        "timer block": _ns_per_call(loop_timer, n) - base,
+        "@timed call": _ns_per_call(loop_decorated, n) - call,
+    }
+
+
+def _sync_seconds(server: FakeImapServer, sync: int, repeat: int) -> float:
+    cfg = server.config()
+    best = float("inf")
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(DatabaseConfig(db_path=Path(tmp) / "bench.sqlite"))
+            ensure_schema(engine)
+            try:
+                with make_session_factory(engine)() as session:
+                    t0 = time.perf_counter()
+                    sync_imap_headers(session, cfg, limit=sync)
+                    best = min(best, time.perf_counter() - t0)
+            finally:
+                engine.dispose()
+    return best
+
+
+def run(calls: int, messages: int, sync: int, repeat: int) -> None:
+    registry = metrics()
+    costs = {}
+    for on in (False, True):
+        registry.enable(on)
+        costs[on] = _call_costs(calls)
+    for name in costs[False]:
+        disabled, enabled = costs[False][name], costs[True][name]
+        print(f"{name:>15}: {disabled:7.0f} ns disabled  {enabled:7.0f} ns enabled")
+
+    box = FakeMailbox(size=messages)
+    with FakeImapServer(box) as server:
+        try:
+            elapsed = {}
+            for on in (False, True):
+                registry.enable(on)
+                registry.reset()
+                elapsed[on] = _sync_seconds(server, sync, repeat)
+        finally:
+            default_pool().close_all()
+    print(
+        f"{'first sync':>15}: {elapsed[False]:7.3f}s disabled  {elapsed[True]:7.3f}s enabled  "
+        f"({elapsed[True] / elapsed[False] - 1:+.1%}, {sync} msgs)"
+    )
+    print(f"{'':>15}  {status_text(registry)}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument("--calls", type=int, default=200_000, help="calls per micro-benchmark loop")
+    ap.add_argument("--messages", type=int, default=10_000, help="mailbox size")
+    ap.add_argument("--sync", type=int, default=2000, help="headers imported by each sync")
+    ap.add_argument("--repeat", type=int, default=5, help="syncs per setting (best is reported)")
+    args = ap.parse_args()
+    run(args.calls, args.messages, args.sync, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Inbox row materialization: `SELECT *` into sqlite3.Row -> dict -> SimpleNamespace
+(the old list path) vs the projected columns built straight into slotted
+MessageListRow objects (services.message_rows).
+
+    python benchmarks/bench_rows.py --rows 10000
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+from message_hub.services.message_repo import INBOX_ORDER_BY
+from message_hub.services.message_rows import LIST_COLUMNS, list_row_factory
+from message_hub.storage.db import DatabaseConfig, make_engine
+from message_hub.storage.migrations import ensure_schema
+
+
+def _populate(path: Path, rows: int) -> None:
+    engine = make_engine(DatabaseConfig(db_path=path))
+    ensure_schema(engine)
+    engine.dispose()
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "INSERT INTO accounts (id, provider, email, created_at) "
+            "VALUES (1, 'imap', 'bench@example.com', '2024')"
+        )
+        conn.execute(
+            "INSERT INTO folders (id, account_id, provider_folder_id, name) "
+            "VALUES (1, 1, 'INBOX', 'INBOX')"
+        )
+        conn.executemany(
+            "INSERT INTO messages (account_id, folder_id, provider_msg_id, from_addr, to_addrs,"
+            " subject, snippet, date_utc, is_read, created_at)"
+            " VALUES (1, 1, ?, ?, ?, ?, ?, ?, ?, '2024-05-14 09:00:00')",
+            (
+                (
+                    str(uid),
+                    f"Sender {uid % 97} <sender{uid % 97}@example.com>",
+                    "me@example.com, team@example.com",
+                    f"Quarterly report #{uid}",
+                    "Hi all, please find attached the numbers for this quarter. " * 3,
+                    f"2024-05-{1 + uid % 28:02d} {uid % 24:02d}:00:00",
+                    uid % 3 == 0,
+                )
+                for uid in range(1, rows + 1)
+            ),
+        )
+
+
+def _old(conn: sqlite3.Connection, limit: int) -> list:
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(
+        f"SELECT * FROM messages ORDER BY {INBOX_ORDER_BY} LIMIT ?", (limit,)
+    ).fetchall()
+    return [SimpleNamespace(**dict(r)) for r in rows]
+
+
+def _new(conn: sqlite3.Connection, limit: int) -> list:
+    cur = conn.cursor()
+    cur.row_factory = list_row_factory
+    return cur.execute(
+        f"SELECT {LIST_COLUMNS} FROM messages ORDER BY {INBOX_ORDER_BY} LIMIT ?", (limit,)
+    ).fetchall()
+
+
+def run(rows: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.sqlite"
+        _populate(path, rows)
+
+        for name, fn in (("SELECT * + ns", _old), ("slotted rows", _new)):
+            conn = sqlite3.connect(path)
+            fn(conn, rows)  # warm the page cache
+
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                fn(conn, rows)
+                timings.append(time.perf_counter() - t0)
+
+            tracemalloc.start()
+            result = fn(conn, rows)
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            conn.close()
+
+            print(
+                f"{name:>15}: {len(result)} rows  "
+                f"median {statistics.median(timings) * 1000:8.2f} ms  "
+                f"retained {retained / 1024:8.0f} KiB  peak {peak / 1024:8.0f} KiB  "
+                f"({retained / len(result):6.0f} B/row)"
+            )
+            del result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--repeat", type=int, default=7)
+    args = ap.parse_args()
+    run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
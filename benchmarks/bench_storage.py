@@ -0,0 +1,335 @@
+"""
+Storage and UI-refresh latency as the local store grows.
+
+Builds a synthetic store (message_hub.testing.synthetic_db) for each of
+--sizes and times each operation --repeat times on a warm page cache:
+p50/p90/p99/max latency, plus the peak Python allocation of one more call
+(tracemalloc) and the process peak RSS per store.
+
+  storage: inbox first page (get_latest_messages_sqlite), a deep keyset page,
+           unread and small-folder pages, opening a message (with and without
+           a cached body), marking read, search, reading a thread
+  ui:      an offscreen MainWindow: refresh, scrolling one page, selecting an
+           unread message (on_item_selected: mark read, bulb, reading pane),
+           _update_bulb_icons, search, painting the list
+
+--json writes the results so runs can be compared; --compare prints each
+p50 against an earlier --json file. --keep DIR reuses the generated stores
+between runs (a million messages take a few minutes to build). Operations
+that mark messages read put them back afterwards.
+
+    python benchmarks/bench_storage.py --sizes 10000 100000 --json before.json
+    python benchmarks/bench_storage.py --sizes 10000 100000 --compare before.json
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from message_hub.services.message_actions import get_message_sqlite, mark_read_sqlite
+from message_hub.services.message_repo import (
+    INBOX_ORDER_BY,
+    get_latest_messages_sqlite,
+    get_messages_page_sqlite,
+    get_thread_messages_sqlite,
+)
+from message_hub.services.search import search_messages_sqlite
+from message_hub.storage.db import DatabaseConfig
+from message_hub.storage.sqlite_conn import close_all_managers
+from message_hub.testing.synthetic_db import populate_store
+
+_app = None
+# name, timed call, untimed setup
+Op = tuple[str, Callable[[], object], Callable[[], object] | None]
+
+
+def _measure(
+    fn: Callable[[], object], setup: Callable[[], object] | None, repeat: int, warmup: int = 3
+) -> dict:
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    q = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "n": repeat,
+        "mean_ms": statistics.fmean(timings) * 1000,
+        "p50_ms": q[49] * 1000,
+        "p90_ms": q[89] * 1000,
+        "p99_ms": q[98] * 1000,
+        "max_ms": max(timings) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def _rss_mib() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+# --------------------------
+# Stores
+# --------------------------
+def _store(size: int, seed: int, directory: Path) -> tuple[Path, float | None]:
+    """Path of a store holding `size` messages, and its build time (None: reused)."""
+    path = directory / f"store-{size}-s{seed}.sqlite"
+    if path.exists():
+        with sqlite3.connect(path) as conn:
+            if conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == size:
+                return path, None
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+    return path, populate_store(path, size, seed=seed)["seconds"]
+
+
+def _sample(conn: sqlite3.Connection, sql: str, k: int, seed: int, params: tuple = ()) -> list:
+    rows = [r[0] for r in conn.execute(sql, params)]
+    return random.Random(seed).sample(rows, min(k, len(rows)))
+
+
+def _restore_unread(db: Path, ids: list[int]) -> None:
+    with sqlite3.connect(db) as conn:
+        conn.executemany("UPDATE messages SET is_read = 0 WHERE id = ?", [(i,) for i in ids])
+
+
+# --------------------------
+# Operations
+# --------------------------
+def _storage_ops(db: Path, repeat: int, seed: int) -> tuple[list[Op], Callable[[], None]]:
+    k = repeat + 10
+    with sqlite3.connect(db) as conn:
+        size = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        deep = conn.execute(
+            "SELECT COALESCE(date_utc, ''), created_at, id FROM messages"
+            f" ORDER BY {INBOX_ORDER_BY} LIMIT 1 OFFSET ?",
+            (size // 2,),
+        ).fetchone()
+        folder = conn.execute(
+            "SELECT folder_id FROM messages GROUP BY folder_id ORDER BY COUNT(*) LIMIT 1"
+        ).fetchone()[0]
+        max_id = conn.execute("SELECT MAX(id) FROM messages").fetchone()[0]
+        with_body = _sample(conn, "SELECT message_id FROM message_bodies", k, seed)
+        unread = _sample(conn, "SELECT id FROM messages WHERE is_read = 0", k, seed)
+        marks = ",".join("?" * len(with_body))
+        threads = conn.execute(
+            f"SELECT account_id, thread_id FROM messages WHERE id IN ({marks})", with_body
+        ).fetchall()
+
+    rnd = random.Random(seed)
+    any_ids = itertools.cycle(rnd.randrange(1, max_id + 1) for _ in range(k))
+    body_ids = itertools.cycle(with_body)
+    thread_keys = itertools.cycle(threads)
+    unread_ids = iter(unread)
+
+    ops: list[Op] = [
+        ("list first page", lambda: get_latest_messages_sqlite(db, 50), None),
+        ("list deep page", lambda: get_messages_page_sqlite(db, 200, after=deep), None),
+        ("list unread", lambda: get_messages_page_sqlite(db, 200, unread_only=True), None),
+        ("list small folder", lambda: get_messages_page_sqlite(db, 200, folder_id=folder), None),
+        ("open", lambda: get_message_sqlite(db, next(any_ids)), None),
+        ("open with body", lambda: get_message_sqlite(db, next(body_ids)), None),
+        ("mark read", lambda: mark_read_sqlite(db, next(unread_ids)), None),
+        ("search word", lambda: search_messages_sqlite(db, "report"), None),
+        ("search 2 words", lambda: search_messages_sqlite(db, "quarterly budget"), None),
+        ("search prefix", lambda: search_messages_sqlite(db, "smör"), None),
+        ("search sender", lambda: search_messages_sqlite(db, "Müller"), None),
+        ("thread", lambda: get_thread_messages_sqlite(db, *next(thread_keys)), None),
+    ]
+    return ops, lambda: _restore_unread(db, unread)
+
+
+def _ui_ops(db: Path, repeat: int) -> tuple[list[Op], Callable[[], None]]:
+    from PySide6.QtWidgets import QApplication
+
+    from message_hub.app.main import MainWindow
+
+    global _app
+    _app = app = QApplication.instance() or QApplication([])  # must outlive every window
+    win = MainWindow(DatabaseConfig(db_path=db))
+    win.resize(1200, 700)
+    win.show()
+    app.processEvents()
+    model = win.list_model
+    opened: list[int] = []
+
+    def unread_rows():
+        while True:
+            for row in range(model.rowCount()):
+                if not model.message_at(row).is_read:
+                    yield row
+            model.fetchMore()  # ran out of unread rows in the loaded window
+
+    rows = unread_rows()
+
+    def select():
+        row = next(rows)
+        opened.append(int(model.message_at(row).id))
+        win.on_item_selected(model.index(row))
+
+    loaded = itertools.cycle(range(min(model.page_size, model.rowCount())))
+    bulb_ids: list[int] = []
+
+    def unread_in_model():
+        mid = int(model.message_at(next(loaded)).id)
+        model.set_read(mid, False)
+        bulb_ids.append(mid)
+
+    def clear_search():
+        win.search_box.setText("")
+        win.apply_search()
+        win.search_box.setText("report")
+
+    def close():
+        win.search_box.setText("")
+        win.apply_search()
+        win.close()
+        win.deleteLater()
+        app.processEvents()
+        _restore_unread(db, opened)
+
+    ops: list[Op] = [
+        ("ui refresh", win.refresh, None),
+        ("ui paint", lambda: win.list_view.viewport().grab(), None),
+        ("ui select", select, None),
+        ("ui bulb", lambda: win._update_bulb_icons(bulb_ids[-1]), unread_in_model),
+        ("ui scroll page", model.fetchMore, None),
+        ("ui refresh (scrolled)", win.refresh, None),
+        ("ui search", win.apply_search, clear_search),
+    ]
+    return ops, close
+
+
+# --------------------------
+# Driver
+# --------------------------
+def _print(name: str, res: dict, before: dict | None) -> None:
+    line = (
+        f"{name:>22}: p50 {res['p50_ms']:8.2f}  p90 {res['p90_ms']:8.2f}  "
+        f"p99 {res['p99_ms']:8.2f}  max {res['max_ms']:8.2f} ms  peak {res['peak_kib']:8.0f} KiB"
+    )
+    if before:
+        line += f"  ({res['p50_ms'] / before['p50_ms'] - 1:+.0%} p50)" if before["p50_ms"] else ""
+    print(line)
+
+
+def run(
+    sizes: list[int],
+    repeat: int,
+    seed: int,
+    ui: bool,
+    keep: Path | None,
+    json_path: Path | None,
+    compare: Path | None,
+) -> None:
+    baseline: dict[tuple[int, str], dict] = {}
+    if compare:
+        old = json.loads(compare.read_text())
+        baseline = {(r["size"], r["op"]): r for r in old["results"]}
+
+    report: dict = {
+        "meta": {
+            "created": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "stores": [],
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = keep or Path(tmp)
+        directory.mkdir(parents=True, exist_ok=True)
+        for size in sorted(sizes):
+            db, built = _store(size, seed, directory)
+            mib = sum(p.stat().st_size for p in directory.glob(f"{db.name}*")) / (1024 * 1024)
+            print(
+                f"store: {size} messages, {mib:.0f} MiB, "
+                + (f"built in {built:.1f}s" if built else "reused")
+            )
+
+            suites = [_storage_ops(db, repeat, seed)]
+            if ui:
+                suites.append(_ui_ops(db, repeat))
+            for ops, teardown in suites:
+                try:
+                    for name, fn, setup in ops:
+                        res = _measure(fn, setup, repeat)
+                        _print(name, res, baseline.get((size, name)))
+                        report["results"].append({"size": size, "op": name, **res})
+                finally:
+                    teardown()
+
+            report["stores"].append(
+                {"size": size, "file_mib": mib, "build_s": built, "rss_peak_mib": _rss_mib()}
+            )
+            close_all_managers()
+
+    if json_path:
+        json_path.write_text(json.dumps(report, indent=2))
+        print(f"results written to {json_path}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000],
+        help="messages per store (10k .. 1M)",
+    )
+    ap.add_argument("--repeat", type=int, default=50, help="timed calls per operation")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--no-ui", action="store_true", help="skip the Qt window operations")
+    ap.add_argument("--keep", type=Path, help="directory to keep (and reuse) generated stores in")
+    ap.add_argument("--json", type=Path, help="write the results to this file")
+    ap.add_argument("--compare", type=Path, help="earlier --json results to compare against")
+    args = ap.parse_args()
+    run(args.sizes, args.repeat, args.seed, not args.no_ui, args.keep, args.json, args.compare)
+
+
+if __name__ == "__main__":
+    main()
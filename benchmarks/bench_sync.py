@@ -0,0 +1,111 @@
+"""
+End-to-end IMAP sync throughput against the in-process fake server
+(message_hub.testing.fake_imap): sync_imap_headers (first sync, incremental,
+quiet) and fetch_full_message, with injected latency and bandwidth.
+
+Reports messages/s, round trips (IMAP commands) and bytes sent by the
+server for each step, so sync regressions show up without a live account.
+
+    python benchmarks/bench_sync.py --messages 100000 --sync 2000 --latency 20
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+from message_hub.connectors.imap_connector import fetch_full_message
+from message_hub.connectors.imap_pool import default_pool
+from message_hub.services.imap_sync import sync_imap_headers
+from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
+from message_hub.storage.migrations import ensure_schema
+from message_hub.testing.fake_imap import FakeImapServer, FakeMailbox
+
+
+def _report(name: str, count: int, elapsed: float, server: FakeImapServer) -> None:
+    st = server.stats()
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{name:>15}: {count:6d} msgs in {elapsed:8.3f}s  {rate:10.0f} msgs/s  "
+        f"{st['round_trips']:5d} round trips  {st['bytes_out'] / 1024:10.1f} KiB"
+    )
+
+
+def run(
+    messages: int,
+    sync: int,
+    bodies: int,
+    new: int,
+    latency_ms: float,
+    bandwidth_mb: float,
+    batch_size: int,
+) -> None:
+    box = FakeMailbox(size=messages)
+    server = FakeImapServer(
+        box, latency=latency_ms / 1000, bandwidth=bandwidth_mb * 1024 * 1024 or None
+    )
+    with server, tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(DatabaseConfig(db_path=Path(tmp) / "bench.sqlite"))
+        ensure_schema(engine)
+        cfg = server.config()
+        try:
+            with make_session_factory(engine)() as session:
+                headers = partial(sync_imap_headers, session, cfg, batch_size=batch_size)
+
+                def incremental():
+                    box.append(new)
+                    return headers()
+
+                steps = [
+                    ("first sync", partial(headers, limit=sync)),
+                    ("incremental", incremental),
+                    ("quiet sync", headers),
+                ]
+                for name, step in steps:
+                    server.reset_stats()
+                    t0 = time.perf_counter()
+                    res = step()
+                    _report(name, res["fetched"], time.perf_counter() - t0, server)
+
+            uids = list(box.uids[-bodies:])
+            server.reset_stats()
+            t0 = time.perf_counter()
+            saved = sum(fetch_full_message(cfg, str(uid))["bytes_saved"] for uid in uids)
+            _report("full message", len(uids), time.perf_counter() - t0, server)
+            print(f"{'':>15}  (section fetch skipped {saved / 1024:.1f} KiB of attachments)")
+        finally:
+            default_pool().close_all()
+            engine.dispose()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument("--messages", type=int, default=10_000, help="mailbox size (10k .. 1M)")
+    ap.add_argument("--sync", type=int, default=2000, help="headers imported by the first sync")
+    ap.add_argument(
+        "--new", type=int, default=100, help="messages arriving before the incremental sync"
+    )
+    ap.add_argument("--bodies", type=int, default=50, help="fetch_full_message calls")
+    ap.add_argument("--latency", type=float, default=20.0, help="round-trip latency in ms")
+    ap.add_argument(
+        "--bandwidth", type=float, default=10.0, help="server -> client MB/s (0: unlimited)"
+    )
+    ap.add_argument("--batch-size", type=int, default=100)
+    args = ap.parse_args()
+    run(
+        args.messages,
+        args.sync,
+        args.bodies,
+        args.new,
+        args.latency,
+        args.bandwidth,
+        args.batch_size,
+    )
+
+
+if __name__ == "__main__":
+    main()
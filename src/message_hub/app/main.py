@@ -1,216 +1,358 @@
+import os
 import sys
-import datetime as dt
+from pathlib import Path
 
-
-from PySide6.QtCore import Qt, QTimer, QThreadPool, QSignalBlocker
+from PySide6.QtCore import Qt, QThreadPool, QTimer, Signal
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import (
     QApplication,
     QDialog,
+    QLabel,
+    QLineEdit,
     QMainWindow,
-    QListWidget,
-    QListWidgetItem,
     QMessageBox,
     QSplitter,
-    QToolBar,
     QStyle,
+    QToolBar,
 )
 
-from message_hub.connectors.imap_connector import ImapAccountConfig, fetch_full_message
+from message_hub.connectors import imap_connector
+from message_hub.connectors.imap_connector import ImapAccountConfig
+from message_hub.connectors.imap_idle import ImapIdleWatcher
+from message_hub.connectors.imap_pool import default_pool
+from message_hub.metrics import metrics, status_text
 from message_hub.services.imap_sync import sync_imap_headers
-from message_hub.services.message_repo import get_latest_messages_sqlite
 from message_hub.services.message_actions import (
-    get_message_sqlite,
+    clear_seen_pending_sqlite,
     get_account_email_sqlite,
+    get_message_sqlite,
     mark_read_sqlite,
     save_body_sqlite,
     update_provider_msg_id_sqlite,
 )
-from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
-from message_hub.storage.models import Base
+from message_hub.services.message_repo import (
+    cursor_for,
+    get_messages_by_ids_sqlite,
+    get_messages_page_sqlite,
+)
+from message_hub.services.prefetch import BodyPrefetcher
+from message_hub.services.search import search_messages_sqlite
+from message_hub.services.sync_scheduler import SyncScheduler
+from message_hub.storage.changes import DataVersionWatcher, MessageChange, change_bus
+from message_hub.storage.db import (
+    DEFAULT_APP_DIR,
+    DatabaseConfig,
+    make_engine,
+    make_session_factory,
+)
+from message_hub.storage.migrations import ensure_schema
+from message_hub.storage.sqlite_conn import close_all_managers
+from message_hub.ui.async_bridge import AsyncEngineBridge
+from message_hub.ui.body_loader import BodyLoader
 from message_hub.ui.imap_dialog import ImapAccountDialog
 from message_hub.ui.message_detail import MessageDetail
+from message_hub.ui.message_list import (
+    MessageDelegate,
+    MessageIdRole,
+    MessageListModel,
+    MessageListView,
+)
 from message_hub.ui.workers import FunctionWorker
 
-
-def _message_sort_key(m) -> tuple:
-    d = getattr(m, "date_utc", None) or getattr(m, "created_at", None)
-    return (d or dt.datetime.min, getattr(m, "id", 0))
+# Safety-net sync interval; new mail normally arrives via IDLE push.
+SAFETY_SYNC_MS = 5 * 60 * 1000
+# PRAGMA data_version probe for commits made by other processes (no table reads).
+CHANGE_CHECK_MS = 5 * 1000
+INBOX_PLACEHOLDER = "No messages yet. Click 'Add IMAP + Sync' to import."
+# Search runs once typing pauses for this long.
+SEARCH_DEBOUNCE_MS = 250
+# "threads": imaplib sessions from the pool and one IDLE thread per account;
+# "asyncio": all IMAP traffic of all accounts (sync, IDLE, bodies) on one event loop
+IMAP_ENGINE = os.getenv("MESSAGE_HUB_IMAP_ENGINE", "threads")
+# With MESSAGE_HUB_METRICS=1: timings in the status bar, and a Prometheus text file
+# (for node_exporter's textfile collector) rewritten at this interval
+METRICS_REFRESH_MS = 5 * 1000
+METRICS_FILE = Path(os.getenv("MESSAGE_HUB_METRICS_FILE", str(DEFAULT_APP_DIR / "metrics.prom")))
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # emitted from IDLE watcher threads; queued onto the GUI thread
+    mailbox_changed = Signal(str)
+    messages_changed = Signal(object)  # MessageChange, re-emitted on the GUI thread
+
+    def __init__(self, db_cfg: DatabaseConfig | None = None):
         super().__init__()
 
         # DB
-        self.cfg = DatabaseConfig()
+        self.cfg = db_cfg or DatabaseConfig()
         self.engine = make_engine(self.cfg)
-        Base.metadata.create_all(self.engine)
+        ensure_schema(self.engine)
         self.SessionFactory = make_session_factory(self.engine)
 
         # State
-        self.messages = []
         self.newest_message_id: int | None = None
+        self._reloading = False
+        self.search_text = ""  # non-empty: the list shows search results instead of the inbox
         self.active_imap_accounts: list[ImapAccountConfig] = []
         self.threadpool = QThreadPool.globalInstance()
         self.sync_in_progress = False
+        self.sync_pending = False
+        self.dirty_accounts: set[str] = set()
+        self.watchers: dict[str, ImapIdleWatcher] = {}
+        # imap_connector's functions, or the same operations on the asyncio engine
+        self.imap = imap_connector
+        self.async_bridge: AsyncEngineBridge | None = None
+        if IMAP_ENGINE == "asyncio":
+            self.async_bridge = AsyncEngineBridge(parent=self)
+            self.async_bridge.mailbox_changed.connect(self._on_mailbox_changed)
+            self.imap = self.async_bridge.connector
+        self.scheduler = SyncScheduler(
+            self.SessionFactory, max_concurrency=4, timeout=120.0, connector=self.imap
+        )
 
-        # UI
-        self.list_widget = QListWidget()
+        # Bulb icon
+        self.icon_new = QIcon.fromTheme("emblem-new")
+        if self.icon_new.isNull():
+            self.icon_new = self.style().standardIcon(
+                QStyle.StandardPixmap.SP_MessageBoxInformation
+            )
+
+        # UI: virtualized inbox (rows are painted by the delegate, loaded page by page)
+        self.list_model = MessageListModel(self._fetch_page, page_size=200, parent=self)
+        self.list_view = MessageListView(INBOX_PLACEHOLDER)
+        self.list_view.setModel(self.list_model)
+        self.list_view.setItemDelegate(MessageDelegate(self.icon_new, self.list_view))
         self.detail = MessageDetail()
+        self.body_loader = BodyLoader(self._load_body, self.threadpool, parent=self)
+        self.body_loader.loaded.connect(self._on_body_loaded)
+        self.body_loader.failed.connect(self._on_body_failed)
+        self.prefetcher = BodyPrefetcher(
+            self.cfg.db_path, self._imap_cfg_for_email, fetch=self.imap.fetch_bodies
+        )
+        self.prefetcher.start()
 
         splitter = QSplitter(Qt.Orientation.Horizontal)
-        splitter.addWidget(self.list_widget)
+        splitter.addWidget(self.list_view)
         splitter.addWidget(self.detail)
         splitter.setStretchFactor(1, 2)
         self.setCentralWidget(splitter)
 
-        # Divider lines + padding
-        self.list_widget.setStyleSheet(
-            """
-            QListWidget { outline: 0; }
-            QListWidget::item {
-                border-bottom: 1px solid rgba(0,0,0,0.18);
-                padding: 8px;
-            }
-            QListWidget::item:selected {
-                background: rgba(0, 120, 215, 0.20);
-            }
-            """
-        )
-
         tb = QToolBar("Actions")
         tb.setMovable(False)
         self.addToolBar(tb)
         tb.addAction("Add IMAP + Sync").triggered.connect(self.add_imap_and_sync)
         tb.addAction("Refresh").triggered.connect(self.refresh)
 
-        self.list_widget.currentItemChanged.connect(self.on_item_selected)
-
-        # Bulb icon
-        self.icon_new = QIcon.fromTheme("emblem-new")
-        if self.icon_new.isNull():
-            self.icon_new = self.style().standardIcon(QStyle.StandardPixmap.SP_MessageBoxInformation)
-
-        # Auto sync
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search mail")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.setMaximumWidth(320)
+        tb.addWidget(self.search_box)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.search_box.textChanged.connect(self.search_timer.start)
+        self.search_box.returnPressed.connect(self.apply_search)
+
+        self.list_view.selectionModel().currentChanged.connect(self.on_item_selected)
+
+        # Auto sync: IDLE watchers push changes; the timer is only a safety net
+        self.mailbox_changed.connect(self._on_mailbox_changed)
         self.timer = QTimer(self)
-        self.timer.setInterval(5000)
+        self.timer.setInterval(SAFETY_SYNC_MS)
         self.timer.timeout.connect(self.auto_tick)
         self.timer.start()
 
+        # Change notifications: in-process writers publish ids; other processes
+        # are caught by PRAGMA data_version on the (cheap) timer tick (sync
+        # sessions commit with commit_own(), so their bumps are skipped there)
+        self.messages_changed.connect(self._on_messages_changed)
+        self._unsubscribe_changes = change_bus().subscribe(self.messages_changed.emit)
+        self.data_version = DataVersionWatcher(self.cfg.db_path)
+        self.change_timer = QTimer(self)
+        self.change_timer.setInterval(CHANGE_CHECK_MS)
+        self.change_timer.timeout.connect(self.refresh_if_changed)
+        self.change_timer.start()
+
+        # Metrics: nothing is recorded or shown unless enabled
+        self.metrics_label: QLabel | None = None
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(METRICS_REFRESH_MS)
+        self.metrics_timer.timeout.connect(self.update_metrics)
+        if metrics().enabled:
+            self.metrics_label = QLabel()
+            self.statusBar().addPermanentWidget(self.metrics_label, 1)
+            self.metrics_timer.start()
+
         self.refresh()
 
     # --------------------------
     # Auto sync (threaded)
     # --------------------------
+    def _on_mailbox_changed(self, email: str):
+        self.dirty_accounts.add(email)
+        self.auto_tick()
+
+    def _start_watcher(self, cfg: ImapAccountConfig):
+        if self.async_bridge is not None:
+            self.async_bridge.watch(cfg)
+            return
+        old = self.watchers.pop(cfg.email, None)
+        if old is not None:
+            old.stop(timeout=0)
+        watcher = ImapIdleWatcher(cfg, lambda c, events: self.mailbox_changed.emit(c.email))
+        self.watchers[cfg.email] = watcher
+        watcher.start()
+
+    def closeEvent(self, event):
+        for timer in (self.timer, self.change_timer, self.search_timer, self.metrics_timer):
+            timer.stop()
+        if self.metrics_label is not None:
+            self.update_metrics()
+        self.body_loader.cancel()
+        self.prefetcher.shutdown()
+        self._unsubscribe_changes()
+        for watcher in self.watchers.values():
+            watcher.stop(timeout=0)
+        self.watchers.clear()
+        if self.async_bridge is not None:
+            self.async_bridge.stop()
+        self.scheduler.shutdown(wait=False)
+        super().closeEvent(event)
+
     def auto_tick(self):
         if self.sync_in_progress:
+            # coalesce: run once more when the current sync finishes
+            self.sync_pending = True
             return
 
         if not self.active_imap_accounts:
-            self.refresh_if_changed()
             return
 
+        # IDLE notifications name the accounts to sync; the safety-net timer syncs all
+        targets = [a for a in self.active_imap_accounts if a.email in self.dirty_accounts]
+        self.dirty_accounts.clear()
+
         self.sync_in_progress = True
-        worker = FunctionWorker(self._sync_all_accounts)
+        worker = FunctionWorker(self._sync_accounts, targets or list(self.active_imap_accounts))
         worker.signals.finished.connect(self._on_auto_sync_finished)
         worker.signals.error.connect(self._on_auto_sync_error)
         self.threadpool.start(worker)
 
-    def _sync_all_accounts(self):
-        total = {"fetched": 0, "inserted": 0, "skipped": 0}
-        with self.SessionFactory() as session:
-            for cfg in self.active_imap_accounts:
-                stats = sync_imap_headers(session, cfg, limit=50)
-                total["fetched"] += stats["fetched"]
-                total["inserted"] += stats["inserted"]
-                total["skipped"] += stats["skipped"]
-        return total
+    def _sync_accounts(self, accounts: list[ImapAccountConfig]):
+        return self.scheduler.run_once(accounts)
 
     def _on_auto_sync_finished(self, stats: dict):
         self.sync_in_progress = False
-        if stats.get("inserted", 0) > 0:
-            self.refresh()
-        else:
-            self.refresh_if_changed()
+        if self.sync_pending:
+            self.sync_pending = False
+            QTimer.singleShot(0, self.auto_tick)
+        # the list itself is updated through change notifications
+        self.prefetcher.prefetch_top_unread()
+        problems = stats.get("failed", []) + stats.get("timed_out", [])
+        if problems:
+            self.setWindowTitle(f"Message Hub – Sync error: {', '.join(problems)}")
+        if self.metrics_label is not None:
+            self.update_metrics()
 
     def _on_auto_sync_error(self, err_text: str):
         self.sync_in_progress = False
+        self.sync_pending = False
         self.setWindowTitle(f"Message Hub – Sync error: {err_text}")
 
+    def update_metrics(self):
+        registry = metrics()
+        self.metrics_label.setText(status_text(registry) or "Metrics: nothing recorded yet")
+        self.metrics_label.setToolTip(
+            "\n".join(
+                f"{a}: {status_text(registry, account=a)}" for a in registry.label_values("account")
+            )
+        )
+        try:
+            registry.write_prometheus(METRICS_FILE)
+        except OSError:
+            pass  # the export is best effort; the status bar still updates
+
     def refresh_if_changed(self):
-        latest = get_latest_messages_sqlite(self.cfg.db_path, limit=1)
-        newest_id = int(latest[0].id) if latest else None
-        if newest_id != self.newest_message_id:
+        # no table is read unless another connection committed something
+        if self.data_version.changed():
             self.refresh()
 
+    def _on_messages_changed(self, change: MessageChange):
+        if change.reset or self.search_text:
+            # search results are ranked, not in inbox order: just run the search again
+            self.refresh()
+            return
+        rows = get_messages_by_ids_sqlite(self.cfg.db_path, change.inserted + change.updated)
+        self._update_list(lambda: self.list_model.apply_changes(rows, deleted_ids=change.deleted))
+
     # --------------------------
-    # Refresh list (IMPORTANT: block signals to avoid recursion)
+    # Refresh list: diff against the loaded rows (no rebuild, no recursion)
     # --------------------------
-    def refresh(self):
-        # preserve selected message id
-        selected_id = None
-        cur = self.list_widget.currentItem()
-        if cur is not None:
-            selected_id = cur.data(Qt.ItemDataRole.UserRole)
+    def _fetch_page(self, after, limit: int) -> list:
+        if self.search_text:
+            # ranked results page by offset; `after` is the last loaded row
+            offset = self.list_model.rowCount() if after is not None else 0
+            return search_messages_sqlite(
+                self.cfg.db_path, self.search_text, limit=limit, offset=offset
+            )
+        cursor = cursor_for(after) if after is not None else None
+        return get_messages_page_sqlite(self.cfg.db_path, limit=limit, after=cursor)
 
-        self.messages = get_latest_messages_sqlite(self.cfg.db_path, limit=200)
-        if self.messages:
-            self.messages.sort(key=_message_sort_key, reverse=True)
-            self.newest_message_id = int(self.messages[0].id)
-        else:
-            self.newest_message_id = None
-
-        self.setWindowTitle(f"Message Hub – Inbox ({len(self.messages)} msgs) | Auto: 5s")
-
-        # ✅ This prevents currentItemChanged from firing while we rebuild the list
-        blocker = QSignalBlocker(self.list_widget)
-
-        self.list_widget.clear()
-        self.detail.clear()
+    def refresh(self):
+        self._update_list(self.list_model.reload)
 
-        if not self.messages:
-            self.list_widget.addItem(QListWidgetItem("No messages yet. Click 'Add IMAP + Sync' to import."))
+    def apply_search(self):
+        self.search_timer.stop()
+        text = self.search_box.text().strip()
+        if text == self.search_text:
             return
-
-        restore_row = None
-        for i, m in enumerate(self.messages):
-            subject = m.subject or "(no subject)"
-            from_ = m.from_addr or "unknown"
-            date = m.date_utc or ""
-            if hasattr(date, "strftime"):
-                date = date.strftime("%Y-%m-%d %H:%M")
-
-            item = QListWidgetItem(f"{subject}  |  {from_}  |  {date}")
-            item.setData(Qt.ItemDataRole.UserRole, int(m.id))
-
-            # bulb on newest unread
-            if (int(m.id) == self.newest_message_id) and (not bool(m.is_read)):
-                item.setIcon(self.icon_new)
-
-            self.list_widget.addItem(item)
-
-            if selected_id is not None and int(m.id) == int(selected_id):
-                restore_row = i
-
-        if restore_row is not None:
-            self.list_widget.setCurrentRow(restore_row)
-        else:
-            self.list_widget.setCurrentRow(0)
-
-        # blocker automatically unblocks here when it goes out of scope
-        _ = blocker  # (keeps linter calm)
+        self.search_text = text
+        self.list_view.placeholder = "No matching messages." if text else INBOX_PLACEHOLDER
+        self._update_list(self.list_model.reset)
+        self.list_view.scrollToTop()
+
+    def _update_list(self, update):
+        selection = self.list_view.selectionModel()
+        selected_id = self._current_message_id()
+
+        # If the current row gets removed Qt moves the selection; don't let that
+        # open another message.
+        self._reloading = True
+        try:
+            update()
+            if selected_id is not None and self.list_model.row_for_id(selected_id) is None:
+                selection.clearCurrentIndex()
+                self.body_loader.cancel()
+                self.detail.clear()
+        finally:
+            self._reloading = False
+        self.newest_message_id = self.list_model.newest_id
+
+        if self.search_text:
+            self.setWindowTitle(
+                f"Message Hub – Search: {self.search_text} ({self.list_model.rowCount()} shown)"
+            )
+            return
+        self.setWindowTitle(
+            f"Message Hub – Inbox ({self.list_model.rowCount()} msgs) | Auto: push"
+        )
 
     # --------------------------
-    # Selection: fetch body + mark read (NO refresh() call here!)
+    # Selection: mark read now, load the body in the background (NO refresh() call here!)
     # --------------------------
     def on_item_selected(self, current, previous=None):
-        if current is None:
+        if self._reloading:
+            return
+        if current is None or not current.isValid():
+            self.body_loader.cancel()
             self.detail.clear()
             return
 
-        message_id = current.data(Qt.ItemDataRole.UserRole)
+        message_id = current.data(MessageIdRole)
         if message_id is None:
+            self.body_loader.cancel()
             self.detail.clear()
             return
 
@@ -218,88 +360,72 @@ class MainWindow(QMainWindow):
 
         msg = get_message_sqlite(self.cfg.db_path, mid)
         if not msg:
-            self.detail.clear()
-            return
-
-        # Lazy-load body if missing
-        body_text = getattr(msg, "body_text", None)
-        body_html = getattr(msg, "body_html", None)
-        # Check if body exists: None means not fetched yet, empty string means fetched but empty
-        # We only want to fetch if it's None (never been fetched)
-        needs_fetch = body_text is None and body_html is None
-        
-        if needs_fetch:
-            cfg = self._find_imap_cfg_for_message(mid)
-            if cfg:
-                try:
-                    provider_msg_id = str(getattr(msg, "provider_msg_id", ""))
-                    if provider_msg_id:
-                        data = fetch_full_message(cfg, provider_msg_id=provider_msg_id)
-
-                        # Save body (can be None or empty string - both are valid)
-                        save_body_sqlite(
-                            self.cfg.db_path,
-                            mid,
-                            data.get("body_text"),  # Keep None if not present
-                            data.get("body_html"),  # Keep None if not present
-                        )
-
-                        # ✅ self-heal: store UID if connector resolved it
-                        uid = data.get("uid")
-                        if uid and str(uid).isdigit():
-                            update_provider_msg_id_sqlite(self.cfg.db_path, mid, str(uid))
-
-                except Exception as e:
-                    QMessageBox.warning(self, "Body fetch failed", repr(e))
-
-        # Always reload message before displaying to ensure we have latest data
-        msg = get_message_sqlite(self.cfg.db_path, mid)
-        if not msg:
+            self.body_loader.cancel()
             self.detail.clear()
             return
 
         # Mark read on open
-        if not bool(getattr(msg, "is_read", False)):
+        newly_read = not msg.is_read
+        if newly_read:
             mark_read_sqlite(self.cfg.db_path, mid)
-            msg = get_message_sqlite(self.cfg.db_path, mid) or msg
+            msg.is_read = True
             # ✅ Update bulb/icons without rebuilding list (no recursion)
-            self._update_bulb_icons()
+            self._update_bulb_icons(mid)
 
-        self.detail.set_message(msg)
+        # Lazy-load body if missing
+        needs_fetch = not msg.has_body
+        self.prefetcher.record_open(mid, cached=not needs_fetch)
+        self.prefetcher.prefetch_neighbours(self._neighbour_ids(current.row()))
+        cfg = self._find_imap_cfg_for_message(mid) if needs_fetch or newly_read else None
+        if (
+            newly_read
+            and not needs_fetch
+            and cfg is not None
+            and str(msg.provider_msg_id).isdigit()
+        ):
+            # the cached body was fetched with PEEK (prefetch), so the server still has it unread
+            self.threadpool.start(
+                FunctionWorker(self._push_seen, mid, cfg, int(msg.provider_msg_id))
+            )
+        if not needs_fetch or cfg is None or not msg.provider_msg_id:
+            self.body_loader.cancel()
+            self.detail.set_message(msg)
+            return
+
+        self.detail.set_loading(msg)
+        self.body_loader.request(mid, cfg)
+
+    def _neighbour_ids(self, row: int) -> list[int]:
+        """Ids of the rows around `row`, nearest first (below, above, ...)."""
+        ids: list[int] = []
+        for dist in range(1, self.prefetcher.policy.neighbours + 1):
+            for r in (row + dist, row - dist):
+                m = self.list_model.message_at(r)
+                if m is not None:
+                    ids.append(int(m.id))
+        return ids
+
+    def _current_message_id(self) -> int | None:
+        cur = self.list_view.selectionModel().currentIndex()
+        return cur.data(MessageIdRole) if cur.isValid() else None
+
+    def _on_body_loaded(self, message_id: int, msg):
+        if msg is not None and self._current_message_id() == message_id:
+            self.detail.set_message(msg)
+
+    def _on_body_failed(self, message_id: int, err_text: str):
+        if self._current_message_id() != message_id:
+            return
+        msg = get_message_sqlite(self.cfg.db_path, message_id)
+        if msg:
+            self.detail.set_message(msg)  # falls back to snippet / "(No body found)"
+        QMessageBox.warning(self, "Body fetch failed", err_text)
 
-    def _update_bulb_icons(self):
+    def _update_bulb_icons(self, message_id: int):
         """
-        Recompute newest unread and update list item icons without triggering selection recursion.
+        Repaint the row that was just read; the delegate derives the bulb from row state.
         """
-        # reload newest data quickly (sqlite)
-        self.messages = get_latest_messages_sqlite(self.cfg.db_path, limit=200)
-        if self.messages:
-            self.messages.sort(key=_message_sort_key, reverse=True)
-            self.newest_message_id = int(self.messages[0].id)
-        else:
-            self.newest_message_id = None
-
-        blocker = QSignalBlocker(self.list_widget)
-
-        for row in range(self.list_widget.count()):
-            item = self.list_widget.item(row)
-            mid = item.data(Qt.ItemDataRole.UserRole)
-            if mid is None:
-                item.setIcon(QIcon())
-                continue
-
-            # find message state
-            m = next((x for x in self.messages if int(x.id) == int(mid)), None)
-            if not m:
-                item.setIcon(QIcon())
-                continue
-
-            if (int(m.id) == int(self.newest_message_id)) and (not bool(m.is_read)):
-                item.setIcon(self.icon_new)
-            else:
-                item.setIcon(QIcon())
-
-        _ = blocker
+        self.list_model.set_read(message_id, True)
 
     def _find_imap_cfg_for_message(self, message_id: int) -> ImapAccountConfig | None:
         """Find IMAP config for a specific message by matching account email."""
@@ -317,6 +443,42 @@ class MainWindow(QMainWindow):
         # Fallback to last account if no match
         return self.active_imap_accounts[-1]
     
+    def _load_body(self, message_id: int, cfg: ImapAccountConfig):
+        """
+        Runs on a pool thread (see BodyLoader): fetch, cache and return the message.
+        """
+        msg = get_message_sqlite(self.cfg.db_path, message_id)
+        if msg is None or msg.has_body:
+            return msg  # gone, or cached by an earlier (dropped) load
+
+        data = self.imap.fetch_full_message(cfg, provider_msg_id=str(msg.provider_msg_id))
+        # Save body (can be None or empty string - both are valid)
+        save_body_sqlite(self.cfg.db_path, message_id, data.get("body_text"), data.get("body_html"))
+        # fetched without PEEK: the server set \Seen itself
+        clear_seen_pending_sqlite(self.cfg.db_path, [message_id])
+
+        # ✅ self-heal: store UID if connector resolved it
+        uid = data.get("uid")
+        if uid and str(uid).isdigit():
+            update_provider_msg_id_sqlite(self.cfg.db_path, message_id, str(uid))
+
+        return get_message_sqlite(self.cfg.db_path, message_id)
+
+    def _push_seen(self, message_id: int, cfg: ImapAccountConfig, uid: int) -> None:
+        """
+        Runs on a pool thread: store \\Seen for a message read here. If this
+        fails the message stays seen_pending and the next flag sync retries.
+        """
+        self.imap.mark_seen(cfg, [uid])
+        clear_seen_pending_sqlite(self.cfg.db_path, [message_id])
+
+    def _imap_cfg_for_email(self, email: str) -> ImapAccountConfig | None:
+        # called from prefetch threads too; the list is only ever replaced, never mutated in place
+        for cfg in list(self.active_imap_accounts):
+            if cfg.email == email:
+                return cfg
+        return None
+
     def _find_imap_cfg_for_current_session(self) -> ImapAccountConfig | None:
         if not self.active_imap_accounts:
             return None
@@ -342,12 +504,14 @@ class MainWindow(QMainWindow):
             mailbox=data["mailbox"],
         )
 
-        self.active_imap_accounts = [a for a in self.active_imap_accounts if a.email != cfg.email]
-        self.active_imap_accounts.append(cfg)
+        others = [a for a in self.active_imap_accounts if a.email != cfg.email]
+        self.active_imap_accounts = [*others, cfg]
+        self.scheduler.forget(cfg.email)
+        self._start_watcher(cfg)
 
         try:
             with self.SessionFactory() as session:
-                stats = sync_imap_headers(session, cfg, limit=50)
+                stats = sync_imap_headers(session, cfg, limit=50, connector=self.imap)
         except Exception as e:
             QMessageBox.critical(self, "Sync failed", repr(e))
             return
@@ -358,6 +522,7 @@ class MainWindow(QMainWindow):
             f"Fetched {stats['fetched']}\nInserted {stats['inserted']}\nSkipped {stats['skipped']}",
         )
         self.refresh()
+        self.prefetcher.prefetch_top_unread()
 
 
 def main() -> int:
@@ -365,7 +530,10 @@ def main() -> int:
     win = MainWindow()
     win.resize(1200, 700)
     win.show()
-    return app.exec()
+    code = app.exec()
+    default_pool().close_all()
+    close_all_managers()
+    return code
 
 
 if __name__ == "__main__":
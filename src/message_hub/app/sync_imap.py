@@ -3,7 +3,7 @@ import getpass
 from message_hub.connectors.imap_connector import ImapAccountConfig
 from message_hub.services.imap_sync import sync_imap_headers
 from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
-from message_hub.storage.models import Base
+from message_hub.storage.migrations import ensure_schema
 
 
 def main():
@@ -16,7 +16,7 @@ def main():
     cfg = ImapAccountConfig(host=host, email=email_, password=password, mailbox=mailbox)
 
     engine = make_engine(DatabaseConfig())
-    Base.metadata.create_all(engine)
+    ensure_schema(engine)
     SessionFactory = make_session_factory(engine)
 
     with SessionFactory() as session:
@@ -0,0 +1,756 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import email
+import re
+import ssl as ssl_mod
+import threading
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from message_hub.connectors.header_decode import decode_mime_header
+from message_hub.connectors.imap_common import (
+    BODY_PREFETCH_ITEMS,
+    DEFAULT_FETCH_BATCH_SIZE,
+    FULL_MESSAGE_ITEMS,
+    HEADER_FETCH_ITEMS,
+    STRUCTURE_FETCH_ITEMS,
+    BodyBatch,
+    count_body_bytes,
+    extract_text_and_html,
+    header_parser,
+    latest_uid_windows,
+    parse_header_item,
+    parse_status,
+    read_text_plan,
+    section,
+    section_fetch_items,
+    text_plan,
+    vanished_uids,
+)
+from message_hub.connectors.imap_connector import ImapAccountConfig
+from message_hub.connectors.imap_parse import chunked, compress_uid_set, iter_fetch_items
+from message_hub.metrics import metrics
+
+_LITERAL_RE = re.compile(rb"\{(\d+)\}\r?\n$")
+_UNTAGGED_NUM_RE = re.compile(rb"^(\d+) ([A-Z-]+)(?: (.*))?$", re.IGNORECASE | re.DOTALL)
+_UNTAGGED_RE = re.compile(rb"^([A-Z-]+)(?: (.*))?$", re.IGNORECASE | re.DOTALL)
+_IDLE_EVENTS = {"EXISTS", "EXPUNGE", "FETCH", "VANISHED"}
+
+
+class AsyncImapError(RuntimeError):
+    """NO/BAD completion or bad greeting (a RuntimeError, as in imap_connector)."""
+
+
+@dataclass
+class ImapResponse:
+    tag: bytes
+    status: str = ""
+    text: str = ""
+    untagged: list[tuple[str, Any]] = field(default_factory=list)
+
+    def data(self, kind: str) -> list:
+        """
+        Untagged data of one type, shaped like imaplib's return values, so the
+        parsers in imap_parse (iter_fetch_items etc.) work on both engines.
+        """
+        out: list = []
+        for typ, payload in self.untagged:
+            if typ != kind:
+                continue
+            if isinstance(payload, list):
+                out.extend(payload)
+            else:
+                out.append(payload)
+        return out
+
+    def ok(self) -> ImapResponse:
+        if self.status != "OK":
+            raise AsyncImapError(f"{self.status} {self.text}".strip())
+        return self
+
+
+@dataclass
+class _Pending:
+    tag: bytes
+    future: asyncio.Future
+    response: ImapResponse
+    on_untagged: Callable[[str, Any], None] | None = None
+    continuation: asyncio.Future | None = None
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _split_untagged(head: bytes) -> tuple[str, bytes]:
+    """
+    b'12 FETCH (UID 5 ...' -> ("FETCH", b'12 (UID 5 ...')   (imaplib's shape)
+    b'CAPABILITY IMAP4rev1' -> ("CAPABILITY", b'IMAP4rev1')
+    """
+    m = _UNTAGGED_NUM_RE.match(head)
+    if m:
+        rest = m.group(3) or b""
+        return m.group(2).decode().upper(), m.group(1) + (b" " + rest if rest else b"")
+    m = _UNTAGGED_RE.match(head)
+    if m:
+        return m.group(1).decode().upper(), m.group(2) or b""
+    return "", head
+
+
+class AsyncImapClient:
+    """
+    Minimal IMAP4rev1 client on asyncio streams.
+
+    Commands may be pipelined: `command()` writes immediately and awaits only
+    its own tagged completion, so `asyncio.gather` over several UID FETCHes
+    puts them all on the wire at once. Servers execute pipelined commands in
+    order, so untagged responses are attributed to the oldest command still
+    in flight. Unsolicited responses with nothing in flight go to
+    `unsolicited`.
+    """
+
+    def __init__(self, cfg: ImapAccountConfig):
+        self.cfg = cfg
+        self.capabilities: set[str] = set()
+        self.selected: str | None = None
+        self.unsolicited: asyncio.Queue = asyncio.Queue()
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._inflight: deque[_Pending] = deque()
+        self._by_tag: dict[bytes, _Pending] = {}
+        self._tag_n = 0
+        self._read_task: asyncio.Task | None = None
+        self._closed = True
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # --------------------------
+    # Connection
+    # --------------------------
+    async def connect(self) -> None:
+        port = self.cfg.port or (993 if self.cfg.ssl else 143)
+        ctx = ssl_mod.create_default_context() if self.cfg.ssl else None
+        with metrics().timer("imap_connect_seconds", account=self.cfg.email):
+            self._reader, self._writer = await asyncio.wait_for(
+                # generous line limit: UID SEARCH on a big mailbox is one long line
+                asyncio.open_connection(self.cfg.host, port, ssl=ctx, limit=32 * 1024 * 1024),
+                timeout=self.cfg.timeout,
+            )
+            greeting = await self._reader.readline()
+        if not greeting.startswith(b"* OK") and not greeting.startswith(b"* PREAUTH"):
+            raise AsyncImapError(f"unexpected greeting {greeting!r}")
+        self._closed = False
+        self._read_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+    async def open(self) -> None:
+        """connect + LOGIN + CAPABILITY (+ ENABLE QRESYNC) + SELECT"""
+        await self.connect()
+        await self.command("LOGIN", _quote(self.cfg.email), _quote(self.cfg.password))
+        await self.capability()
+        if "QRESYNC" in self.capabilities and "ENABLE" in self.capabilities:
+            await self.command("ENABLE", "QRESYNC", check=False)
+        await self.select(self.cfg.mailbox)
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        try:
+            await asyncio.wait_for(self.command("LOGOUT", check=False), timeout=5)
+        except Exception:
+            pass
+        self._shutdown(ConnectionError("client closed"))
+
+    def _shutdown(self, exc: BaseException) -> None:
+        self._closed = True
+        for p in list(self._by_tag.values()):
+            if not p.future.done():
+                p.future.set_exception(exc)
+            if p.continuation is not None and not p.continuation.done():
+                p.continuation.set_exception(exc)
+        self._by_tag.clear()
+        self._inflight.clear()
+        if self._writer is not None:
+            self._writer.close()
+        if self._read_task is not None and self._read_task is not asyncio.current_task():
+            self._read_task.cancel()
+
+    # --------------------------
+    # Wire protocol
+    # --------------------------
+    async def _read_response(self) -> tuple[bytes, list | bytes]:
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("IMAP server closed the connection")
+        segments: list = []
+        while True:
+            m = _LITERAL_RE.search(line)
+            if not m:
+                break
+            literal = await self._reader.readexactly(int(m.group(1)))
+            segments.append((line.rstrip(b"\r\n"), literal))
+            line = await self._reader.readline()
+            if not line:
+                raise ConnectionError("IMAP server closed the connection")
+        tail = line.rstrip(b"\r\n")
+        if segments:
+            segments.append(tail)
+            return segments[0][0], segments
+        return tail, tail
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                head, payload = await self._read_response()
+                if head.startswith(b"+"):
+                    self._on_continuation()
+                elif head.startswith(b"* "):
+                    self._on_untagged(payload)
+                else:
+                    self._on_tagged(head)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as exc:
+            self._shutdown(exc)
+
+    def _on_continuation(self) -> None:
+        for p in self._inflight:
+            if p.continuation is not None and not p.continuation.done():
+                p.continuation.set_result(True)
+                return
+
+    def _on_untagged(self, payload) -> None:
+        if isinstance(payload, list):
+            head = payload[0][0][2:]
+            typ, data0 = _split_untagged(head)
+            data = [(data0, payload[0][1])] + payload[1:]
+        else:
+            typ, data = _split_untagged(payload[2:])
+        if typ == "CAPABILITY":
+            self.capabilities = {c.upper() for c in data.decode(errors="ignore").split()}
+        owner = self._inflight[0] if self._inflight else None
+        if owner is None:
+            self.unsolicited.put_nowait((typ, data))
+        elif owner.on_untagged is not None:
+            owner.on_untagged(typ, data)
+        else:
+            owner.response.untagged.append((typ, data))
+
+    def _on_tagged(self, line: bytes) -> None:
+        tag, _, rest = line.partition(b" ")
+        p = self._by_tag.pop(tag, None)
+        if p is None:
+            return
+        try:
+            self._inflight.remove(p)
+        except ValueError:
+            pass
+        status, _, text = rest.partition(b" ")
+        p.response.status = status.decode(errors="ignore").upper()
+        p.response.text = text.decode(errors="ignore")
+        if not p.future.done():
+            p.future.set_result(p.response)
+
+    def _send(self, parts: tuple[str, ...], **pending_kw) -> _Pending:
+        if self._closed or self._writer is None:
+            raise ConnectionError("IMAP client is not connected")
+        self._tag_n += 1
+        tag = f"M{self._tag_n:04d}".encode()
+        p = _Pending(
+            tag=tag,
+            future=asyncio.get_running_loop().create_future(),
+            response=ImapResponse(tag=tag),
+            **pending_kw,
+        )
+        # abandoned commands (e.g. an IDLE cut short by close()) fail on shutdown;
+        # mark their exception as retrieved so asyncio does not log it
+        p.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._by_tag[tag] = p
+        self._inflight.append(p)
+        self._writer.write(tag + b" " + " ".join(parts).encode() + b"\r\n")
+        return p
+
+    async def command(self, *parts: str, check: bool = True) -> ImapResponse:
+        # the tasks run on the engine's loop thread, outside any caller's metrics scope
+        name = f"{parts[0]} {parts[1]}" if parts[0] == "UID" else parts[0]
+        with metrics().timer("imap_command_seconds", command=name, account=self.cfg.email):
+            p = self._send(parts)
+            await self._writer.drain()
+            resp = await p.future
+        return resp.ok() if check else resp
+
+    # --------------------------
+    # Commands
+    # --------------------------
+    async def capability(self) -> set[str]:
+        await self.command("CAPABILITY")
+        return self.capabilities
+
+    async def select(self, mailbox: str) -> ImapResponse:
+        resp = await self.command("SELECT", _quote(mailbox))
+        self.selected = mailbox
+        return resp
+
+    async def noop(self) -> ImapResponse:
+        return await self.command("NOOP")
+
+    async def status(self, mailbox: str, items: str = "(MESSAGES UIDNEXT UIDVALIDITY)") -> dict:
+        resp = await self.command("STATUS", _quote(mailbox), items)
+        return parse_status(b" ".join(d for d in resp.data("STATUS") if isinstance(d, bytes)))
+
+    async def uid(self, command: str, *args: str) -> ImapResponse:
+        return await self.command("UID", command.upper(), *args)
+
+    async def uid_search(self, criteria: str) -> list[int]:
+        resp = await self.uid("SEARCH", criteria)
+        return [int(u) for d in resp.data("SEARCH") for u in (d or b"").split()]
+
+    async def idle(self, timeout: float, debounce: float = 0.25) -> list[str]:
+        """
+        One IDLE round: returns the EXISTS/EXPUNGE/FETCH/VANISHED events seen
+        within `timeout` seconds (after the first event, waits `debounce`
+        more to batch bursts), then sends DONE. Raises as soon as the
+        connection drops instead of waiting out `timeout`.
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        cont = asyncio.get_running_loop().create_future()
+        p = self._send(
+            ("IDLE",), on_untagged=lambda typ, data: events.put_nowait(typ), continuation=cont
+        )
+        # None wakes the wait below when IDLE completes early: connection lost
+        # or ended by the server
+        p.future.add_done_callback(lambda f: events.put_nowait(None))
+        await self._writer.drain()
+        await asyncio.wait_for(asyncio.shield(cont), timeout=30)
+
+        seen: list[str] = []
+        wait = timeout
+        while True:
+            try:
+                typ = await asyncio.wait_for(events.get(), timeout=wait)
+            except TimeoutError:
+                break
+            if typ is None:
+                p.future.result().ok()  # raises the connection error
+                return seen
+            if typ in _IDLE_EVENTS:
+                seen.append(typ)
+                wait = debounce
+
+        self._writer.write(b"DONE\r\n")
+        await self._writer.drain()
+        (await p.future).ok()
+        while not events.empty():
+            typ = events.get_nowait()
+            if typ in _IDLE_EVENTS:
+                seen.append(typ)
+        return seen
+
+
+# --------------------------
+# Connector operations (async twins of imap_connector)
+# --------------------------
+async def fetch_headers_for_uids(
+    client: AsyncImapClient, uids: list[int], batch_size: int = DEFAULT_FETCH_BATCH_SIZE
+) -> list[dict]:
+    """All chunks are pipelined: one round-trip for the whole UID list."""
+    chunks = list(chunked(sorted(uids), batch_size))
+    responses = await asyncio.gather(
+        *(client.uid("FETCH", compress_uid_set(c), HEADER_FETCH_ITEMS) for c in chunks)
+    )
+    results: list[dict] = []
+    with metrics().timer("mime_parse_seconds", part="headers", account=client.cfg.email):
+        for resp in responses:
+            for item in iter_fetch_items(resp.data("FETCH")):
+                parsed = parse_header_item(item)
+                if parsed is not None:
+                    results.append(parsed)
+    results.sort(key=lambda r: int(r["provider_msg_id"]), reverse=True)
+    return results
+
+
+async def fetch_new_headers(
+    client: AsyncImapClient,
+    last_uid: int | None = None,
+    uidvalidity: int | None = None,
+    limit: int = 30,
+    batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+) -> dict:
+    """Same contract as imap_connector.fetch_new_headers."""
+    st = await client.status(client.cfg.mailbox)
+    server_validity = st.get("uidvalidity")
+    uidnext = st.get("uidnext")
+    full = last_uid is None or uidvalidity is None or server_validity != uidvalidity
+    result = {
+        "uidvalidity": server_validity,
+        "uidnext": uidnext,
+        "last_uid": 0 if full else last_uid,
+        "full": full,
+        "items": [],
+    }
+    if not full and uidnext is not None and uidnext <= last_uid + 1:
+        return result
+
+    if full:
+        all_uids = await _search_latest_uids(client, uidnext, limit)
+    else:
+        # "n:*" always matches the highest UID, even when it is below n.
+        all_uids = [u for u in await client.uid_search(f"UID {last_uid + 1}:*") if u > last_uid]
+    if all_uids:
+        result["last_uid"] = max(result["last_uid"], max(all_uids))
+    if uidnext:
+        result["last_uid"] = max(result["last_uid"], uidnext - 1)
+
+    if full:
+        wanted = all_uids[-limit:] if limit > 0 else []
+    else:
+        wanted = all_uids
+    result["items"] = await fetch_headers_for_uids(client, wanted, batch_size)
+    return result
+
+
+async def _search_latest_uids(
+    client: AsyncImapClient, uidnext: int | None, limit: int
+) -> list[int]:
+    """Async twin of imap_connector._search_latest_uids (no UID SEARCH ALL)."""
+    for start in latest_uid_windows(uidnext, limit):
+        uids = await client.uid_search(f"UID {start}:*")
+        if len(uids) >= limit:
+            break
+    return uids
+
+
+async def fetch_full_message(client: AsyncImapClient, provider_msg_id: str) -> dict:
+    """Same contract as imap_connector.fetch_full_message (sets \\Seen on the server)."""
+    uid = provider_msg_id if provider_msg_id and provider_msg_id.isdigit() else None
+    if uid is None:
+        found = await client.uid_search(f"(HEADER Message-ID {_quote(provider_msg_id.strip())})")
+        uid = str(found[-1]) if found else None
+    if not uid:
+        raise RuntimeError(f"Could not resolve UID for provider_msg_id={provider_msg_id!r}")
+
+    resp = await client.uid("FETCH", uid, FULL_MESSAGE_ITEMS)
+    item = next(iter_fetch_items(resp.data("FETCH")), None)
+    if item is None:
+        raise RuntimeError(f"IMAP UID fetch failed for uid={uid}")
+    plan = text_plan(item)
+
+    if plan is None:
+        # no usable BODYSTRUCTURE: take the whole message
+        resp = await client.uid("FETCH", uid, "(UID FLAGS BODY[])")
+        whole = next(iter_fetch_items(resp.data("FETCH")), None)
+        raw = whole.sections.get("BODY[]") if whole else None
+        if raw is None:
+            raise RuntimeError(f"IMAP UID fetch failed for uid={uid}")
+        with metrics().timer("mime_parse_seconds", part="body", account=client.cfg.email):
+            msg = email.message_from_bytes(raw)
+            body_text, body_html = extract_text_and_html(msg)
+        fetched, saved = len(raw), 0
+    else:
+        msg = header_parser.parsebytes(section(item, "BODY[HEADER") or b"")
+        body_text = body_html = None
+        fetched = 0
+        if plan != (None, None):
+            resp = await client.uid("FETCH", uid, section_fetch_items(plan, peek=False))
+            body = next(iter_fetch_items(resp.data("FETCH")), None)
+            if body is None:
+                raise RuntimeError(f"IMAP UID fetch (body sections) failed for uid={uid}")
+            with metrics().timer("mime_parse_seconds", part="body", account=client.cfg.email):
+                body_text, body_html = read_text_plan(body, plan)
+            fetched = sum(len(v) for v in body.sections.values())
+        saved = max(0, (item.size or 0) - fetched)
+
+    res = {
+        "uid": uid,
+        "subject": decode_mime_header(msg.get("Subject")),
+        "from_addr": decode_mime_header(msg.get("From")),
+        "date_raw": msg.get("Date"),
+        "body_text": body_text,
+        "body_html": body_html,
+        "is_read": item.is_read,
+        "bytes": fetched,
+        "bytes_saved": saved,
+    }
+    return count_body_bytes(res, account=client.cfg.email)
+
+
+async def fetch_flag_changes(
+    client: AsyncImapClient,
+    since_modseq: int | None,
+    uidvalidity: int | None,
+    known_uids: list[int] | None = None,
+    allow_scan: bool = True,
+    batch_size: int = 500,
+) -> dict:
+    """Same contract as imap_connector.fetch_flag_changes; scan chunks are pipelined."""
+    condstore = bool({"CONDSTORE", "QRESYNC"} & client.capabilities)
+    qresync = "QRESYNC" in client.capabilities
+
+    items = "(UIDVALIDITY HIGHESTMODSEQ)" if condstore else "(UIDVALIDITY)"
+    st = await client.status(client.cfg.mailbox, items)
+    result = {
+        "mode": "unchanged",
+        "uidvalidity": st.get("uidvalidity"),
+        "highestmodseq": st.get("highestmodseq"),
+        "changes": {},
+        "vanished": [],
+    }
+    if uidvalidity is not None and st.get("uidvalidity") != uidvalidity:
+        result["mode"] = "uidvalidity-changed"  # header sync will resync the folder
+        return result
+
+    highest = st.get("highestmodseq")
+    if condstore and highest is not None and since_modseq is not None:
+        if highest <= since_modseq:
+            return result
+        modifiers = f"(CHANGEDSINCE {since_modseq}{' VANISHED' if qresync else ''})"
+        resp = await client.uid("FETCH", "1:*", "(UID FLAGS)", modifiers)
+        result["mode"] = "qresync" if qresync else "condstore"
+        changed = iter_fetch_items(resp.data("FETCH"))
+        result["changes"] = {it.uid: it.is_read for it in changed if it.uid is not None}
+        if qresync:
+            result["vanished"] = vanished_uids(resp.data("VANISHED"))
+        return result
+
+    if not allow_scan:
+        result["mode"] = "skipped"
+        return result
+
+    # Fallback: FLAGS scan over the UIDs we already store.
+    result["mode"] = "scan"
+    known = sorted(known_uids or ())
+    chunks = chunked(known, batch_size)
+    responses = await asyncio.gather(
+        *(client.uid("FETCH", compress_uid_set(c), "(UID FLAGS)") for c in chunks)
+    )
+    for resp in responses:
+        for it in iter_fetch_items(resp.data("FETCH")):
+            if it.uid is not None:
+                result["changes"][it.uid] = it.is_read
+    result["vanished"] = [u for u in known if u not in result["changes"]]
+    return result
+
+
+async def mark_seen(client: AsyncImapClient, uids: list[int], batch_size: int = 500) -> None:
+    """Same contract as imap_connector.mark_seen; the STOREs are pipelined."""
+    await asyncio.gather(
+        *(
+            client.uid("STORE", compress_uid_set(c), "+FLAGS.SILENT", "(\\Seen)")
+            for c in chunked(sorted(set(uids)), batch_size)
+        )
+    )
+
+
+async def fetch_bodies(
+    client: AsyncImapClient, uids: list[int], max_size: int | None = None, batch_size: int = 20
+) -> dict:
+    """Same contract as imap_connector.fetch_bodies; each stage is one pipelined round-trip."""
+    batch = BodyBatch(max_size)
+    chunks = chunked(sorted({int(u) for u in uids}), 500)
+    for resp in await asyncio.gather(
+        *(client.uid("FETCH", compress_uid_set(c), STRUCTURE_FETCH_ITEMS) for c in chunks)
+    ):
+        for item in iter_fetch_items(resp.data("FETCH")):
+            batch.add_structure(item)
+
+    by_items, whole = batch.requests()
+    fetches = [(items, group, batch.add_sections) for items, group in by_items.items()]
+    fetches.append((BODY_PREFETCH_ITEMS, whole, batch.add_whole))
+    requests = [
+        (client.uid("FETCH", compress_uid_set(c), items), add)
+        for items, group, add in fetches
+        for c in chunked(group, batch_size)
+    ]
+    responses = await asyncio.gather(*(req for req, _ in requests))
+    with metrics().timer("mime_parse_seconds", part="body", account=client.cfg.email):
+        for resp, (_, add) in zip(responses, requests, strict=True):
+            for item in iter_fetch_items(resp.data("FETCH")):
+                add(item)
+    return count_body_bytes(batch.result(), account=client.cfg.email)
+
+
+# --------------------------
+# Engine: one event loop for many accounts
+# --------------------------
+ChangeCallback = Callable[[ImapAccountConfig, list[str]], None]
+
+
+class AsyncImapEngine:
+    """
+    Runs every account's IMAP traffic on one asyncio loop in one background
+    thread. Operations return concurrent.futures.Future, so blocking callers
+    and the Qt bridge (ui/async_bridge.py) can consume them.
+
+    One command client per account (pipelined, reconnected on demand) plus,
+    for watched accounts, one IDLE client each.
+    """
+
+    def __init__(self, idle_renew: float = 9 * 60, reconnect_max: float = 300.0):
+        self.idle_renew = idle_renew
+        self.reconnect_max = reconnect_max
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="imap-asyncio", daemon=True
+        )
+        self._clients: dict[tuple, AsyncImapClient] = {}
+        self._locks: dict[tuple, asyncio.Lock] = {}
+        self._watches: dict[tuple, asyncio.Task] = {}
+        self._started = False
+
+    @staticmethod
+    def _key(cfg: ImapAccountConfig) -> tuple:
+        return (cfg.host, cfg.ssl, cfg.email, cfg.mailbox)
+
+    def start(self) -> AsyncImapEngine:
+        if not self._started:
+            self._thread.start()
+            self._started = True
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if not self._started:
+            return
+        fut = asyncio.run_coroutine_threadsafe(self._close_all(), self._loop)
+        try:
+            fut.result(timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._started = False
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _close_all(self) -> None:
+        for task in self._watches.values():
+            task.cancel()
+        self._watches.clear()
+        await asyncio.gather(*(c.close() for c in self._clients.values()), return_exceptions=True)
+        self._clients.clear()
+
+    async def _client(self, cfg: ImapAccountConfig) -> AsyncImapClient:
+        key = self._key(cfg)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:  # one connect attempt at a time per account
+            client = self._clients.get(key)
+            if client is None or client.closed:
+                client = AsyncImapClient(cfg)
+                await client.open()
+                self._clients[key] = client
+            return client
+
+    async def _run(self, cfg: ImapAccountConfig, op: Callable[[AsyncImapClient], Awaitable]):
+        try:
+            return await op(await self._client(cfg))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self._clients.pop(self._key(cfg), None)
+            return await op(await self._client(cfg))  # one retry on a fresh session
+
+    # public, thread-safe operations (keyword arguments as in the module functions)
+    def fetch_new_headers(self, cfg: ImapAccountConfig, **kw) -> concurrent.futures.Future:
+        return self.submit(self._run(cfg, lambda c: fetch_new_headers(c, **kw)))
+
+    def fetch_flag_changes(self, cfg: ImapAccountConfig, **kw) -> concurrent.futures.Future:
+        return self.submit(self._run(cfg, lambda c: fetch_flag_changes(c, **kw)))
+
+    def mark_seen(self, cfg: ImapAccountConfig, uids: list[int], **kw) -> concurrent.futures.Future:
+        return self.submit(self._run(cfg, lambda c: mark_seen(c, uids, **kw)))
+
+    def fetch_full_message(
+        self, cfg: ImapAccountConfig, provider_msg_id: str
+    ) -> concurrent.futures.Future:
+        return self.submit(self._run(cfg, lambda c: fetch_full_message(c, provider_msg_id)))
+
+    def fetch_bodies(
+        self, cfg: ImapAccountConfig, uids: list[int], **kw
+    ) -> concurrent.futures.Future:
+        return self.submit(self._run(cfg, lambda c: fetch_bodies(c, uids, **kw)))
+
+    def watch(self, cfg: ImapAccountConfig, on_change: ChangeCallback) -> None:
+        """IDLE on a dedicated client; `on_change` runs on the engine thread."""
+        self.start()
+
+        def _start():
+            key = self._key(cfg)
+            old = self._watches.pop(key, None)
+            if old is not None:
+                old.cancel()
+            self._watches[key] = self._loop.create_task(self._watch(cfg, on_change))
+
+        self._loop.call_soon_threadsafe(_start)
+
+    async def _watch(self, cfg: ImapAccountConfig, on_change: ChangeCallback) -> None:
+        backoff = 1.0
+        first = True
+        while True:
+            client = AsyncImapClient(cfg)
+            try:
+                await client.open()
+                if not first:
+                    on_change(cfg, ["RECONNECT"])
+                first = False
+                backoff = 1.0
+                if "IDLE" not in client.capabilities:
+                    await self._poll(client, cfg, on_change)
+                while True:
+                    events = await client.idle(self.idle_renew)
+                    if events:
+                        on_change(cfg, events)
+            except asyncio.CancelledError:
+                await client.close()
+                raise
+            except Exception:
+                await client.close()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.reconnect_max)
+
+    async def _poll(
+        self, client: AsyncImapClient, cfg: ImapAccountConfig, on_change: ChangeCallback
+    ) -> None:
+        interval, last = 15.0, None
+        while True:
+            st = await client.status(cfg.mailbox)
+            if last is not None and st != last:
+                on_change(cfg, ["STATUS"])
+                interval = 15.0
+            elif last is not None:
+                interval = min(interval * 2, 300.0)
+            last = st
+            await asyncio.sleep(interval)
+
+
+class EngineConnector:
+    """
+    The imap_connector operations the services use, run on an AsyncImapEngine.
+
+    Same names, arguments and results as the module functions, so it can be
+    passed wherever a connector is taken (imap_sync, SyncScheduler,
+    BodyPrefetcher's `fetch`). Each call blocks the calling worker thread
+    until the engine's loop has done the work.
+    """
+
+    def __init__(self, engine: AsyncImapEngine):
+        self.engine = engine
+
+    def fetch_new_headers(self, cfg: ImapAccountConfig, **kw) -> dict:
+        return self.engine.fetch_new_headers(cfg, **kw).result()
+
+    def fetch_flag_changes(self, cfg: ImapAccountConfig, **kw) -> dict:
+        return self.engine.fetch_flag_changes(cfg, **kw).result()
+
+    def mark_seen(self, cfg: ImapAccountConfig, uids: list[int], **kw) -> None:
+        if uids:
+            self.engine.mark_seen(cfg, uids, **kw).result()
+
+    def fetch_full_message(self, cfg: ImapAccountConfig, provider_msg_id: str) -> dict:
+        return self.engine.fetch_full_message(cfg, provider_msg_id).result()
+
+    def fetch_bodies(self, cfg: ImapAccountConfig, uids: list[int], **kw) -> dict:
+        return self.engine.fetch_bodies(cfg, uids, **kw).result()
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import codecs
+import datetime as dt
+import re
+from collections.abc import Iterable
+from email.header import decode_header
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+# Header normalization for bulk sync. Backfills decode the same senders and
+# charsets thousands of times, and almost every Date: uses one of a few
+# RFC 5322 shapes, so:
+# - pure-ASCII values without encoded words are returned as they are,
+# - decoded From values and charset -> codec lookups sit in bounded LRU caches,
+# - dates go through one precompiled regex, with the stdlib parser as fallback.
+
+FROM_CACHE_SIZE = 4096
+CODEC_CACHE_SIZE = 64
+
+_MONTHS = {
+    m: i
+    for i, m in enumerate(
+        ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1
+    )
+}
+# UTC offsets in minutes of the RFC 5322 obsolete zone names (section 4.3);
+# any other name goes to the stdlib parser
+_ZONES = {
+    "UT": 0,
+    "UTC": 0,
+    "GMT": 0,
+    "Z": 0,
+    "EST": -300,
+    "EDT": -240,
+    "CST": -360,
+    "CDT": -300,
+    "MST": -420,
+    "MDT": -360,
+    "PST": -480,
+    "PDT": -420,
+}
+# [Day, ] DD Mon YYYY HH:MM[:SS] [+hhmm | NAME] [(comment)]
+_DATE_RE = re.compile(
+    r"\s*(?:[A-Za-z]{3},?\s*)?(\d{1,2})\s+([A-Za-z]{3})[a-z]*\s+(\d{4}|\d{2})\s+"
+    r"(\d{1,2}):(\d{2})(?::(\d{2}))?\s*(?:([+-])(\d{2})(\d{2})|([A-Za-z]{1,5}))?\s*(?:\([^)]*\))?\s*$"
+)
+
+
+@lru_cache(maxsize=CODEC_CACHE_SIZE)
+def _codec(charset: str | None) -> str:
+    """Canonical codec name for a MIME charset; unknown ones decode as UTF-8."""
+    if not charset:
+        return "utf-8"
+    try:
+        return codecs.lookup(charset.strip().lower()).name
+    except LookupError:
+        return "utf-8"
+
+
+def decode_mime_header(value: str | None) -> str | None:
+    """
+    RFC 2047 encoded words -> str. Same result as email.header.decode_header
+    joined part by part, without calling it for plain ASCII values.
+    """
+    if not value:
+        return value
+    if isinstance(value, str) and value.isascii() and "=?" not in value:
+        return value
+    decoded = []
+    for text, enc in decode_header(value):
+        if isinstance(text, bytes):
+            decoded.append(text.decode(_codec(enc), errors="replace"))
+        else:
+            decoded.append(text)
+    return "".join(decoded)
+
+
+@lru_cache(maxsize=FROM_CACHE_SIZE)
+def _decode_address(value: str) -> str | None:
+    return decode_mime_header(value)
+
+
+def decode_address_header(value: str | None) -> str | None:
+    """decode_mime_header for From/To-style values, which repeat: memoized."""
+    if not isinstance(value, str):
+        # email.header.Header (raw 8-bit bytes): not hashable by value
+        return decode_mime_header(value)
+    return _decode_address(value)
+
+
+def _stdlib_date(raw: str) -> dt.datetime | None:
+    try:
+        d = parsedate_to_datetime(raw)
+    except Exception:
+        return None
+    if d.tzinfo is None:
+        return d  # "-0000": zone unknown, best effort
+    return d.astimezone(dt.UTC).replace(tzinfo=None)
+
+
+def parse_date_utc(raw: str | None) -> dt.datetime | None:
+    """
+    Date: header -> naive UTC datetime (None if unparseable). Common shapes
+    are handled by a single regex match; the rest by email.utils.
+    """
+    if not raw:
+        return None
+    m = _DATE_RE.match(raw)
+    if m is None:
+        return _stdlib_date(raw)
+    day, mon, year, hh, mm, ss, sign, zh, zm, zname = m.groups()
+    month = _MONTHS.get(mon.lower())
+    if zname is not None:
+        offset = _ZONES.get(zname.upper())
+    elif sign is not None:
+        offset = (int(zh) * 60 + int(zm)) * (-1 if sign == "-" else 1)
+    else:
+        offset = 0  # no zone: taken as is, like the stdlib path
+    if month is None or offset is None:
+        return _stdlib_date(raw)
+    y = int(year)
+    if y < 100:
+        y += 1900 if y > 68 else 2000
+    try:
+        local = dt.datetime(y, month, int(day), int(hh), int(mm), int(ss or 0))
+    except ValueError:
+        return _stdlib_date(raw)
+    return local - dt.timedelta(minutes=offset)
+
+
+def parse_dates(values: Iterable[str | None]) -> list[dt.datetime | None]:
+    """parse_date_utc over a batch."""
+    parse = parse_date_utc
+    return [parse(v) for v in values]
+
+
+def cache_info() -> dict:
+    """Hit/miss counters of the decoding caches (for benchmarks and metrics)."""
+    return {"from": _decode_address.cache_info()._asdict(), "codec": _codec.cache_info()._asdict()}
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import email
+import re
+from collections.abc import Iterable, Iterator
+from email.message import Message as EmailMessage
+from email.parser import BytesHeaderParser
+
+from message_hub.connectors.header_decode import decode_address_header, decode_mime_header
+from message_hub.connectors.imap_parse import (
+    BodyPart,
+    FetchItem,
+    expand_uid_set,
+    parse_bodystructure,
+    text_parts,
+)
+from message_hub.connectors.mime_text import decode_text, decode_transfer, snippet_from_partial
+from message_hub.metrics import metrics
+
+# The engine-independent half of the IMAP connectors: what to ask the server
+# for and how to read its answers. imap_connector (imaplib, one thread per
+# session) and aio_imap (asyncio, one loop for every account) only differ in
+# how the commands travel.
+
+DEFAULT_FETCH_BATCH_SIZE = 100
+# Only the header fields we store (RFC822.HEADER drags along every Received:
+# and DKIM line), plus the first SNIPPET_BYTES of the body for the preview.
+SNIPPET_BYTES = 2048
+HEADER_FIELDS = (
+    "HEADER.FIELDS (SUBJECT FROM DATE MESSAGE-ID IN-REPLY-TO REFERENCES"
+    " CONTENT-TYPE CONTENT-TRANSFER-ENCODING)"
+)
+HEADER_FETCH_ITEMS = f"(UID FLAGS BODY.PEEK[{HEADER_FIELDS}] BODY.PEEK[TEXT]<0.{SNIPPET_BYTES}>)"
+
+# Bodies: BODYSTRUCTURE first, then only the text/plain and text/html sections
+STRUCTURE_FETCH_ITEMS = "(UID FLAGS RFC822.SIZE BODYSTRUCTURE)"
+MESSAGE_HEADER_FIELDS = "HEADER.FIELDS (SUBJECT FROM DATE)"
+FULL_MESSAGE_ITEMS = (
+    f"(UID FLAGS RFC822.SIZE BODYSTRUCTURE BODY.PEEK[{MESSAGE_HEADER_FIELDS}])"
+)
+BODY_PREFETCH_ITEMS = "(UID BODY.PEEK[])"  # fallback for messages without a usable BODYSTRUCTURE
+
+STATUS_ITEM_RE = re.compile(rb"([A-Z]+) (\d+)")
+
+header_parser = BytesHeaderParser()
+
+TextPlan = tuple[BodyPart | None, BodyPart | None]
+
+
+# --------------------------
+# Mailbox state
+# --------------------------
+def parse_status(blob: bytes) -> dict:
+    """b'INBOX (UIDNEXT 5 UIDVALIDITY 1)' -> {"uidnext": 5, "uidvalidity": 1}"""
+    items_blob = blob.rpartition(b"(")[2]  # skip the (possibly odd) mailbox name
+    return {k.decode().lower(): int(v) for k, v in STATUS_ITEM_RE.findall(items_blob)}
+
+
+def latest_uid_windows(uidnext: int | None, limit: int) -> Iterator[int]:
+    """First UIDs of ever wider windows below UIDNEXT, ending with 1 (the whole mailbox)."""
+    window = max(2 * limit, 1000)
+    while True:
+        start = max(1, (uidnext or 1) - window)
+        yield start
+        if start == 1:
+            return
+        window *= 4
+
+
+def vanished_uids(entries: Iterable) -> list[int]:
+    """UIDs from the payloads of `* VANISHED [(EARLIER)] <uid-set>` responses (QRESYNC)."""
+    uids: list[int] = []
+    for entry in entries:
+        if not entry:
+            continue
+        if isinstance(entry, (bytes, bytearray)):
+            entry = entry.decode(errors="ignore")
+        uid_set = str(entry).replace("(EARLIER)", "").strip()
+        if uid_set:
+            uids.extend(expand_uid_set(uid_set))
+    return uids
+
+
+# --------------------------
+# Headers
+# --------------------------
+def section(item: FetchItem, prefix: str) -> bytes | None:
+    """
+    First literal whose name starts with `prefix` (servers differ in how they
+    echo field lists).
+    """
+    return next((v for k, v in item.sections.items() if k.startswith(prefix)), None)
+
+
+def parse_header_item(item: FetchItem) -> dict | None:
+    raw = section(item, "BODY[HEADER")
+    if item.uid is None or raw is None:
+        return None
+    msg = header_parser.parsebytes(raw)
+    return {
+        "provider_msg_id": str(item.uid),  # ✅ UID
+        "subject": decode_mime_header(msg.get("Subject")),
+        "from_addr": decode_address_header(msg.get("From")),
+        "date_raw": msg.get("Date"),
+        "message_id": msg.get("Message-ID"),
+        "in_reply_to": msg.get("In-Reply-To"),
+        "references": msg.get("References"),
+        "is_read": item.is_read,
+        "snippet": snippet_from_partial(msg, section(item, "BODY[TEXT]")),
+    }
+
+
+# --------------------------
+# Bodies
+# --------------------------
+def _decode_part_payload(part: EmailMessage) -> str:
+    payload = part.get_payload(decode=True)
+    if payload is None:
+        return ""
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        return payload.decode(charset, errors="replace")
+    except Exception:
+        return payload.decode("utf-8", errors="replace")
+
+
+def extract_text_and_html(msg: EmailMessage) -> tuple[str | None, str | None]:
+    text = None
+    html = None
+
+    if msg.is_multipart():
+        for part in msg.walk():
+            ctype = (part.get_content_type() or "").lower()
+            disp = (part.get("Content-Disposition") or "").lower()
+            if "attachment" in disp:
+                continue
+
+            if ctype == "text/plain" and text is None:
+                text = _decode_part_payload(part).strip()
+            elif ctype == "text/html" and html is None:
+                html = _decode_part_payload(part).strip()
+
+            if text and html:
+                break
+    else:
+        ctype = (msg.get_content_type() or "").lower()
+        if ctype == "text/html":
+            html = _decode_part_payload(msg).strip()
+        else:
+            text = _decode_part_payload(msg).strip()
+
+    return text, html
+
+
+def text_plan(item: FetchItem) -> TextPlan | None:
+    """(text part, html part) to fetch for `item`, or None without a usable BODYSTRUCTURE."""
+    parts = parse_bodystructure(item.meta)
+    return None if parts is None else text_parts(parts)
+
+
+def section_fetch_items(plan: TextPlan, peek: bool = True) -> str:
+    # PEEK: prefetching a body must not set \Seen on the server
+    item = "BODY.PEEK" if peek else "BODY"
+    return "(UID " + " ".join(f"{item}[{p.section}]" for p in plan if p is not None) + ")"
+
+
+def _decode_section(raw: bytes, part: BodyPart) -> str:
+    return decode_text(decode_transfer(raw, part.encoding), part.charset)
+
+
+def read_text_plan(item: FetchItem, plan: TextPlan) -> tuple[str | None, str | None]:
+    def read(part: BodyPart | None) -> str | None:
+        if part is None:
+            return None
+        raw = item.sections.get(f"BODY[{part.section}]")
+        return None if raw is None else _decode_section(raw, part).strip()
+
+    return read(plan[0]), read(plan[1])
+
+
+def count_body_bytes(res: dict, account: str | None = None) -> dict:
+    registry = metrics()
+    registry.inc("imap_body_bytes_total", res["bytes"], kind="fetched", account=account)
+    registry.inc("imap_body_bytes_total", res["bytes_saved"], kind="saved", account=account)
+    return res
+
+
+class BodyBatch:
+    """
+    Bookkeeping of a fetch_bodies call, whichever engine sends the commands:
+
+    1. feed it the STRUCTURE_FETCH_ITEMS replies (`add_structure`),
+    2. `requests()` drops messages over `max_size` and says what to fetch:
+       {fetch items: uids} for BODYSTRUCTURE-guided sections, plus the uids
+       to fetch whole with BODY_PREFETCH_ITEMS,
+    3. feed it those replies (`add_sections` / `add_whole`),
+    4. `result()` is fetch_bodies' return value.
+    """
+
+    def __init__(self, max_size: int | None = None):
+        self.max_size = max_size
+        self.plans: dict[int, TextPlan] = {}
+        self.sizes: dict[int, int] = {}
+        self.whole: list[int] = []  # no usable BODYSTRUCTURE: fetch everything
+        self.too_large: list[int] = []
+        self.bodies: dict[int, dict] = {}
+        self.bytes = 0
+        self.bytes_saved = 0
+
+    def add_structure(self, item: FetchItem) -> None:
+        if item.uid is None:
+            return
+        self.sizes[item.uid] = item.size or 0
+        plan = text_plan(item)
+        if plan is None:
+            self.whole.append(item.uid)
+        else:
+            self.plans[item.uid] = plan
+
+    def requests(self) -> tuple[dict[str, list[int]], list[int]]:
+        if self.max_size is not None:
+            cost = {u: sum(p.size for p in plan if p is not None) for u, plan in self.plans.items()}
+            cost.update((u, self.sizes[u]) for u in self.whole)
+            self.too_large = sorted(u for u, n in cost.items() if n > self.max_size)
+            for u in self.too_large:
+                self.plans.pop(u, None)
+            self.whole = [u for u in self.whole if u not in self.too_large]
+
+        by_items: dict[str, list[int]] = {}
+        for u, plan in self.plans.items():
+            if plan == (None, None):
+                # nothing to show, nothing to fetch
+                self.bodies[u] = {"body_text": None, "body_html": None}
+                self.bytes_saved += self.sizes[u]
+            else:
+                by_items.setdefault(section_fetch_items(plan), []).append(u)
+        return {items: sorted(group) for items, group in by_items.items()}, sorted(self.whole)
+
+    def add_sections(self, item: FetchItem) -> None:
+        if item.uid not in self.plans:
+            return
+        fetched = sum(len(v) for v in item.sections.values())
+        self.bytes += fetched
+        self.bytes_saved += max(0, self.sizes[item.uid] - fetched)
+        body_text, body_html = read_text_plan(item, self.plans[item.uid])
+        self.bodies[item.uid] = {"body_text": body_text, "body_html": body_html}
+
+    def add_whole(self, item: FetchItem) -> None:
+        raw = item.sections.get("BODY[]")
+        if item.uid is None or raw is None:
+            return
+        self.bytes += len(raw)
+        body_text, body_html = extract_text_and_html(email.message_from_bytes(raw))
+        self.bodies[item.uid] = {"body_text": body_text, "body_html": body_html}
+
+    def result(self) -> dict:
+        return {
+            "bodies": self.bodies,
+            "bytes": self.bytes,
+            "bytes_saved": self.bytes_saved,
+            "too_large": self.too_large,
+        }
@@ -1,11 +1,36 @@
 from __future__ import annotations
 
-import imaplib
 import email
+import imaplib
+from collections.abc import Callable
 from dataclasses import dataclass
-from email.header import decode_header
-from email.message import Message as EmailMessage
-from typing import Tuple
+from typing import TypeVar
+
+from message_hub.connectors.header_decode import decode_mime_header
+from message_hub.connectors.imap_common import (
+    BODY_PREFETCH_ITEMS,
+    DEFAULT_FETCH_BATCH_SIZE,
+    FULL_MESSAGE_ITEMS,
+    HEADER_FETCH_ITEMS,
+    STRUCTURE_FETCH_ITEMS,
+    BodyBatch,
+    count_body_bytes,
+    extract_text_and_html,
+    header_parser,
+    latest_uid_windows,
+    parse_header_item,
+    parse_status,
+    read_text_plan,
+    section,
+    section_fetch_items,
+    text_plan,
+    vanished_uids,
+)
+from message_hub.connectors.imap_parse import chunked, compress_uid_set, iter_fetch_items
+from message_hub.connectors.imap_pool import ImapConnectionPool, PoolTimeout, default_pool
+from message_hub.metrics import metrics
+
+T = TypeVar("T")
 
 
 @dataclass
@@ -15,115 +40,311 @@ class ImapAccountConfig:
     password: str
     mailbox: str = "INBOX"
     ssl: bool = True
+    port: int | None = None  # None -> 993 with SSL, 143 without
+    timeout: float | None = 60.0  # socket timeout, so a hung server cannot block a worker forever
 
 
-def _decode_mime_header(value: str | None) -> str | None:
-    if not value:
-        return value
-    parts = decode_header(value)
-    decoded = []
-    for text, enc in parts:
-        if isinstance(text, bytes):
-            decoded.append(text.decode(enc or "utf-8", errors="replace"))
-        else:
-            decoded.append(text)
-    return "".join(decoded)
-
-
-def _decode_part_payload(part: EmailMessage) -> str:
-    payload = part.get_payload(decode=True)
-    if payload is None:
-        return ""
-    charset = part.get_content_charset() or "utf-8"
-    try:
-        return payload.decode(charset, errors="replace")
-    except Exception:
-        return payload.decode("utf-8", errors="replace")
-
-
-def _extract_text_and_html(msg: EmailMessage) -> Tuple[str | None, str | None]:
-    text = None
-    html = None
-
-    if msg.is_multipart():
-        for part in msg.walk():
-            ctype = (part.get_content_type() or "").lower()
-            disp = (part.get("Content-Disposition") or "").lower()
-            if "attachment" in disp:
-                continue
+def _with_session(
+    cfg: ImapAccountConfig,
+    fn: Callable[[imaplib.IMAP4], T],
+    pool: ImapConnectionPool | None = None,
+) -> T:
+    """
+    Run `fn` on a pooled, selected session. A pooled session can die while idle
+    (server timeout, network change), so a dropped connection is retried once
+    on a fresh session. Pool exhaustion is not retried: it would only wait
+    out `wait_timeout` a second time.
+    """
+    pool = pool or default_pool()
+    with metrics().scope(account=cfg.email):
+        try:
+            with pool.session(cfg) as imap:
+                return fn(imap)
+        except PoolTimeout:
+            raise
+        except (imaplib.IMAP4.abort, OSError):
+            metrics().inc("imap_reconnects_total")
+            with pool.session(cfg) as imap:
+                return fn(imap)
+
+
+def fetch_latest_headers(
+    cfg: ImapAccountConfig,
+    limit: int = 30,
+    pool: ImapConnectionPool | None = None,
+    batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+) -> list[dict]:
+    """
+    UID-based header fetch. provider_msg_id will be UID (string of digits).
+    Headers are fetched `batch_size` UIDs per UID FETCH command.
+    """
+    return _with_session(
+        cfg, lambda imap: _fetch_latest_headers(imap, limit, batch_size), pool
+    )
 
-            if ctype == "text/plain" and text is None:
-                text = _decode_part_payload(part).strip()
-            elif ctype == "text/html" and html is None:
-                html = _decode_part_payload(part).strip()
 
-            if text and html:
-                break
-    else:
-        ctype = (msg.get_content_type() or "").lower()
-        if ctype == "text/html":
-            html = _decode_part_payload(msg).strip()
-        else:
-            text = _decode_part_payload(msg).strip()
+def _fetch_latest_headers(imap: imaplib.IMAP4, limit: int, batch_size: int) -> list[dict]:
+    status, data = imap.uid("search", None, "ALL")
+    if status != "OK":
+        raise RuntimeError("IMAP UID search failed")
 
-    return text, html
+    uids = [int(u) for u in data[0].split()[-limit:]] if limit > 0 else []
+    return _fetch_headers_for_uids(imap, uids, batch_size)
 
 
-def _connect(cfg: ImapAccountConfig):
-    if cfg.ssl:
-        return imaplib.IMAP4_SSL(cfg.host)
-    return imaplib.IMAP4(cfg.host)
+def _fetch_headers_for_uids(
+    imap: imaplib.IMAP4, uids: list[int], batch_size: int = DEFAULT_FETCH_BATCH_SIZE
+) -> list[dict]:
+    """
+    Fetch headers + flags for `uids`, one round-trip per chunk (e.g. UID FETCH 101:150).
+    Results are newest (highest UID) first.
+    """
+    results: list[dict] = []
+    for chunk in chunked(sorted(uids), batch_size):
+        status, data = imap.uid("fetch", compress_uid_set(chunk), HEADER_FETCH_ITEMS)
+        if status != "OK":
+            raise RuntimeError(f"IMAP UID fetch failed for {len(chunk)} messages")
+        with metrics().timer("mime_parse_seconds", part="headers"):
+            for item in iter_fetch_items(data):
+                parsed = parse_header_item(item)
+                if parsed is not None:
+                    results.append(parsed)
+
+    results.sort(key=lambda r: int(r["provider_msg_id"]), reverse=True)
+    return results
 
 
-def fetch_latest_headers(cfg: ImapAccountConfig, limit: int = 30) -> list[dict]:
+def _mailbox_status(
+    imap: imaplib.IMAP4, mailbox: str, items: str = "(MESSAGES UIDNEXT UIDVALIDITY)"
+) -> dict:
     """
-    UID-based header fetch. provider_msg_id will be UID (string of digits).
+    STATUS for `mailbox` -> {"messages": .., "uidnext": .., "uidvalidity": ..}.
+    """
+    status, data = imap.status(mailbox, items)
+    if status != "OK" or not data or not data[0]:
+        raise RuntimeError(f"IMAP status failed for mailbox={mailbox!r}")
+    blob = data[0] if isinstance(data[0], (bytes, bytearray)) else str(data[0]).encode()
+    return parse_status(blob)
+
+
+def fetch_new_headers(
+    cfg: ImapAccountConfig,
+    last_uid: int | None = None,
+    uidvalidity: int | None = None,
+    limit: int = 30,
+    pool: ImapConnectionPool | None = None,
+    batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+) -> dict:
+    """
+    Incremental header fetch driven by UIDVALIDITY/UIDNEXT.
+
+    - Without a cursor, or when UIDVALIDITY changed, the latest `limit` headers
+      are fetched and `full` is True (stored UIDs are no longer valid).
+    - Otherwise every UID above `last_uid` is fetched, in `batch_size` chunks;
+      `limit` does not apply (capping it would skip mail for good, since the
+      cursor moves past it). When UIDNEXT shows nothing new, the call costs a
+      single STATUS round-trip.
+    - `last_uid` never lags UIDNEXT-1, so a message that arrived and was
+      expunged between two syncs doesn't cost a UID SEARCH on every later one.
+
+    Returns {"uidvalidity", "uidnext", "last_uid", "full", "items"}.
     """
-    imap = _connect(cfg)
-    imap.login(cfg.email, cfg.password)
-    imap.select(cfg.mailbox)
+    return _with_session(
+        cfg,
+        lambda imap: _fetch_new_headers(
+            imap, cfg.mailbox, last_uid, uidvalidity, limit, batch_size
+        ),
+        pool,
+    )
 
-    status, data = imap.uid("search", None, "ALL")
+
+def _fetch_new_headers(
+    imap: imaplib.IMAP4,
+    mailbox: str,
+    last_uid: int | None,
+    uidvalidity: int | None,
+    limit: int,
+    batch_size: int,
+) -> dict:
+    st = _mailbox_status(imap, mailbox)
+    server_validity = st.get("uidvalidity")
+    uidnext = st.get("uidnext")
+
+    full = last_uid is None or uidvalidity is None or server_validity != uidvalidity
+    result = {
+        "uidvalidity": server_validity,
+        "uidnext": uidnext,
+        "last_uid": 0 if full else last_uid,
+        "full": full,
+        "items": [],
+    }
+
+    if not full and uidnext is not None and uidnext <= last_uid + 1:
+        return result
+
+    if full:
+        all_uids = _search_latest_uids(imap, uidnext, limit)
+    else:
+        # "n:*" always matches the highest UID, even when it is below n.
+        all_uids = [u for u in _uid_search(imap, f"UID {last_uid + 1}:*") if u > last_uid]
+    if all_uids:
+        result["last_uid"] = max(result["last_uid"], max(all_uids))
+    if uidnext:
+        result["last_uid"] = max(result["last_uid"], uidnext - 1)
+
+    if full:
+        wanted = all_uids[-limit:] if limit > 0 else []
+    else:
+        wanted = all_uids
+    result["items"] = _fetch_headers_for_uids(imap, wanted, batch_size)
+    return result
+
+
+def _uid_search(imap: imaplib.IMAP4, criteria: str) -> list[int]:
+    status, data = imap.uid("search", None, criteria)
     if status != "OK":
-        imap.logout()
         raise RuntimeError("IMAP UID search failed")
+    return [int(u) for u in (data[0] or b"").split()] if data else []
 
-    uids = data[0].split()[-limit:]
-    results: list[dict] = []
 
-    for uid in reversed(uids):
-        uid_str = uid.decode() if isinstance(uid, (bytes, bytearray)) else str(uid)
-
-        status, msg_data = imap.uid("fetch", uid, "(RFC822.HEADER FLAGS)")
-        if status != "OK" or not msg_data or not msg_data[0]:
-            continue
-
-        raw = msg_data[0][1]
-        msg = email.message_from_bytes(raw)
-
-        subject = _decode_mime_header(msg.get("Subject"))
-        from_ = _decode_mime_header(msg.get("From"))
-        date_ = msg.get("Date")
-
-        flags_blob = (
-            msg_data[0][0].decode(errors="ignore")
-            if isinstance(msg_data[0][0], (bytes, bytearray))
-            else str(msg_data[0][0])
-        )
-        is_read = "\\Seen" in flags_blob
-
-        results.append(
-            {
-                "provider_msg_id": uid_str,  # ✅ UID
-                "subject": subject,
-                "from_addr": from_,
-                "date_raw": date_,
-                "is_read": is_read,
-            }
-        )
-
-    imap.logout()
-    return results
+def _search_latest_uids(imap: imaplib.IMAP4, uidnext: int | None, limit: int) -> list[int]:
+    """
+    UIDs of at least the newest `limit` messages (all of them if fewer).
+
+    UID SEARCH ALL answers in a single line, which on a big mailbox outgrows
+    imaplib's 1 MB line limit (~150k UIDs). So search a UID window below
+    UIDNEXT instead, widening it until it holds `limit` messages.
+    """
+    for start in latest_uid_windows(uidnext, limit):
+        uids = _uid_search(imap, f"UID {start}:*")
+        if len(uids) >= limit:
+            break
+    return uids
+
+
+def _capabilities(imap: imaplib.IMAP4) -> set[str]:
+    return {str(c).upper() for c in getattr(imap, "capabilities", ())}
+
+
+def _drain_vanished(imap: imaplib.IMAP4) -> list[int]:
+    """
+    Collect UIDs from `* VANISHED [(EARLIER)] <uid-set>` responses (QRESYNC).
+    """
+    _, data = imap.response("VANISHED")
+    return vanished_uids(data or ())
+
+
+def fetch_flag_changes(
+    cfg: ImapAccountConfig,
+    since_modseq: int | None,
+    uidvalidity: int | None,
+    known_uids: list[int] | None = None,
+    allow_scan: bool = True,
+    pool: ImapConnectionPool | None = None,
+    batch_size: int = 500,
+) -> dict:
+    """
+    Flag delta for the selected mailbox.
+
+    - CONDSTORE: `UID FETCH 1:* (FLAGS) (CHANGEDSINCE m)` returns only messages
+      whose flags changed since mod-sequence `since_modseq`.
+    - QRESYNC: the same command with VANISHED also reports expunged UIDs.
+    - Otherwise (or without a baseline mod-sequence) `known_uids` are scanned
+      for FLAGS in chunks of `batch_size`; UIDs missing from the reply are
+      reported as vanished. With `allow_scan=False` the scan is skipped.
+
+    Returns {"mode", "uidvalidity", "highestmodseq", "changes": {uid: is_read}, "vanished"}.
+    """
+    return _with_session(
+        cfg,
+        lambda imap: _fetch_flag_changes(
+            imap, cfg.mailbox, since_modseq, uidvalidity, known_uids or [], allow_scan, batch_size
+        ),
+        pool,
+    )
+
+
+def _fetch_flag_changes(
+    imap: imaplib.IMAP4,
+    mailbox: str,
+    since_modseq: int | None,
+    uidvalidity: int | None,
+    known_uids: list[int],
+    allow_scan: bool,
+    batch_size: int,
+) -> dict:
+    caps = _capabilities(imap)
+    condstore = "CONDSTORE" in caps or "QRESYNC" in caps
+    qresync = "QRESYNC" in caps
+
+    items = "(UIDVALIDITY HIGHESTMODSEQ)" if condstore else "(UIDVALIDITY)"
+    st = _mailbox_status(imap, mailbox, items)
+    result = {
+        "mode": "unchanged",
+        "uidvalidity": st.get("uidvalidity"),
+        "highestmodseq": st.get("highestmodseq"),
+        "changes": {},
+        "vanished": [],
+    }
+    if uidvalidity is not None and st.get("uidvalidity") != uidvalidity:
+        result["mode"] = "uidvalidity-changed"  # header sync will resync the folder
+        return result
+
+    highest = st.get("highestmodseq")
+    if condstore and highest is not None and since_modseq is not None:
+        if highest <= since_modseq:
+            return result
+        modifiers = f"(CHANGEDSINCE {since_modseq}{' VANISHED' if qresync else ''})"
+        _drain_vanished(imap)
+        status, data = imap.uid("fetch", "1:*", "(UID FLAGS)", modifiers)
+        if status != "OK":
+            raise RuntimeError("IMAP UID fetch CHANGEDSINCE failed")
+        result["mode"] = "qresync" if qresync else "condstore"
+        result["changes"] = {
+            it.uid: it.is_read for it in iter_fetch_items(data) if it.uid is not None
+        }
+        if qresync:
+            result["vanished"] = _drain_vanished(imap)
+        return result
+
+    if not allow_scan:
+        result["mode"] = "skipped"
+        return result
+
+    # Fallback: chunked FLAGS scan over the UIDs we already store.
+    result["mode"] = "scan"
+    seen: set[int] = set()
+    for chunk in chunked(sorted(known_uids), batch_size):
+        status, data = imap.uid("fetch", compress_uid_set(chunk), "(UID FLAGS)")
+        if status != "OK":
+            raise RuntimeError(f"IMAP UID fetch FLAGS failed for {len(chunk)} messages")
+        for it in iter_fetch_items(data):
+            if it.uid is None:
+                continue
+            seen.add(it.uid)
+            result["changes"][it.uid] = it.is_read
+    result["vanished"] = [u for u in known_uids if u not in seen]
+    return result
+
+
+def mark_seen(
+    cfg: ImapAccountConfig,
+    uids: list[int],
+    pool: ImapConnectionPool | None = None,
+    batch_size: int = 500,
+) -> None:
+    """
+    Set \\Seen on `uids` (UID STORE +FLAGS.SILENT, `batch_size` UIDs per command).
+    """
+    if uids:
+        _with_session(cfg, lambda imap: _mark_seen(imap, uids, batch_size), pool)
+
+
+def _mark_seen(imap: imaplib.IMAP4, uids: list[int], batch_size: int) -> None:
+    for chunk in chunked(sorted(set(uids)), batch_size):
+        status, _ = imap.uid("store", compress_uid_set(chunk), "+FLAGS.SILENT", "(\\Seen)")
+        if status != "OK":
+            raise RuntimeError(f"IMAP UID STORE \\Seen failed for {len(chunk)} messages")
 
 
 def _uid_from_message_id(imap, message_id: str) -> str | None:
@@ -142,16 +363,26 @@ def _uid_from_message_id(imap, message_id: str) -> str | None:
     return uid.decode() if isinstance(uid, (bytes, bytearray)) else str(uid)
 
 
-def fetch_full_message(cfg: ImapAccountConfig, provider_msg_id: str) -> dict:
+def fetch_full_message(
+    cfg: ImapAccountConfig, provider_msg_id: str, pool: ImapConnectionPool | None = None
+) -> dict:
     """
-    Fetch full email body using either:
+    Fetch the displayable body of one message using either:
     - UID (digits) OR
     - Message-ID header (<...>) fallback.
+
+    Only the text/plain and text/html sections are downloaded (attachments
+    are skipped); servers without a usable BODYSTRUCTURE get the whole RFC822.
+    Like the RFC822 fetch it replaces, this sets \\Seen on the server.
+    "bytes" is what was downloaded, "bytes_saved" what the whole message
+    would have cost on top.
     """
-    imap = _connect(cfg)
-    imap.login(cfg.email, cfg.password)
-    imap.select(cfg.mailbox)
+    return _with_session(
+        cfg, lambda imap: count_body_bytes(_fetch_full_message(imap, provider_msg_id)), pool
+    )
 
+
+def _fetch_full_message(imap: imaplib.IMAP4, provider_msg_id: str) -> dict:
     uid = None
     if provider_msg_id and provider_msg_id.isdigit():
         uid = provider_msg_id
@@ -159,23 +390,55 @@ def fetch_full_message(cfg: ImapAccountConfig, provider_msg_id: str) -> dict:
         uid = _uid_from_message_id(imap, provider_msg_id)
 
     if not uid:
-        imap.logout()
         raise RuntimeError(f"Could not resolve UID for provider_msg_id={provider_msg_id!r}")
 
+    status, data = imap.uid("fetch", uid, FULL_MESSAGE_ITEMS)
+    item = next(iter_fetch_items(data), None) if status == "OK" else None
+    if item is None:
+        raise RuntimeError(f"IMAP UID fetch failed for uid={uid}")
+    plan = text_plan(item)
+    if plan is None:
+        return _fetch_rfc822(imap, uid)
+
+    body_text = body_html = None
+    fetched = 0
+    if plan != (None, None):
+        status, data = imap.uid("fetch", uid, section_fetch_items(plan, peek=False))
+        body = next(iter_fetch_items(data), None) if status == "OK" else None
+        if body is None:
+            raise RuntimeError(f"IMAP UID fetch (body sections) failed for uid={uid}")
+        with metrics().timer("mime_parse_seconds", part="body"):
+            body_text, body_html = read_text_plan(body, plan)
+        fetched = sum(len(v) for v in body.sections.values())
+
+    msg = header_parser.parsebytes(section(item, "BODY[HEADER") or b"")
+    return {
+        "uid": uid,
+        "subject": decode_mime_header(msg.get("Subject")),
+        "from_addr": decode_mime_header(msg.get("From")),
+        "date_raw": msg.get("Date"),
+        "body_text": body_text,
+        "body_html": body_html,
+        "is_read": item.is_read,
+        "bytes": fetched,
+        "bytes_saved": max(0, (item.size or 0) - fetched),
+    }
+
+
+def _fetch_rfc822(imap: imaplib.IMAP4, uid: str) -> dict:
     status, data = imap.uid("fetch", uid, "(RFC822 FLAGS)")
     if status != "OK" or not data or not data[0]:
-        imap.logout()
         raise RuntimeError(f"IMAP UID fetch failed for uid={uid}")
 
     raw_bytes = data[0][1]
-    msg = email.message_from_bytes(raw_bytes)
+    with metrics().timer("mime_parse_seconds", part="body"):
+        msg = email.message_from_bytes(raw_bytes)
+        body_text, body_html = extract_text_and_html(msg)
 
-    subject = _decode_mime_header(msg.get("Subject"))
-    from_ = _decode_mime_header(msg.get("From"))
+    subject = decode_mime_header(msg.get("Subject"))
+    from_ = decode_mime_header(msg.get("From"))
     date_ = msg.get("Date")
 
-    body_text, body_html = _extract_text_and_html(msg)
-
     flags_blob = (
         data[0][0].decode(errors="ignore")
         if isinstance(data[0][0], (bytes, bytearray))
@@ -183,7 +446,6 @@ def fetch_full_message(cfg: ImapAccountConfig, provider_msg_id: str) -> dict:
     )
     is_read = "\\Seen" in flags_blob
 
-    imap.logout()
     return {
         "uid": uid,
         "subject": subject,
@@ -192,4 +454,55 @@ def fetch_full_message(cfg: ImapAccountConfig, provider_msg_id: str) -> dict:
         "body_text": body_text,
         "body_html": body_html,
         "is_read": is_read,
+        "bytes": len(raw_bytes),
+        "bytes_saved": 0,
     }
+
+
+def fetch_bodies(
+    cfg: ImapAccountConfig,
+    uids: list[int],
+    max_size: int | None = None,
+    pool: ImapConnectionPool | None = None,
+    batch_size: int = 20,
+) -> dict:
+    """
+    Fetch the text/html bodies of many UIDs on one session without marking them read.
+
+    One BODYSTRUCTURE round-trip per 500 UIDs decides which sections to get;
+    messages asking for the same sections are then fetched `batch_size` per
+    UID FETCH. With `max_size`, messages whose text parts are larger are left
+    out (they stay lazy, fetched on open); attachments don't count.
+
+    Returns {"bodies": {uid: {"body_text", "body_html"}}, "bytes": int,
+    "bytes_saved": int, "too_large": [uids]}.
+    """
+    return _with_session(
+        cfg, lambda imap: count_body_bytes(_fetch_bodies(imap, uids, max_size, batch_size)), pool
+    )
+
+
+def _fetch_bodies(
+    imap: imaplib.IMAP4, uids: list[int], max_size: int | None, batch_size: int
+) -> dict:
+    batch = BodyBatch(max_size)
+    for chunk in chunked(sorted({int(u) for u in uids}), 500):
+        status, data = imap.uid("fetch", compress_uid_set(chunk), STRUCTURE_FETCH_ITEMS)
+        if status != "OK":
+            raise RuntimeError(f"IMAP UID fetch (structure) failed for {len(chunk)} messages")
+        for item in iter_fetch_items(data):
+            batch.add_structure(item)
+
+    by_items, whole = batch.requests()
+    fetches = [(items, group, batch.add_sections) for items, group in by_items.items()]
+    fetches.append((BODY_PREFETCH_ITEMS, whole, batch.add_whole))
+    for items, group, add in fetches:
+        for chunk in chunked(group, batch_size):
+            status, data = imap.uid("fetch", compress_uid_set(chunk), items)
+            if status != "OK":
+                raise RuntimeError(f"IMAP UID fetch failed for {len(chunk)} messages")
+            with metrics().timer("mime_parse_seconds", part="body"):
+                for item in iter_fetch_items(data):
+                    add(item)
+
+    return batch.result()
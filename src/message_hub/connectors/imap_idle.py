@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import imaplib
+import random
+import re
+import select
+import threading
+import time
+from collections.abc import Callable
+
+from message_hub.connectors.imap_connector import ImapAccountConfig, _mailbox_status
+from message_hub.connectors.imap_pool import (
+    ImapConnectionPool,
+    _open_imap,
+    _refresh_capabilities,
+    _safe_logout,
+    _select,
+    default_pool,
+)
+from message_hub.metrics import metrics
+
+_EVENT_RE = re.compile(rb"^\* (?:\d+ )?(EXISTS|EXPUNGE|FETCH|VANISHED)\b", re.IGNORECASE)
+
+ChangeCallback = Callable[[ImapAccountConfig, list[str]], None]
+
+
+class _SocketLineReader:
+    """
+    Line reader on the raw socket that honours a timeout per call.
+
+    imaplib's buffered file object becomes unusable after a socket timeout,
+    so while idling we bypass it and wait with select() instead.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buf = b""
+
+    def readline(self, timeout: float) -> bytes | None:
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self.buf:
+            pending = getattr(self.sock, "pending", None)
+            if not (pending and pending() > 0):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                readable, _, _ = select.select([self.sock], [], [], remaining)
+                if not readable:
+                    return None
+            chunk = self.sock.recv(8192)
+            if not chunk:
+                raise imaplib.IMAP4.abort("connection closed while idling")
+            self.buf += chunk
+        line, _, self.buf = self.buf.partition(b"\n")
+        return line + b"\n"
+
+
+class ImapIdleWatcher(threading.Thread):
+    """
+    Watches one account/folder on a dedicated background thread and calls
+    `on_change(cfg, events)` when the server reports EXISTS/EXPUNGE/FETCH.
+
+    IDLE is re-issued every `renew_after` seconds, well before the server's
+    30-minute inactivity timeout. Servers without IDLE are polled with STATUS
+    instead; the poll interval doubles (up to `poll_max`) while nothing
+    changes and snaps back to `poll_min` on activity. Connection errors are
+    retried with exponential backoff, and a reconnect is reported as a change
+    so anything missed while offline gets synced.
+    """
+
+    def __init__(
+        self,
+        cfg: ImapAccountConfig,
+        on_change: ChangeCallback,
+        renew_after: float = 9 * 60,
+        poll_min: float = 15.0,
+        poll_max: float = 300.0,
+        debounce: float = 0.25,
+        connect: Callable[[ImapAccountConfig], imaplib.IMAP4] = _open_imap,
+        pool: ImapConnectionPool | None = None,
+    ):
+        super().__init__(name=f"imap-idle:{cfg.email}/{cfg.mailbox}", daemon=True)
+        self.cfg = cfg
+        self.on_change = on_change
+        self.renew_after = renew_after
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+        self.debounce = debounce
+        self._connect = connect
+        self._pool = pool
+        self._stopping = threading.Event()  # (not `_stop`: that name is a Thread method)
+        self.mode: str | None = None  # "idle" | "poll" once connected
+
+    def stop(self, timeout: float | None = 2.0) -> None:
+        self._stopping.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopping.is_set()
+
+    # --------------------------
+    # Thread body
+    # --------------------------
+    def run(self) -> None:
+        with metrics().scope(account=self.cfg.email):
+            self._run()
+
+    def _run(self) -> None:
+        backoff = 1.0
+        first = True
+        while not self._stopping.is_set():
+            imap = None
+            try:
+                imap = self._open()
+                if not first:
+                    self._emit(["RECONNECT"])
+                first = False
+                backoff = 1.0
+                if "IDLE" in getattr(imap, "capabilities", ()):
+                    self.mode = "idle"
+                    self._idle_loop(imap)
+                else:
+                    _safe_logout(imap)
+                    imap = None
+                    self.mode = "poll"
+                    self._poll_loop()
+            except Exception:
+                if self._stopping.wait(backoff * random.uniform(0.8, 1.2)):
+                    break
+                backoff = min(backoff * 2, 300.0)
+            finally:
+                if imap is not None:
+                    _safe_logout(imap)
+
+    def _open(self) -> imaplib.IMAP4:
+        imap = self._connect(self.cfg)
+        try:
+            imap.login(self.cfg.email, self.cfg.password)
+            _refresh_capabilities(imap)
+            _select(imap, self.cfg.mailbox)
+        except BaseException:
+            _safe_logout(imap)
+            raise
+        return imap
+
+    def _emit(self, events: list[str]) -> None:
+        if events and not self._stopping.is_set():
+            registry = metrics()
+            for event in events:
+                registry.inc("idle_events_total", event=event)
+            self.on_change(self.cfg, events)
+
+    # --------------------------
+    # IDLE (RFC 2177)
+    # --------------------------
+    def _idle_loop(self, imap: imaplib.IMAP4) -> None:
+        reader = _SocketLineReader(imap.sock)
+        while not self._stopping.is_set():
+            events = self._idle_once(imap, reader)
+            self._emit(events)
+
+    def _idle_once(self, imap: imaplib.IMAP4, reader: _SocketLineReader) -> list[str]:
+        tag = imap._new_tag()
+        imap.send(tag + b" IDLE\r\n")
+        events: list[str] = []
+
+        while True:  # wait for the "+ idling" continuation
+            line = reader.readline(30.0)
+            if line is None:
+                raise imaplib.IMAP4.abort("no IDLE continuation from server")
+            if line.startswith(b"+"):
+                break
+            if line.startswith(tag):
+                raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+            self._collect(line, events)
+
+        renew_at = time.monotonic() + self.renew_after
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            if now >= renew_at:
+                break
+            # short waits keep stop() responsive; after the first event, only
+            # linger for `debounce` to batch bursts (e.g. EXISTS + RECENT)
+            wait = self.debounce if events else min(1.0, renew_at - now)
+            line = reader.readline(wait)
+            if line is None:
+                if events:
+                    break
+                continue
+            if line.startswith(b"* BYE"):
+                raise imaplib.IMAP4.abort("server closed IDLE session")
+            self._collect(line, events)
+
+        imap.send(b"DONE\r\n")
+        while True:  # drain until the tagged completion of IDLE
+            line = reader.readline(30.0)
+            if line is None:
+                raise imaplib.IMAP4.abort("no IDLE completion from server")
+            if line.startswith(tag):
+                break
+            self._collect(line, events)
+        return events
+
+    @staticmethod
+    def _collect(line: bytes, events: list[str]) -> None:
+        m = _EVENT_RE.match(line)
+        if m:
+            events.append(m.group(1).decode().upper())
+
+    # --------------------------
+    # Polling fallback
+    # --------------------------
+    def _poll_loop(self) -> None:
+        pool = self._pool or default_pool()
+        interval = self.poll_min
+        last: dict | None = None
+        while not self._stopping.is_set():
+            with pool.session(self.cfg) as imap:
+                items = (
+                    "(MESSAGES UIDNEXT UIDVALIDITY HIGHESTMODSEQ)"
+                    if "CONDSTORE" in getattr(imap, "capabilities", ())
+                    else "(MESSAGES UIDNEXT UIDVALIDITY)"
+                )
+                st = _mailbox_status(imap, self.cfg.mailbox, items)
+            if last is not None and st != last:
+                self._emit(["STATUS"])
+                interval = self.poll_min
+            elif last is not None:
+                interval = min(interval * 2, self.poll_max)
+            last = st
+            if self._stopping.wait(interval):
+                break
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+_MSG_START_RE = re.compile(rb"^\d+ \(")
+_LITERAL_NAME_RE = re.compile(r"([A-Z0-9.]+(?:\[[^\]]*\])?(?:<\d+>)?) \{\d+\}$", re.IGNORECASE)
+_UID_RE = re.compile(r"\bUID (\d+)", re.IGNORECASE)
+_FLAGS_RE = re.compile(r"\bFLAGS \(([^)]*)\)", re.IGNORECASE)
+_SIZE_RE = re.compile(r"\bRFC822\.SIZE (\d+)", re.IGNORECASE)
+_MODSEQ_RE = re.compile(r"\bMODSEQ \((\d+)\)", re.IGNORECASE)
+_LITERAL_SIZE_RE = re.compile(r"\{\d+\}$")
+_BODYSTRUCTURE_RE = re.compile(r"\bBODYSTRUCTURE \(", re.IGNORECASE)
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))', re.DOTALL)
+
+
+@dataclass
+class FetchItem:
+    """One `* n FETCH (...)` response, with literal sections keyed by item name."""
+
+    uid: int | None = None
+    flags: tuple[str, ...] = ()
+    size: int | None = None
+    modseq: int | None = None
+    sections: dict[str, bytes] = field(default_factory=dict)
+    meta: str = ""
+
+    @property
+    def is_read(self) -> bool:
+        return "\\Seen" in self.flags
+
+
+def compress_uid_set(uids: Iterable[int]) -> str:
+    """
+    Build a compact IMAP UID set: [101, 102, 103, 107] -> "101:103,107".
+    """
+    ordered = sorted(set(int(u) for u in uids))
+    if not ordered:
+        return ""
+    parts: list[str] = []
+    start = prev = ordered[0]
+    for u in ordered[1:]:
+        if u == prev + 1:
+            prev = u
+            continue
+        parts.append(f"{start}:{prev}" if start != prev else str(start))
+        start = prev = u
+    parts.append(f"{start}:{prev}" if start != prev else str(start))
+    return ",".join(parts)
+
+
+def expand_uid_set(uid_set: str) -> list[int]:
+    """
+    Inverse of compress_uid_set: "101:103,107" -> [101, 102, 103, 107].
+    """
+    out: list[int] = []
+    for part in uid_set.strip().split(","):
+        if not part:
+            continue
+        lo, _, hi = part.partition(":")
+        a, b = int(lo), int(hi or lo)
+        if a > b:
+            a, b = b, a
+        out.extend(range(a, b + 1))
+    return out
+
+
+def chunked(items: list, size: int) -> Iterator[list]:
+    size = max(1, int(size))
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _to_str(b: bytes | bytearray | str) -> str:
+    if isinstance(b, (bytes, bytearray)):
+        return b.decode("utf-8", errors="ignore")
+    return str(b)
+
+
+def _depth(text: str) -> int:
+    """Open parentheses at the end of `text`, ignoring quoted strings and [...] section specs."""
+    depth = 0
+    in_quote = escaped = False
+    brackets = 0
+    for ch in text:
+        if in_quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_quote = False
+        elif ch == '"':
+            in_quote = True
+        elif ch == "[":
+            brackets += 1
+        elif ch == "]":
+            brackets = max(0, brackets - 1)
+        elif not brackets:
+            if ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+    return depth
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _finish(meta_parts: list[str], sections: dict[str, bytes]) -> FetchItem:
+    meta = "".join(meta_parts)
+    item = FetchItem(sections=sections, meta=meta)
+    m = _UID_RE.search(meta)
+    if m:
+        item.uid = int(m.group(1))
+    m = _FLAGS_RE.search(meta)
+    if m:
+        item.flags = tuple(m.group(1).split())
+    m = _SIZE_RE.search(meta)
+    if m:
+        item.size = int(m.group(1))
+    m = _MODSEQ_RE.search(meta)
+    if m:
+        item.modseq = int(m.group(1))
+    return item
+
+
+def iter_fetch_items(data: list | None) -> Iterator[FetchItem]:
+    """
+    Stream-parse the data list imaplib returns for a multi-message (UID) FETCH.
+
+    imaplib splits each response at its literals: a message becomes a tuple
+    (b'12 (UID 101 FLAGS (\\Seen) RFC822.HEADER {342}', b'<literal>') followed
+    by further tuples for more literals and a closing b')' (which may carry
+    trailing items such as FLAGS). Messages without literals arrive as plain
+    bytes. Each message is yielded as soon as its last segment is seen.
+    """
+    meta_parts: list[str] | None = None
+    sections: dict[str, bytes] = {}
+
+    for seg in data or ():
+        if seg is None:
+            continue
+        head = seg[0] if isinstance(seg, tuple) else seg
+        head_b = head if isinstance(head, (bytes, bytearray)) else str(head).encode()
+
+        if _MSG_START_RE.match(head_b):
+            if meta_parts is not None:
+                yield _finish(meta_parts, sections)
+            meta_parts, sections = [], {}
+        elif meta_parts is None:
+            continue  # stray continuation without a message start
+
+        head_s = _to_str(head_b)
+        if isinstance(seg, tuple):
+            if _depth("".join(meta_parts) + head_s) > 1:
+                # a literal inside a list (e.g. a non-ASCII file name in BODYSTRUCTURE):
+                # inline it as a quoted string so the list stays parseable
+                meta_parts.append(_LITERAL_SIZE_RE.sub("", head_s) + _quote(_to_str(seg[1] or b"")))
+                continue
+            m = _LITERAL_NAME_RE.search(head_s)
+            name = m.group(1).upper() if m else f"LITERAL{len(sections)}"
+            meta_parts.append(head_s[: m.start()] if m else head_s)
+            meta_parts.append(f"{name} ")
+            sections[name] = bytes(seg[1] or b"")
+        else:
+            meta_parts.append(head_s)
+
+    if meta_parts is not None:
+        yield _finish(meta_parts, sections)
+
+
+# --------------------------
+# BODYSTRUCTURE
+# --------------------------
+@dataclass
+class BodyPart:
+    """One leaf of a BODYSTRUCTURE; `section` is what goes into BODY[<section>]."""
+
+    section: str
+    content_type: str
+    params: dict[str, str] = field(default_factory=dict)
+    encoding: str = "7bit"
+    size: int = 0  # encoded size, i.e. what fetching it costs
+    disposition: str | None = None
+
+    @property
+    def charset(self) -> str | None:
+        return self.params.get("charset")
+
+    @property
+    def is_attachment(self) -> bool:
+        return self.disposition == "attachment"
+
+
+def _parse_list(text: str, pos: int) -> tuple[list, int]:
+    """
+    Parse the parenthesized list starting at text[pos] into nested lists of
+    str (NIL -> None). Returns (list, position after its closing paren).
+    """
+    stack: list[list] = []
+    cur: list | None = None
+    while True:
+        m = _TOKEN_RE.match(text, pos)
+        if not m or not m.group(0).strip():
+            raise ValueError("unterminated list")
+        pos = m.end()
+        opened, closed, quoted, atom = m.groups()
+        if opened:
+            new: list = []
+            if cur is not None:
+                cur.append(new)
+                stack.append(cur)
+            cur = new
+        elif cur is None:
+            raise ValueError("expected a list")
+        elif closed:
+            if not stack:
+                return cur, pos
+            cur = stack.pop()
+        elif quoted is not None:
+            cur.append(re.sub(r"\\(.)", r"\1", quoted))
+        else:
+            cur.append(None if atom.upper() == "NIL" else atom)
+
+
+def _is_multipart(node: list) -> bool:
+    return bool(node) and isinstance(node[0], list)
+
+
+def _is_structure(node: list) -> bool:
+    # body parts are lists; extension data of a multipart can be a list too (params, disposition)
+    return _is_multipart(node) or (
+        len(node) >= 7 and all(not isinstance(v, list) for v in node[:2])
+    )
+
+
+def _walk(node: list, section: str, out: list[BodyPart]) -> None:
+    if _is_multipart(node):
+        children = [n for n in node if isinstance(n, list) and _is_structure(n)]
+        for i, child in enumerate(children, start=1):
+            _walk(child, f"{section}.{i}" if section else str(i), out)
+        return
+
+    ctype = f"{node[0] or 'text'}/{node[1] or 'plain'}".lower()
+    raw_params = node[2] if isinstance(node[2], list) else []
+    # a malformed odd-length list just loses its dangling name
+    pairs = zip(raw_params[::2], raw_params[1::2], strict=False)
+    params = {str(k).lower(): str(v) for k, v in pairs if k and v is not None}
+    # extension data follows the type-specific fields: text has `lines`,
+    # message/rfc822 has envelope, body and lines; then md5, disposition
+    ext = {"text": 8, "message": 10 if ctype == "message/rfc822" else 7}.get(ctype.split("/")[0], 7)
+    disp = node[ext + 1] if len(node) > ext + 1 else None
+    part = BodyPart(
+        section=section or "1",
+        content_type=ctype,
+        params=params,
+        encoding=str(node[5] or "7bit").lower(),
+        size=int(node[6] or 0),
+        disposition=str(disp[0]).lower() if isinstance(disp, list) and disp and disp[0] else None,
+    )
+    out.append(part)
+
+    if ctype == "message/rfc822" and len(node) > 8 and isinstance(node[8], list):
+        inner = node[8]
+        _walk(inner, part.section if _is_multipart(inner) else f"{part.section}.1", out)
+
+
+def parse_bodystructure(meta: str) -> list[BodyPart] | None:
+    """
+    Leaf parts of the BODYSTRUCTURE in a FETCH response, in MIME order.
+    None if there is none or it can't be parsed.
+    """
+    m = _BODYSTRUCTURE_RE.search(meta)
+    if not m:
+        return None
+    try:
+        tree, _ = _parse_list(meta, m.end() - 1)
+        parts: list[BodyPart] = []
+        _walk(tree, "", parts)
+    except (ValueError, IndexError, TypeError):
+        return None
+    return parts
+
+
+def text_parts(parts: list[BodyPart]) -> tuple[BodyPart | None, BodyPart | None]:
+    """
+    (text/plain part, text/html part) to display: the first of each that
+    isn't an attachment. A single-part message of any text/* type is text.
+    """
+    text = html = None
+    for part in parts:
+        if part.is_attachment:
+            continue
+        if part.content_type == "text/plain" and text is None:
+            text = part
+        elif part.content_type == "text/html" and html is None:
+            html = part
+    if (
+        text is None
+        and html is None
+        and len(parts) == 1
+        and parts[0].content_type.startswith("text/")
+    ):
+        text = parts[0]
+    return text, html
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import imaplib
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from message_hub.metrics import metrics
+
+if TYPE_CHECKING:
+    from message_hub.connectors.imap_connector import ImapAccountConfig
+
+
+class _TimedCommands:
+    """
+    Times every tagged command round trip into imap_command_seconds{command}
+    ("UID FETCH", "SELECT"...).
+    """
+
+    def _simple_command(self, name, *args):
+        registry = metrics()
+        if not registry.enabled:
+            return super()._simple_command(name, *args)
+        command = f"{name} {args[0]}" if name == "UID" and args else name
+        with registry.timer("imap_command_seconds", command=command):
+            return super()._simple_command(name, *args)
+
+
+class _IMAP4(_TimedCommands, imaplib.IMAP4):
+    pass
+
+
+class _IMAP4_SSL(_TimedCommands, imaplib.IMAP4_SSL):
+    pass
+
+
+def _open_imap(cfg: ImapAccountConfig) -> imaplib.IMAP4:
+    with metrics().timer("imap_connect_seconds"):
+        if cfg.ssl:
+            return _IMAP4_SSL(cfg.host, cfg.port or imaplib.IMAP4_SSL_PORT, timeout=cfg.timeout)
+        return _IMAP4(cfg.host, cfg.port or imaplib.IMAP4_PORT, timeout=cfg.timeout)
+
+
+def _select(imap: imaplib.IMAP4, mailbox: str) -> None:
+    status, _ = imap.select(mailbox)
+    if status != "OK":
+        raise RuntimeError(f"IMAP select failed for mailbox={mailbox!r}")
+
+
+def _refresh_capabilities(imap: imaplib.IMAP4) -> None:
+    """
+    Servers often advertise extensions (CONDSTORE, QRESYNC, IDLE) only after
+    LOGIN, so re-read CAPABILITY and enable QRESYNC before the first SELECT.
+    """
+    try:
+        status, data = imap.capability()
+    except Exception:
+        return
+    if status == "OK" and data and data[-1]:
+        raw = data[-1]
+        text = raw.decode(errors="ignore") if isinstance(raw, (bytes, bytearray)) else str(raw)
+        imap.capabilities = tuple(text.upper().split())
+    caps = getattr(imap, "capabilities", ())
+    if "QRESYNC" in caps and "ENABLE" in caps:
+        try:
+            imap.enable("QRESYNC")
+        except Exception:
+            pass
+
+
+def _safe_logout(imap: imaplib.IMAP4) -> None:
+    try:
+        imap.logout()
+    except Exception:
+        pass
+
+
+class PoolTimeout(TimeoutError):
+    """No session to the host became free within `wait_timeout`."""
+
+
+@dataclass
+class _PooledConnection:
+    imap: imaplib.IMAP4
+    key: tuple
+    mailbox: str
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class ImapConnectionPool:
+    """
+    Keeps authenticated, already-selected IMAP sessions alive between calls.
+
+    Sessions are keyed per account (host, ssl, email). Idle sessions are
+    health-checked with NOOP before reuse once they have been idle for
+    `health_check_after` seconds, and dropped after `max_idle` seconds
+    (servers autologout idle clients after ~30 minutes). At most
+    `max_per_host` sessions (idle + in use) are open to the same host.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 4,
+        max_idle: float = 20 * 60,
+        health_check_after: float = 30.0,
+        wait_timeout: float = 60.0,
+        connect: Callable[[ImapAccountConfig], imaplib.IMAP4] = _open_imap,
+    ):
+        self.max_per_host = max_per_host
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.wait_timeout = wait_timeout
+        self._connect = connect
+
+        self._cond = threading.Condition()
+        self._idle: dict[tuple, list[_PooledConnection]] = {}
+        self._host_counts: dict[str, int] = {}
+
+    @staticmethod
+    def _key(cfg: ImapAccountConfig) -> tuple:
+        return (cfg.host, cfg.ssl, cfg.email)
+
+    # --------------------------
+    # Public API
+    # --------------------------
+    @contextmanager
+    def session(self, cfg: ImapAccountConfig) -> Iterator[imaplib.IMAP4]:
+        """
+        Borrow a logged-in session with `cfg.mailbox` selected.
+        The session is returned to the pool on success and discarded on error.
+        """
+        conn = self._acquire(cfg)
+        try:
+            yield conn.imap
+        except BaseException:
+            self._discard(conn)
+            raise
+        else:
+            self._release(conn)
+
+    def close_all(self) -> None:
+        with self._cond:
+            conns = [c for lst in self._idle.values() for c in lst]
+            self._idle.clear()
+            for c in conns:
+                self._dec_host(c.key[0])
+            self._cond.notify_all()
+        for c in conns:
+            _safe_logout(c.imap)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "idle": sum(len(lst) for lst in self._idle.values()),
+                "open_per_host": dict(self._host_counts),
+            }
+
+    # --------------------------
+    # Internals
+    # --------------------------
+    def _acquire(self, cfg: ImapAccountConfig) -> _PooledConnection:
+        key = self._key(cfg)
+        host = cfg.host
+        deadline = time.monotonic() + self.wait_timeout
+        victim: _PooledConnection | None = None
+        conn: _PooledConnection | None = None
+
+        with self._cond:
+            while True:
+                idle = self._idle.get(key)
+                if idle:
+                    conn = idle.pop()  # most recently used first
+                    break
+                if self._host_counts.get(host, 0) < self.max_per_host:
+                    self._host_counts[host] = self._host_counts.get(host, 0) + 1
+                    break
+                # Host is at capacity: steal the slot of another account's idle session.
+                victim = self._pop_idle_for_host(host)
+                if victim is not None:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No free IMAP session for host {host!r}")
+                self._cond.wait(remaining)
+
+        if victim is not None:
+            _safe_logout(victim.imap)
+
+        if conn is not None:
+            if self._is_usable(conn):
+                try:
+                    if conn.mailbox != cfg.mailbox:
+                        _select(conn.imap, cfg.mailbox)
+                        conn.mailbox = cfg.mailbox
+                    return conn
+                except Exception:
+                    pass
+            _safe_logout(conn.imap)
+            # slot stays reserved for the replacement session
+
+        try:
+            return self._open(cfg, key)
+        except BaseException:
+            with self._cond:
+                self._dec_host(host)
+                self._cond.notify()
+            raise
+
+    def _open(self, cfg: ImapAccountConfig, key: tuple) -> _PooledConnection:
+        imap = self._connect(cfg)
+        try:
+            imap.login(cfg.email, cfg.password)
+            _refresh_capabilities(imap)
+            _select(imap, cfg.mailbox)
+        except BaseException:
+            _safe_logout(imap)
+            raise
+        return _PooledConnection(imap=imap, key=key, mailbox=cfg.mailbox)
+
+    def _is_usable(self, conn: _PooledConnection) -> bool:
+        idle_for = time.monotonic() - conn.last_used
+        if idle_for >= self.max_idle:
+            return False
+        if idle_for < self.health_check_after:
+            return True
+        try:
+            status, _ = conn.imap.noop()
+            return status == "OK"
+        except Exception:
+            return False
+
+    def _release(self, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        untagged = getattr(conn.imap, "untagged_responses", None)
+        if untagged:
+            untagged.clear()  # unsolicited EXISTS/FETCH would otherwise pile up
+        with self._cond:
+            self._idle.setdefault(conn.key, []).append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn: _PooledConnection) -> None:
+        _safe_logout(conn.imap)
+        with self._cond:
+            self._dec_host(conn.key[0])
+            self._cond.notify()
+
+    def _pop_idle_for_host(self, host: str) -> _PooledConnection | None:
+        for key, lst in self._idle.items():
+            if key[0] == host and lst:
+                return lst.pop(0)  # least recently used
+        return None
+
+    def _dec_host(self, host: str) -> None:
+        n = self._host_counts.get(host, 0) - 1
+        if n > 0:
+            self._host_counts[host] = n
+        else:
+            self._host_counts.pop(host, None)
+
+
+_default_pool: ImapConnectionPool | None = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool() -> ImapConnectionPool:
+    """Process-wide pool shared by header sync and body fetch."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ImapConnectionPool()
+        return _default_pool
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import binascii
+import email
+import quopri
+from email.message import Message as EmailMessage
+from html.parser import HTMLParser
+
+# Text out of MIME pieces the connectors fetch without the rest of the
+# message: single body sections (BODYSTRUCTURE-guided fetch) and the first
+# bytes of a body (snippets).
+
+SNIPPET_CHARS = 200
+
+
+def decode_transfer(raw: bytes, encoding: str | None) -> bytes:
+    encoding = (encoding or "7bit").strip().lower()
+    if encoding == "base64":
+        clean = b"".join(raw.split())
+        try:
+            return binascii.a2b_base64(clean)
+        except binascii.Error:
+            # truncated or badly padded: decode the complete quads
+            return binascii.a2b_base64(clean[: len(clean) // 4 * 4])
+    if encoding == "quoted-printable":
+        return quopri.decodestring(raw)
+    return raw  # 7bit, 8bit, binary
+
+
+def decode_text(payload: bytes, charset: str | None) -> str:
+    try:
+        return payload.decode(charset or "utf-8", errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
+
+
+class _TextExtractor(HTMLParser):
+    SKIP = {"script", "style", "head", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return " ".join(" ".join(parser.parts).split())
+
+
+def normalize_snippet(text: str | None, max_chars: int = SNIPPET_CHARS) -> str | None:
+    """
+    One line of preview: whitespace collapsed, quoted replies ("> ...") and
+    a trailing half-decoded character dropped, cut at a word boundary.
+    """
+    if not text:
+        return None
+    lines = [ln for ln in text.splitlines() if not ln.lstrip().startswith(">")]
+    flat = " ".join(" ".join(lines).split()).rstrip("�").strip()
+    if len(flat) > max_chars:
+        cut = flat[:max_chars]
+        space = cut.rfind(" ")
+        flat = (cut[:space] if space > max_chars // 2 else cut).rstrip() + "…"
+    return flat or None
+
+
+def _leaf_text(part: EmailMessage) -> str:
+    raw = part.get_payload(decode=False)
+    if not isinstance(raw, str):
+        return ""
+    payload = decode_transfer(
+        raw.encode("ascii", errors="surrogateescape"), part.get("Content-Transfer-Encoding")
+    )
+    text = decode_text(payload, part.get_content_charset())
+    return html_to_text(text) if part.get_content_type() == "text/html" else text
+
+
+def snippet_from_partial(headers: EmailMessage, partial: bytes | None) -> str | None:
+    """
+    Preview from the first bytes of a body (BODY[TEXT]<0.N>), given the
+    message's Content-Type / Content-Transfer-Encoding headers. Multipart
+    bodies are parsed as far as they go: the first text/plain part wins,
+    else the first text/html one.
+    """
+    if not partial:
+        return None
+    head = "".join(f"{k}: {v}\r\n" for k, v in headers.items() if k.lower().startswith("content-"))
+    # the bytes parser keeps 8-bit payloads as surrogate escapes; _leaf_text undoes that
+    msg = email.message_from_bytes(head.encode("ascii", errors="replace") + b"\r\n" + partial)
+
+    plain = html = None
+    for part in msg.walk():
+        if part.is_multipart() or "attachment" in (part.get("Content-Disposition") or "").lower():
+            continue
+        ctype = part.get_content_type()
+        if ctype == "text/plain" and plain is None:
+            plain = part
+        elif ctype == "text/html" and html is None:
+            html = part
+    chosen = plain if plain is not None else html  # (a Message with no headers is falsy)
+    return normalize_snippet(_leaf_text(chosen)) if chosen is not None else None
@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TypeVar
+
+# Process-wide metrics: counters and histograms, each series labelled (by
+# account, IMAP command, sync phase...). Timers record seconds into a
+# histogram. Off unless MESSAGE_HUB_METRICS=1 or metrics().enable(): then
+# recording returns after one attribute check and timers are a shared no-op
+# context manager, so the hot paths stay instrumented at no real cost.
+#
+# Recorded (histograms in seconds):
+#   imap_connect_seconds                  TCP/TLS connect + greeting
+#   imap_command_seconds{command}         one command round trip: LOGIN, SELECT, UID FETCH...
+#   imap_reconnects_total                 pooled sessions found dead and replaced
+#   imap_body_bytes_total{kind}           body bytes downloaded ("fetched") / skipped ("saved")
+#   idle_events_total{event}              changes heard by the IDLE watcher: EXISTS, EXPUNGE...
+#   mime_parse_seconds{part}              parsing and decoding fetched headers / bodies
+#   sync_seconds{kind}                    one header / flags sync of a folder
+#   sync_phase_seconds{kind,phase}        its fetch, ingest (threading included), commit...
+#   sync_messages_total{result}           inserted / skipped / updated / vanished
+#   sync_failures_total{reason}           error / timeout (sync scheduler)
+#   db_write_seconds                      raw sqlite write transactions, lock wait included
+#   db_query_seconds{query}               list page, message, search... reads
+# Everything recorded inside `with metrics().scope(account=...)` (IMAP
+# sessions, syncs) also carries that account.
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+PROMETHEUS_PREFIX = "message_hub_"
+
+Labels = tuple[tuple[str, str], ...]  # sorted (name, value) pairs
+SeriesKey = tuple[str, Labels]
+F = TypeVar("F", bound=Callable)
+
+_scope: ContextVar[Labels] = ContextVar("metrics_scope", default=())
+_NULL_TIMER = nullcontext()
+
+
+_KEY_CACHE_MAX = 4096
+_key_cache: dict[tuple, SeriesKey] = {}
+
+
+def _key(name: str, labels: dict[str, object]) -> SeriesKey:
+    scoped = _scope.get()
+    if not labels:
+        return name, scoped
+    raw = (name, scoped, *labels.items())
+    key = _key_cache.get(raw)
+    if key is None:
+        merged = dict(scoped)
+        merged.update((k, str(v)) for k, v in labels.items() if v is not None)
+        key = name, tuple(sorted(merged.items()))
+        if len(_key_cache) >= _KEY_CACHE_MAX:
+            _key_cache.clear()
+        _key_cache[raw] = key
+    return key
+
+
+def _matches(series: Labels, wanted: dict[str, object]) -> bool:
+    have = dict(series)
+    return all(have.get(k) == str(v) for k, v in wanted.items())
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)  # per bucket, plus one for +Inf
+    count: int = 0
+    sum: float = 0.0
+    min: float = math.inf
+    max: float = 0.0
+    last: float = 0.0
+
+    def __post_init__(self):
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.last = value
+
+    def merge(self, other: Histogram) -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts, strict=False)]
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.last = other.last
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate from the buckets (upper bound of the bucket holding the
+        q-quantile, capped at the largest value seen).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts, strict=False):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        cumulative = 0
+        buckets = []
+        for bound, n in zip(self.buckets, self.counts, strict=False):
+            cumulative += n
+            buckets.append((bound, cumulative))
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.mean,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "last": self.last,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class _Timer:
+    __slots__ = ("_registry", "_key", "_t0")
+
+    def __init__(self, registry: MetricsRegistry, key: SeriesKey):
+        self._registry = registry
+        self._key = key
+
+    def __enter__(self) -> _Timer:
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._registry._observe(self._key, time.perf_counter() - self._t0)
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms keyed by (name, labels). Thread-safe; recording
+    is a no-op while disabled.
+    """
+
+    def __init__(self, enabled: bool = False, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[SeriesKey, float] = {}
+        self._histograms: dict[SeriesKey, Histogram] = {}
+
+    def enable(self, on: bool = True) -> None:
+        self.enabled = on
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # --------------------------
+    # Recording
+    # --------------------------
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if self.enabled:
+            self._observe(_key(name, labels), value)
+
+    def _observe(self, key: SeriesKey, value: float) -> None:
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(self.buckets)
+            hist.observe(value)
+
+    def timer(self, name: str, **labels):
+        """`with metrics().timer("x_seconds", ...):` records the block's duration."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, _key(name, labels))
+
+    @contextmanager
+    def scope(self, **labels) -> Iterator[None]:
+        """
+        Labels (e.g. account=...) added to everything recorded inside the
+        block, on this thread/task.
+        """
+        merged = dict(_scope.get())
+        merged.update((k, str(v)) for k, v in labels.items() if v is not None)
+        token = _scope.set(tuple(sorted(merged.items())))
+        try:
+            yield
+        finally:
+            _scope.reset(token)
+
+    # --------------------------
+    # Reading
+    # --------------------------
+    def total(self, name: str, **labels) -> float:
+        """Sum of counter `name` over the series carrying `labels`."""
+        with self._lock:
+            return sum(
+                v for (n, lbl), v in self._counters.items() if n == name and _matches(lbl, labels)
+            )
+
+    def histogram(self, name: str, **labels) -> Histogram | None:
+        """
+        Histogram `name` merged over the series carrying `labels` (None if
+        nothing was recorded).
+        """
+        out: Histogram | None = None
+        with self._lock:
+            for (n, lbl), hist in self._histograms.items():
+                if n != name or not _matches(lbl, labels):
+                    continue
+                if out is None:
+                    out = Histogram(hist.buckets)
+                out.merge(hist)
+        return out
+
+    def label_values(self, label: str) -> list[str]:
+        with self._lock:
+            keys = list(self._counters) + list(self._histograms)
+        return sorted({v for _, lbl in keys for k, v in lbl if k == label})
+
+    def snapshot(self) -> dict:
+        """
+        {"counters": {name: [{"labels", "value"}]},
+         "histograms": {name: [{"labels", "count", "sum", "mean", "p50", ...}]}}
+        """
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = [(key, hist.as_dict()) for key, hist in self._histograms.items()]
+        out: dict = {"enabled": self.enabled, "counters": {}, "histograms": {}}
+        for (name, labels), value in sorted(counters):
+            out["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), data in sorted(histograms, key=lambda kv: kv[0]):
+            out["histograms"].setdefault(name, []).append({"labels": dict(labels), **data})
+        return out
+
+    # --------------------------
+    # Prometheus text exposition
+    # --------------------------
+    def prometheus_text(self) -> str:
+        snap = self.snapshot()
+        lines: list[str] = []
+        for name, series in snap["counters"].items():
+            full = PROMETHEUS_PREFIX + name
+            lines.append(f"# TYPE {full} counter")
+            lines.extend(
+                f"{full}{_prom_labels(s['labels'])} {_prom_number(s['value'])}" for s in series
+            )
+        for name, series in snap["histograms"].items():
+            full = PROMETHEUS_PREFIX + name
+            lines.append(f"# TYPE {full} histogram")
+            for s in series:
+                for bound, cumulative in s["buckets"]:
+                    labels = _prom_labels(s["labels"], le=_prom_number(bound))
+                    lines.append(f"{full}_bucket{labels} {cumulative}")
+                lines.append(f"{full}_bucket{_prom_labels(s['labels'], le='+Inf')} {s['count']}")
+                lines.append(f"{full}_sum{_prom_labels(s['labels'])} {_prom_number(s['sum'])}")
+                lines.append(f"{full}_count{_prom_labels(s['labels'])} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path) -> None:
+        """
+        Write prometheus_text() to `path` atomically (for node_exporter's
+        textfile collector or anything else that scrapes the file).
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(self.prometheus_text(), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def _prom_labels(labels: dict[str, str], **extra: str) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in items.items()
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _prom_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+_REGISTRY = MetricsRegistry(enabled=os.getenv("MESSAGE_HUB_METRICS", "") not in ("", "0"))
+
+
+def metrics() -> MetricsRegistry:
+    """Process-wide registry used by the connectors, services and storage."""
+    return _REGISTRY
+
+
+def timed(name: str, **labels) -> Callable[[F], F]:
+    """Decorator form of metrics().timer(name, **labels)."""
+
+    def wrap(fn: F) -> F:
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            registry = _REGISTRY
+            if not registry.enabled:
+                return fn(*args, **kwargs)
+            with registry.timer(name, **labels):
+                return fn(*args, **kwargs)
+
+        return inner  # type: ignore[return-value]
+
+    return wrap
+
+
+def status_text(registry: MetricsRegistry, account: str | None = None) -> str:
+    """One line for the status bar: syncs and their phases, IMAP round trips, storage writes."""
+    acc = {"account": account} if account else {}
+    parts: list[str] = []
+
+    sync = registry.histogram("sync_seconds", kind="headers", **acc)
+    if sync:
+        phases = [
+            f"{phase} {hist.mean:.2f}"
+            for phase in ("fetch", "ingest", "commit")
+            if (
+                hist := registry.histogram("sync_phase_seconds", kind="headers", phase=phase, **acc)
+            )
+        ]
+        parts.append(f"sync {sync.count}× avg {sync.mean:.2f} s ({' · '.join(phases)})")
+        parts.append(f"{registry.total('sync_messages_total', result='inserted', **acc):.0f} new")
+    commands = registry.histogram("imap_command_seconds", **acc)
+    if commands:
+        parts.append(f"IMAP {commands.count} cmds, p90 {commands.quantile(0.9) * 1000:.0f} ms")
+    failures = registry.total("sync_failures_total", **acc)
+    if failures:
+        parts.append(f"{failures:.0f} failed")
+    writes = None if account else registry.histogram("db_write_seconds")
+    if writes:
+        parts.append(f"DB {writes.count} writes, p90 {writes.quantile(0.9) * 1000:.1f} ms")
+    return " | ".join(parts)
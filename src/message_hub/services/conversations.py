@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from message_hub.storage.models import Message, ThreadRef
+
+# Incremental conversation threading, after JWZ (https://www.jwz.org/doc/threading.html).
+#
+# JWZ builds an id table of containers: one per Message-ID, whether the
+# message itself has been seen or only referenced, linked along each
+# message's References. Persisted, that table is thread_map: every id an
+# account has seen -> the thread it belongs to. A new message therefore
+# needs only primary-key lookups of its own ids (batched per sync batch),
+# never a re-thread:
+# - none known: it starts a thread, named after its root (References[0]);
+# - one thread known: it joins it;
+# - several: it links threads that arrived apart (a reply before its parent
+#   with a broken References chain) and they are merged into the first.
+# All its ids are then registered, so later replies and late parents find it.
+#
+# JWZ's last step, grouping roots by subject, is left out: over a whole
+# mailbox it merges every unrelated "Re: hello".
+
+_MSG_ID = re.compile(r"<[^<>\s]+>")
+
+
+def message_ids(value) -> list[str]:
+    """All <msg-id>s in a Message-ID / In-Reply-To / References value."""
+    return _MSG_ID.findall(str(value)) if value else []
+
+
+def thread_keys(item: dict) -> list[str]:
+    """
+    Ids a header belongs under, root first: References (or, without them,
+    the first In-Reply-To id, as JWZ does), then the message's own id.
+    """
+    own = message_ids(item.get("message_id"))[:1]
+    refs = message_ids(item.get("references")) or message_ids(item.get("in_reply_to"))[:1]
+    # (a message can't reference itself)
+    return [k for k in dict.fromkeys(refs) if k not in own] + own
+
+
+def assign_threads(session: Session, account_id: int, items: Iterable[dict]) -> list[str | None]:
+    """
+    Thread id for each header dict (None without any Message-ID), updating
+    thread_map and merging threads as needed. Does not commit.
+    """
+    item_keys = [thread_keys(it) for it in items]
+    refs = list(dict.fromkeys(k for keys in item_keys for k in keys))
+    stored = _lookup(session, account_id, refs)
+    known = dict(stored)  # ref -> thread, as of the items handled so far
+    merged: dict[str, str] = {}  # thread -> thread it was merged into
+    assigned: list[str | None] = []
+
+    for keys in item_keys:
+        if not keys:
+            assigned.append(None)
+            continue
+        found = list(dict.fromkeys(known[k] for k in keys if k in known))
+        thread = found[0] if found else keys[0]
+        for other in found[1:]:
+            _merge(session, account_id, other, thread)
+            for tid, into in merged.items():
+                if into == other:
+                    merged[tid] = thread
+            merged[other] = thread
+            for ref, tid in known.items():
+                if tid == other:
+                    known[ref] = thread
+        for k in keys:
+            known.setdefault(k, thread)
+        assigned.append(thread)
+
+    new_refs = [
+        {"account_id": account_id, "ref": k, "thread_id": t}
+        for k, t in known.items()
+        if k not in stored
+    ]
+    if new_refs:
+        session.execute(sqlite_insert(ThreadRef).on_conflict_do_nothing(), new_refs)
+    return [merged.get(t, t) if t is not None else None for t in assigned]
+
+
+def _lookup(session: Session, account_id: int, refs: list[str]) -> dict[str, str]:
+    out: dict[str, str] = {}
+    for start in range(0, len(refs), 500):
+        rows = session.execute(
+            select(ThreadRef.ref, ThreadRef.thread_id).where(
+                ThreadRef.account_id == account_id, ThreadRef.ref.in_(refs[start : start + 500])
+            )
+        )
+        out.update((ref, tid) for ref, tid in rows)
+    return out
+
+
+def _merge(session: Session, account_id: int, old: str, new: str) -> None:
+    session.execute(
+        update(ThreadRef)
+        .where(ThreadRef.account_id == account_id, ThreadRef.thread_id == old)
+        .values(thread_id=new)
+        .execution_options(synchronize_session=False)
+    )
+    session.execute(
+        update(Message)
+        .where(Message.account_id == account_id, Message.thread_id == old)
+        .values(thread_id=new)
+        .execution_options(synchronize_session=False)
+    )
@@ -1,26 +1,24 @@
 from __future__ import annotations
 
 import datetime as dt
-from email.utils import parsedate_to_datetime
+import json
+import time
 
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import bindparam, delete, select, update
 from sqlalchemy.orm import Session
 
-from message_hub.connectors.imap_connector import ImapAccountConfig, fetch_latest_headers
-from message_hub.storage.models import Account, Folder, Message
-
-
-def _parse_date_to_utc(date_raw: str | None) -> dt.datetime | None:
-    if not date_raw:
-        return None
-    try:
-        d = parsedate_to_datetime(date_raw)
-        if d.tzinfo is None:
-            return d  # best effort
-        return d.astimezone(dt.timezone.utc).replace(tzinfo=None)
-    except Exception:
-        return None
+from message_hub.connectors.imap_connector import (
+    DEFAULT_FETCH_BATCH_SIZE,
+    ImapAccountConfig,
+    fetch_flag_changes,
+    fetch_new_headers,
+    mark_seen,
+)
+from message_hub.connectors.imap_parse import chunked
+from message_hub.metrics import metrics
+from message_hub.services.message_ingest import ingest_headers
+from message_hub.storage.changes import change_bus, commit_own
+from message_hub.storage.models import Account, Folder, Message, SyncState
 
 
 def get_or_create_account(session: Session, provider: str, email: str) -> Account:
@@ -30,7 +28,7 @@ def get_or_create_account(session: Session, provider: str, email: str) -> Accoun
         return acc
     acc = Account(provider=provider, email=email, display_name=None, auth_json=None)
     session.add(acc)
-    session.commit()
+    commit_own(session)
     session.refresh(acc)
     return acc
 
@@ -45,43 +43,275 @@ def get_or_create_folder(session: Session, account_id: int, provider_folder_id:
         return folder
     folder = Folder(account_id=account_id, provider_folder_id=provider_folder_id, name=name)
     session.add(folder)
-    session.commit()
+    commit_own(session)
     session.refresh(folder)
     return folder
 
 
-def sync_imap_headers(session: Session, cfg: ImapAccountConfig, limit: int = 30) -> dict:
+def get_sync_state(session: Session, account_id: int, folder_id: int) -> SyncState | None:
+    stmt = select(SyncState).where(
+        SyncState.account_id == account_id,
+        SyncState.folder_id == folder_id,
+    )
+    return session.execute(stmt).scalar_one_or_none()
+
+
+def load_cursor(state: SyncState | None) -> dict:
+    """
+    SyncState.cursor is a JSON object, e.g. {"uidvalidity": 1, "last_uid": 4021}.
+    """
+    if state is None or not state.cursor:
+        return {}
+    try:
+        data = json.loads(state.cursor)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def store_cursor(session: Session, account_id: int, folder_id: int, cursor: dict) -> None:
+    state = get_sync_state(session, account_id, folder_id)
+    if state is None:
+        state = SyncState(account_id=account_id, folder_id=folder_id)
+        session.add(state)
+    state.cursor = json.dumps(cursor, sort_keys=True)
+    state.last_sync_at = dt.datetime.utcnow()
+
+
+def sync_imap_headers(
+    session: Session,
+    cfg: ImapAccountConfig,
+    limit: int = 30,
+    batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+    connector=None,
+) -> dict:
+    """
+    Incremental header sync for one account/folder.
+
+    The first sync (or one after UIDVALIDITY changed) imports the latest `limit`
+    headers; later syncs fetch only UIDs above the stored high-water mark.
+    A quiet mailbox costs one STATUS round-trip and no DB writes.
+
+    `connector` does the IMAP side: imap_connector's functions by default, or
+    an aio_imap.EngineConnector to run on the asyncio engine.
+    """
+    registry = metrics()
+    with registry.scope(account=cfg.email), registry.timer("sync_seconds", kind="headers"):
+        return _sync_imap_headers(session, cfg, limit, batch_size, connector)
+
+
+def _sync_imap_headers(
+    session: Session, cfg: ImapAccountConfig, limit: int, batch_size: int, connector
+) -> dict:
+    registry = metrics()
     account = get_or_create_account(session, provider="imap", email=cfg.email)
     folder = get_or_create_folder(
         session, account_id=account.id, provider_folder_id=cfg.mailbox, name=cfg.mailbox
     )
+    cursor = load_cursor(get_sync_state(session, account.id, folder.id))
+
+    with registry.timer("sync_phase_seconds", kind="headers", phase="fetch"):
+        fetch = connector.fetch_new_headers if connector is not None else fetch_new_headers
+        res = fetch(
+            cfg,
+            last_uid=cursor.get("last_uid"),
+            uidvalidity=cursor.get("uidvalidity"),
+            limit=limit,
+            batch_size=batch_size,
+        )
+    items = res["items"]
+
+    full_resync = bool(res["full"] and cursor)
+    base = {} if full_resync else cursor  # a new UIDVALIDITY invalidates the stored mod-sequence
+    new_cursor = dict(base, uidvalidity=res["uidvalidity"], last_uid=res["last_uid"])
+    if not items and new_cursor == cursor:
+        return {"inserted": 0, "skipped": 0, "fetched": 0, "full_resync": False, "inserted_ids": []}
 
-    items = fetch_latest_headers(cfg, limit=limit)
-
-    inserted = 0
-    skipped = 0
-
-    for it in items:
-        msg = Message(
-            account_id=account.id,
-            folder_id=folder.id,
-            provider_msg_id=it["provider_msg_id"],
-            thread_id=None,
-            from_addr=it.get("from_addr"),
-            to_addrs=None,
-            subject=it.get("subject"),
-            snippet=None,
-            date_utc=_parse_date_to_utc(it.get("date_raw")),
-            body_text=None,
-            body_html=None,
-            is_read=bool(it.get("is_read", False)),  # ✅ FIX
+    with registry.timer("sync_phase_seconds", kind="headers", phase="ingest"):
+        if full_resync:
+            # UIDVALIDITY changed: every stored UID for this folder is meaningless now.
+            session.execute(
+                delete(Message).where(
+                    Message.account_id == account.id, Message.folder_id == folder.id
+                )
+            )
+
+        # Rows, resync delete and the advanced high-water mark commit together.
+        res_ingest = ingest_headers(session, account.id, folder.id, items)
+        store_cursor(session, account.id, folder.id, new_cursor)
+    with registry.timer("sync_phase_seconds", kind="headers", phase="commit"):
+        commit_own(session)
+    with registry.timer("sync_phase_seconds", kind="headers", phase="publish"):
+        change_bus().publish_messages(inserted=res_ingest["inserted_ids"], reset=full_resync)
+    registry.inc("sync_messages_total", res_ingest["inserted"], result="inserted")
+    registry.inc("sync_messages_total", res_ingest["skipped"], result="skipped")
+
+    return {
+        "inserted": res_ingest["inserted"],
+        "skipped": res_ingest["skipped"],
+        "fetched": len(items),
+        "full_resync": full_resync,
+        "inserted_ids": res_ingest["inserted_ids"],
+    }
+
+
+def _apply_flag_changes(
+    session: Session, changes: dict[int, bool], vanished_ids: list[int]
+) -> tuple[list[int], list[int]]:
+    """
+    Apply read-state changes and expunges in one transaction (caller commits).
+
+    `changes` maps message id -> new is_read and must only contain rows whose
+    is_read actually differs. Returns the (updated, deleted) message ids.
+    """
+    if changes:
+        stmt = (
+            update(Message)
+            .where(Message.id == bindparam("mid"))
+            .values(is_read=bindparam("read"))
+            .execution_options(synchronize_session=False)
         )
-        session.add(msg)
-        try:
-            session.commit()
-            inserted += 1
-        except IntegrityError:
-            session.rollback()
-            skipped += 1
-
-    return {"inserted": inserted, "skipped": skipped, "fetched": len(items)}
+        params = [{"mid": mid, "read": bool(read)} for mid, read in changes.items()]
+        session.connection().execute(stmt, params)
+
+    for chunk in chunked(sorted(vanished_ids), 500):
+        session.execute(
+            delete(Message).where(Message.id.in_(chunk)).execution_options(synchronize_session=False)
+        )
+    return list(changes), list(vanished_ids)
+
+
+def sync_imap_flags(
+    session: Session,
+    cfg: ImapAccountConfig,
+    scan_interval: float = 300.0,
+    batch_size: int = 500,
+    connector=None,
+) -> dict:
+    """
+    Pull read-state changes made on other clients into messages.is_read.
+
+    Reads made here that the server has not stored yet (`seen_pending`) are
+    pushed as \\Seen first; one the server refuses stays pending, and the
+    server's unread flag never overrides it.
+
+    Uses CONDSTORE/QRESYNC when the server has them: only changed flags cross
+    the wire and only the reported UIDs are read from the DB. Otherwise falls
+    back to a chunked FLAGS scan of the stored UIDs, at most once per
+    `scan_interval` seconds. Runs after sync_imap_headers, whose cursor it
+    extends with the folder's HIGHESTMODSEQ. `connector` as in sync_imap_headers.
+    """
+    registry = metrics()
+    with registry.scope(account=cfg.email), registry.timer("sync_seconds", kind="flags"):
+        return _sync_imap_flags(session, cfg, scan_interval, batch_size, connector)
+
+
+def _stored_flags(session: Session, in_folder: tuple, uids: list[int] | None = None) -> dict:
+    """uid -> (message id, is_read) for the folder's stored `uids` (all of them if None)."""
+    if uids is None:
+        chunks = [None]
+    else:
+        chunks = chunked(sorted({str(u) for u in uids}), 500)
+    known: dict[int, tuple[int, bool]] = {}
+    for chunk in chunks:
+        stmt = select(Message.id, Message.provider_msg_id, Message.is_read).where(*in_folder)
+        if chunk is not None:
+            stmt = stmt.where(Message.provider_msg_id.in_(chunk))
+        for mid, uid, is_read in session.execute(stmt):
+            if uid and uid.isdigit():
+                known[int(uid)] = (mid, bool(is_read))
+    return known
+
+
+def _sync_imap_flags(
+    session: Session, cfg: ImapAccountConfig, scan_interval: float, batch_size: int, connector
+) -> dict:
+    registry = metrics()
+    push = connector.mark_seen if connector is not None else mark_seen
+    fetch = connector.fetch_flag_changes if connector is not None else fetch_flag_changes
+    account = get_or_create_account(session, provider="imap", email=cfg.email)
+    folder = get_or_create_folder(
+        session, account_id=account.id, provider_folder_id=cfg.mailbox, name=cfg.mailbox
+    )
+    cursor = load_cursor(get_sync_state(session, account.id, folder.id))
+    if "uidvalidity" not in cursor:
+        return {"updated": 0, "vanished": 0, "mode": "no-cursor"}
+
+    in_folder = (Message.account_id == account.id, Message.folder_id == folder.id)
+    pending: dict[int, int] = {}  # uid -> message id of reads not yet stored on the server
+    pending_stmt = select(Message.id, Message.provider_msg_id).where(
+        *in_folder, Message.seen_pending.is_(True)
+    )
+    for mid, uid in session.execute(pending_stmt):
+        if uid and uid.isdigit():
+            pending[int(uid)] = mid
+
+    # With a stored mod-sequence the server reports exactly what changed, so
+    # only those rows are looked up; the FLAGS scan needs every stored UID.
+    delta = cursor.get("modseq") is not None
+    now = time.time()
+    allow_scan = not delta and now - float(cursor.get("flags_scanned_at", 0)) >= scan_interval
+    known: dict[int, tuple[int, bool]] | None = None  # uid -> (message id, is_read)
+    if allow_scan:
+        known = _stored_flags(session, in_folder)
+
+    unpushed = set(pending)
+    if pending:
+        with registry.timer("sync_phase_seconds", kind="flags", phase="push"):
+            try:
+                push(cfg, list(pending), batch_size=batch_size)
+            except RuntimeError:
+                pass  # refused (read-only mailbox...): keep the local reads, retry next sync
+            else:
+                unpushed.clear()
+    pushed = [mid for u, mid in pending.items() if u not in unpushed]
+
+    with registry.timer("sync_phase_seconds", kind="flags", phase="fetch"):
+        res = fetch(
+            cfg,
+            since_modseq=cursor.get("modseq"),
+            uidvalidity=cursor.get("uidvalidity"),
+            known_uids=list(known or ()),
+            allow_scan=allow_scan,
+            batch_size=batch_size,
+        )
+
+    new_cursor = dict(cursor)
+    if res["highestmodseq"] is not None and res["mode"] != "uidvalidity-changed":
+        new_cursor["modseq"] = res["highestmodseq"]
+    elif res["mode"] == "skipped":
+        new_cursor.pop("modseq", None)  # server stopped offering CONDSTORE: scan next time
+    if res["mode"] == "scan":
+        new_cursor["flags_scanned_at"] = now
+
+    if known is None:
+        known = _stored_flags(session, in_folder, [*res["changes"], *res["vanished"]])
+    vanished = [known[u][0] for u in res["vanished"] if u in known]
+    changes = {
+        known[u][0]: r
+        for u, r in res["changes"].items()
+        if u in known and known[u][1] != bool(r) and not (u in unpushed and not r)
+    }
+
+    updated_ids: list[int] = []
+    deleted_ids: list[int] = []
+    with registry.timer("sync_phase_seconds", kind="flags", phase="ingest"):
+        for chunk in chunked(pushed, 500):
+            session.execute(
+                update(Message)
+                .where(Message.id.in_(chunk))
+                .values(seen_pending=False)
+                .execution_options(synchronize_session=False)
+            )
+        if changes or vanished:
+            updated_ids, deleted_ids = _apply_flag_changes(session, changes, vanished)
+        if new_cursor != cursor:
+            store_cursor(session, account.id, folder.id, new_cursor)
+    if pushed or changes or vanished or new_cursor != cursor:
+        with registry.timer("sync_phase_seconds", kind="flags", phase="commit"):
+            commit_own(session)
+    change_bus().publish_messages(updated=updated_ids, deleted=deleted_ids)
+    registry.inc("sync_messages_total", len(updated_ids), result="updated")
+    registry.inc("sync_messages_total", len(deleted_ids), result="vanished")
+
+    return {"updated": len(updated_ids), "vanished": len(deleted_ids), "mode": res["mode"]}
@@ -1,64 +1,150 @@
 from __future__ import annotations
 
-import sqlite3
 from pathlib import Path
-from types import SimpleNamespace
-from typing import Any
 
+from message_hub.metrics import timed
+from message_hub.services.message_rows import (
+    BodyFetchTarget,
+    MessageDetailRow,
+    column_list,
+    target_row_factory,
+)
+from message_hub.storage.bodies import INSERT_BODY_SQL, body_row, decode_body
+from message_hub.storage.changes import change_bus
+from message_hub.storage.fts import INDEX_BODY_SQL, index_body_row
+from message_hub.storage.sqlite_conn import connection_manager
 
-def _connect(db_path: Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    return conn
+# Header part of MessageDetailRow; the body fields are filled from message_bodies.
+DETAIL_COLUMNS = column_list(
+    MessageDetailRow, prefix="m.", exclude=("has_body", "body_text", "body_html")
+)
 
 
-def get_message_sqlite(db_path: Path, message_id: int) -> Any | None:
+@timed("db_query_seconds", query="message")
+def get_message_sqlite(db_path: Path, message_id: int) -> MessageDetailRow | None:
+    """
+    One message with its body (decoded from message_bodies) for the reading pane.
+    `has_body` is False until the body was fetched; body_text/body_html may
+    both be None even when it was (no text parts).
+    """
     mid = int(message_id)
-    with _connect(db_path) as conn:
-        row = conn.execute("SELECT * FROM messages WHERE id = ?", (mid,)).fetchone()
-        if not row:
-            return None
-        return SimpleNamespace(**dict(row))
+    cur = connection_manager(db_path).read().cursor()
+    cur.row_factory = None
+    row = cur.execute(
+        f"""
+        SELECT {DETAIL_COLUMNS}, b.message_id IS NOT NULL,
+               b.text_z, b.text_codec, b.html_z, b.html_codec
+        FROM messages m
+        LEFT JOIN message_bodies b ON b.message_id = m.id
+        WHERE m.id = ?
+        """,
+        (mid,),
+    ).fetchone()
+    if not row:
+        return None
+    *head, is_read, has_body, text_z, text_codec, html_z, html_codec = row
+    return MessageDetailRow(
+        *head,
+        is_read=bool(is_read),
+        has_body=bool(has_body),
+        body_text=decode_body(text_z, text_codec),
+        body_html=decode_body(html_z, html_codec),
+    )
 
 
 def mark_read_sqlite(db_path: Path, message_id: int) -> None:
+    """
+    Mark a message read locally. It stays `seen_pending` until \\Seen is
+    stored on the server, so flag sync doesn't take the read back meanwhile.
+    """
     mid = int(message_id)
-    with _connect(db_path) as conn:
-        conn.execute("UPDATE messages SET is_read = 1 WHERE id = ?", (mid,))
-        conn.commit()
+    with connection_manager(db_path).write() as conn:
+        cur = conn.execute(
+            "UPDATE messages SET is_read = 1, seen_pending = 1 WHERE id = ? AND is_read = 0", (mid,)
+        )
+    if cur.rowcount:
+        change_bus().publish_messages(updated=(mid,))
+
+def clear_seen_pending_sqlite(db_path: Path, message_ids: list[int]) -> None:
+    """The server now has \\Seen for these messages (see mark_read_sqlite)."""
+    ids = [int(i) for i in message_ids]
+    with connection_manager(db_path).write() as conn:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            marks = ", ".join("?" * len(chunk))
+            conn.execute(
+                f"UPDATE messages SET seen_pending = 0 WHERE id IN ({marks}) AND seen_pending = 1",
+                chunk,
+            )
+
 
 def update_provider_msg_id_sqlite(db_path: Path, message_id: int, provider_msg_id: str) -> None:
     mid = int(message_id)
-    with _connect(db_path) as conn:
+    with connection_manager(db_path).write() as conn:
         conn.execute(
             "UPDATE messages SET provider_msg_id = ? WHERE id = ?",
             (str(provider_msg_id), mid),
         )
-        conn.commit()
 
 def get_account_email_sqlite(db_path: Path, message_id: int) -> str | None:
     """Get the account email for a message by joining with accounts table."""
     mid = int(message_id)
-    with _connect(db_path) as conn:
-        row = conn.execute(
-            """
-            SELECT a.email
-            FROM messages m
-            JOIN accounts a ON m.account_id = a.id
-            WHERE m.id = ?
-            """,
-            (mid,),
-        ).fetchone()
-        if not row:
-            return None
-        return row["email"]
+    row = connection_manager(db_path).read().execute(
+        """
+        SELECT a.email
+        FROM messages m
+        JOIN accounts a ON m.account_id = a.id
+        WHERE m.id = ?
+        """,
+        (mid,),
+    ).fetchone()
+    if not row:
+        return None
+    return row["email"]
 
 
 def save_body_sqlite(db_path: Path, message_id: int, body_text: str | None, body_html: str | None) -> None:
     mid = int(message_id)
-    with _connect(db_path) as conn:
-        conn.execute(
-            "UPDATE messages SET body_text = ?, body_html = ? WHERE id = ?",
-            (body_text, body_html, mid),
+    with connection_manager(db_path).write() as conn:
+        conn.execute(INSERT_BODY_SQL, body_row(mid, body_text, body_html))
+        conn.execute(INDEX_BODY_SQL, index_body_row(mid, body_text, body_html))
+
+
+def save_bodies_sqlite(db_path: Path, bodies: dict[int, tuple[str | None, str | None]]) -> None:
+    """Save many (body_text, body_html) pairs, keyed by message id, in one transaction."""
+    if not bodies:
+        return
+    with connection_manager(db_path).write() as conn:
+        conn.executemany(
+            INSERT_BODY_SQL, [body_row(mid, text, html) for mid, (text, html) in bodies.items()]
+        )
+        conn.executemany(
+            INDEX_BODY_SQL,
+            [index_body_row(mid, text, html) for mid, (text, html) in bodies.items()],
         )
-        conn.commit()
+
+
+def get_body_fetch_targets_sqlite(db_path: Path, message_ids: list[int]) -> list[BodyFetchTarget]:
+    """
+    For the given ids, the messages whose body was never fetched, with what
+    a fetch needs: id, provider_msg_id and the account email.
+    """
+    ids = [int(i) for i in message_ids]
+    cur = connection_manager(db_path).read().cursor()
+    cur.row_factory = target_row_factory
+    out: list[BodyFetchTarget] = []
+    for start in range(0, len(ids), 500):
+        chunk = ids[start : start + 500]
+        marks = ", ".join("?" * len(chunk))
+        rows = cur.execute(
+            f"""
+            SELECT m.id, m.provider_msg_id, a.email
+            FROM messages m
+            JOIN accounts a ON m.account_id = a.id
+            WHERE m.id IN ({marks})
+              AND NOT EXISTS (SELECT 1 FROM message_bodies b WHERE b.message_id = m.id)
+            """,
+            chunk,
+        ).fetchall()
+        out.extend(rows)
+    return out
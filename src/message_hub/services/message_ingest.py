@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import datetime as dt
+from collections.abc import Iterable
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from message_hub.connectors.header_decode import parse_dates
+from message_hub.metrics import metrics
+from message_hub.services.conversations import assign_threads
+from message_hub.storage.models import Message
+
+
+def header_rows(account_id: int, folder_id: int, items: Iterable[dict]) -> list[dict]:
+    """
+    Connector header dicts -> `messages` row dicts.
+    """
+    items = list(items)
+    dates = parse_dates(it.get("date_raw") for it in items)
+    now = dt.datetime.utcnow()
+    return [
+        {
+            "account_id": account_id,
+            "folder_id": folder_id,
+            "provider_msg_id": it["provider_msg_id"],
+            "thread_id": None,
+            "from_addr": it.get("from_addr"),
+            "to_addrs": None,
+            "subject": it.get("subject"),
+            "snippet": it.get("snippet"),
+            "date_utc": date_utc,
+            "is_read": bool(it.get("is_read", False)),
+            "created_at": now,
+        }
+        for it, date_utc in zip(items, dates, strict=True)
+    ]
+
+
+def ingest_headers(session: Session, account_id: int, folder_id: int, items: list[dict]) -> dict:
+    """
+    Insert a whole batch of headers with one INSERT ... ON CONFLICT DO NOTHING
+    (executemany), deduplicating against uq_messages_account_provider_msg_id.
+
+    Each row gets its thread_id from services.conversations on the way in.
+
+    Does not commit: the caller owns the transaction, so a sync writes its
+    rows and its cursor in a single commit.
+
+    Returns {"inserted", "skipped", "inserted_ids"}.
+    """
+    if not items:
+        return {"inserted": 0, "skipped": 0, "inserted_ids": []}
+
+    stmt = (
+        sqlite_insert(Message)
+        .on_conflict_do_nothing(index_elements=["account_id", "provider_msg_id"])
+        .returning(Message.id)
+    )
+    rows = header_rows(account_id, folder_id, items)
+    with metrics().timer("sync_phase_seconds", kind="headers", phase="threading"):
+        thread_ids = assign_threads(session, account_id, items)
+    for row, thread_id in zip(rows, thread_ids, strict=True):
+        row["thread_id"] = thread_id
+    inserted_ids = list(session.execute(stmt, rows).scalars())
+    return {
+        "inserted": len(inserted_ids),
+        "skipped": len(items) - len(inserted_ids),
+        "inserted_ids": inserted_ids,
+    }
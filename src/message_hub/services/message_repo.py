@@ -1,34 +1,134 @@
 from __future__ import annotations
 
-import sqlite3
-from types import SimpleNamespace
-from typing import Any
+from collections.abc import Iterable
 from pathlib import Path
+from typing import Any
+
+from message_hub.metrics import timed
+from message_hub.services.message_rows import LIST_COLUMNS, MessageListRow, list_row_factory
+from message_hub.storage.sqlite_conn import connection_manager
+
+# Inbox order is (COALESCE(date_utc, ''), created_at, id) descending: newest
+# first, undated messages last, id as the tie-breaker so the order is total.
+# A cursor is that key for the last row of the previous page. The expressions must match
+# INBOX_SORT_KEY in storage.models so SQLite can use the ix_messages_*inbox indexes.
+MessageCursor = tuple[str, str, int]
+
+INBOX_ORDER_BY = "COALESCE(date_utc, '') DESC, created_at DESC, id DESC"
+
+
+def cursor_for(msg: Any) -> MessageCursor:
+    """
+    Cursor pointing just past `msg` (a row returned by this module).
+    """
+    return (msg.date_utc or "", msg.created_at, msg.id)
+
+
+@timed("db_query_seconds", query="page")
+def get_messages_page_sqlite(
+    db_path: Path,
+    limit: int = 50,
+    after: MessageCursor | None = None,
+    account_id: int | None = None,
+    folder_id: int | None = None,
+    unread_only: bool = False,
+) -> list[MessageListRow]:
+    """
+    One page of the inbox in inbox order, optionally filtered.
+
+    Keyset pagination: pass `after=cursor_for(last_row)` to get the next page.
+    The seek is a row-value comparison on the sort key, so page N costs the
+    same as page 1 (no OFFSET scan).
+    """
+    where: list[str] = []
+    params: list[Any] = []
+    if after is not None:
+        # SQLite doesn't seek an index on a row-value comparison alone; the
+        # redundant bound on the leading column turns the scan into a range seek
+        where.append(
+            "COALESCE(date_utc, '') <= ? AND (COALESCE(date_utc, ''), created_at, id) < (?, ?, ?)"
+        )
+        params.extend((after[0] or "", after[0] or "", after[1], int(after[2])))
+    if account_id is not None:
+        where.append("account_id = ?")
+        params.append(int(account_id))
+    if folder_id is not None:
+        where.append("folder_id = ?")
+        params.append(int(folder_id))
+    if unread_only:
+        where.append("is_read = 0")
 
+    sql = f"SELECT {LIST_COLUMNS} FROM messages"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {INBOX_ORDER_BY} LIMIT ?"
+    params.append(int(limit))
 
-def _connect(db_path: Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    return conn
+    cur = connection_manager(db_path).read().cursor()
+    cur.row_factory = list_row_factory
+    return cur.execute(sql, params).fetchall()
 
 
-def get_latest_messages_sqlite(db_path: Path, limit: int = 50) -> list[Any]:
+@timed("db_query_seconds", query="by_ids")
+def get_messages_by_ids_sqlite(db_path: Path, message_ids: Iterable[int]) -> list[MessageListRow]:
+    """
+    Re-read specific rows (e.g. the ids of a change notification), in inbox order.
+    Ids that no longer exist are simply missing from the result.
+    """
+    ids = sorted({int(i) for i in message_ids})
+    cur = connection_manager(db_path).read().cursor()
+    cur.row_factory = list_row_factory
+    out: list[MessageListRow] = []
+    for start in range(0, len(ids), 500):
+        chunk = ids[start : start + 500]
+        marks = ", ".join("?" * len(chunk))
+        sql = f"SELECT {LIST_COLUMNS} FROM messages WHERE id IN ({marks})"
+        out.extend(cur.execute(sql, chunk).fetchall())
+    out.sort(key=cursor_for, reverse=True)
+    return out
+
+
+def get_unfetched_unread_ids_sqlite(db_path: Path, limit: int = 20) -> list[int]:
+    """
+    Ids of the newest unread messages whose body isn't cached yet (prefetch candidates).
+    """
+    cur = connection_manager(db_path).read().cursor()
+    cur.row_factory = None
+    rows = cur.execute(
+        f"""
+        SELECT id FROM messages
+        WHERE is_read = 0
+          AND NOT EXISTS (SELECT 1 FROM message_bodies b WHERE b.message_id = messages.id)
+        ORDER BY {INBOX_ORDER_BY}
+        LIMIT ?
+        """,
+        (int(limit),),
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+@timed("db_query_seconds", query="thread")
+def get_thread_messages_sqlite(
+    db_path: Path, account_id: int, thread_id: str
+) -> list[MessageListRow]:
+    """
+    All stored messages of one conversation, oldest first (ix_messages_thread).
+    """
+    # Left to itself the planner prefers ix_messages_account_inbox, which
+    # saves sorting a handful of rows by walking every message of the account.
+    cur = connection_manager(db_path).read().cursor()
+    cur.row_factory = list_row_factory
+    return cur.execute(
+        f"SELECT {LIST_COLUMNS} FROM messages INDEXED BY ix_messages_thread"
+        " WHERE account_id = ? AND thread_id = ? "
+        "ORDER BY COALESCE(date_utc, ''), created_at, id",
+        (account_id, thread_id),
+    ).fetchall()
+
+
+def get_latest_messages_sqlite(db_path: Path, limit: int = 50) -> list[MessageListRow]:
     """
     UI-safe message list (no SQLAlchemy).
-    Returns objects with dot-access (msg.subject, msg.date_utc, etc.).
-    """
-    with _connect(db_path) as conn:
-        rows = conn.execute(
-            """
-            SELECT *
-            FROM messages
-            ORDER BY
-                CASE WHEN date_utc IS NULL THEN 1 ELSE 0 END,
-                date_utc DESC,
-                created_at DESC
-            LIMIT ?
-            """,
-            (int(limit),),
-        ).fetchall()
-
-    return [SimpleNamespace(**dict(r)) for r in rows]
+    Returns MessageListRow objects (msg.subject, msg.date_utc, etc.).
+    """
+    return get_messages_page_sqlite(db_path, limit=limit)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass, fields
+
+# Read models for the UI. Each query selects exactly the columns of its row
+# type, in field order, and builds the row straight from the sqlite tuple:
+# no sqlite3.Row, no intermediate dict, no per-instance __dict__.
+
+
+@dataclass(slots=True)
+class MessageListRow:
+    """One inbox row (list view, change notifications)."""
+
+    id: int
+    account_id: int
+    folder_id: int
+    subject: str | None
+    from_addr: str | None
+    date_utc: str | None
+    created_at: str
+    is_read: bool
+    snippet: str | None
+    thread_id: str | None
+
+
+@dataclass(slots=True)
+class MessageDetailRow:
+    """One message for the reading pane, body decoded from message_bodies."""
+
+    id: int
+    account_id: int
+    provider_msg_id: str
+    subject: str | None
+    from_addr: str | None
+    date_utc: str | None
+    snippet: str | None
+    is_read: bool
+    has_body: bool
+    body_text: str | None = None
+    body_html: str | None = None
+
+
+@dataclass(slots=True)
+class BodyFetchTarget:
+    """What a body fetch needs to know about a message."""
+
+    id: int
+    provider_msg_id: str
+    email: str
+
+
+def column_list(row_type, prefix: str = "", exclude: tuple[str, ...] = ()) -> str:
+    """"id, subject, ..." for `row_type`'s fields, optionally table-qualified."""
+    return ", ".join(f"{prefix}{f.name}" for f in fields(row_type) if f.name not in exclude)
+
+
+LIST_COLUMNS = column_list(MessageListRow)
+
+
+def list_row_factory(cursor: sqlite3.Cursor, row: tuple) -> MessageListRow:
+    # LIST_COLUMNS order; only is_read (column 7) needs converting
+    return MessageListRow(*row[:7], bool(row[7]), *row[8:])
+
+
+def target_row_factory(cursor: sqlite3.Cursor, row: tuple) -> BodyFetchTarget:
+    return BodyFetchTarget(*row)
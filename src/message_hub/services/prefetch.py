@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from message_hub.connectors.imap_connector import ImapAccountConfig, fetch_bodies
+from message_hub.services.message_actions import get_body_fetch_targets_sqlite, save_bodies_sqlite
+from message_hub.services.message_repo import get_unfetched_unread_ids_sqlite
+from message_hub.storage.changes import MessageChange, change_bus
+
+AccountLookup = Callable[[str], ImapAccountConfig | None]
+# prefetched ids remembered for the hit rate; older ones simply count as misses
+PREFETCHED_KEPT = 10_000
+
+
+@dataclass
+class PrefetchPolicy:
+    top_unread: int = 20  # newest unread bodies to keep warm (0 = off)
+    neighbours: int = 2  # rows above/below the selection (0 = off)
+    new_messages: bool = True  # prefetch what a sync just inserted
+    batch_size: int = 20  # UIDs per UID FETCH
+    max_concurrency: int = 2  # batches in flight at once
+    max_bytes_per_minute: int = 20 * 1024 * 1024  # bandwidth budget
+    max_message_bytes: int | None = 2 * 1024 * 1024  # bigger messages stay lazy
+
+
+class _ByteBudget:
+    """Sliding one-minute window of downloaded bytes."""
+
+    def __init__(self, per_minute: int, window: float = 60.0):
+        self.per_minute = per_minute
+        self.window = window
+        self._spent: deque[tuple[float, int]] = deque()
+
+    def used(self) -> int:
+        cutoff = time.monotonic() - self.window
+        while self._spent and self._spent[0][0] < cutoff:
+            self._spent.popleft()
+        return sum(n for _, n in self._spent)
+
+    def available(self) -> bool:
+        return self.used() < self.per_minute
+
+    def spend(self, n: int) -> None:
+        self._spent.append((time.monotonic(), n))
+
+    def retry_in(self) -> float:
+        """Seconds until the oldest download leaves the window."""
+        self.used()
+        if not self._spent:
+            return 0.0
+        return max(0.0, self._spent[0][0] + self.window - time.monotonic())
+
+
+class BodyPrefetcher:
+    """
+    Background stage that fetches message bodies before they are opened.
+
+    Policies (see PrefetchPolicy) only *suggest* message ids; everything ends
+    up in one de-duplicated queue drained in batches of `batch_size` UIDs per
+    account, downloading only the text parts with `BODY.PEEK[n]` (prefetching
+    never marks mail read on the server). At most `max_concurrency` batches
+    run at once, and no new batch starts while the last minute's downloads
+    exceed `max_bytes_per_minute`: the queue then waits until the window has
+    room again.
+
+    `record_open()` feeds the hit-rate metric: the share of opened messages
+    whose body the prefetcher had already cached.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        account_for: AccountLookup,
+        policy: PrefetchPolicy | None = None,
+        fetch=fetch_bodies,
+    ):
+        self.db_path = db_path
+        self.account_for = account_for
+        self.policy = policy or PrefetchPolicy()
+        self._fetch = fetch
+        self._budget = _ByteBudget(self.policy.max_bytes_per_minute)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, self.policy.max_concurrency), thread_name_prefix="prefetch"
+        )
+        self._lock = threading.Lock()
+        self._queue: OrderedDict[int, None] = OrderedDict()
+        self._inflight: set[int] = set()
+        self._prefetched: OrderedDict[int, None] = OrderedDict()  # bounded, oldest first
+        self._retry: threading.Timer | None = None
+        self._active = 0
+        self._closed = False
+        self._unsubscribe: Callable[[], None] | None = None
+        self.counters = {
+            "fetched": 0,
+            "bytes": 0,
+            "bytes_saved": 0,  # attachments skipped thanks to BODYSTRUCTURE
+            "too_large": 0,
+            "deferred": 0,
+            "failed": 0,
+            "opens": 0,
+            "hits": 0,
+        }
+
+    # --------------------------
+    # Policies
+    # --------------------------
+    def start(self) -> None:
+        """Subscribe to new-message notifications (if the policy wants them)."""
+        if self.policy.new_messages and self._unsubscribe is None:
+            self._unsubscribe = change_bus().subscribe(self._on_change)
+
+    def _on_change(self, change: MessageChange) -> None:
+        if change.inserted:
+            self.prefetch(change.inserted)
+
+    def prefetch_top_unread(self) -> int:
+        if self.policy.top_unread <= 0:
+            return 0
+        return self.prefetch(
+            get_unfetched_unread_ids_sqlite(self.db_path, limit=self.policy.top_unread)
+        )
+
+    def prefetch_neighbours(self, ids_around_selection: Iterable[int]) -> int:
+        """Ids of the rows next to the selection, nearest first."""
+        if self.policy.neighbours <= 0:
+            return 0
+        return self.prefetch(ids_around_selection, front=True)
+
+    # --------------------------
+    # Queue
+    # --------------------------
+    def prefetch(self, message_ids: Iterable[int], front: bool = False) -> int:
+        """
+        Queue ids; front=True puts them ahead of everything else, in the given
+        order. Returns how many were not queued before.
+        """
+        ids = [int(mid) for mid in message_ids]
+        added = 0
+        with self._lock:
+            if self._closed:
+                return 0
+            for mid in reversed(ids) if front else ids:
+                if mid in self._inflight or mid in self._prefetched:
+                    continue
+                if mid not in self._queue:
+                    added += 1
+                    self._queue[mid] = None
+                if front:
+                    self._queue.move_to_end(mid, last=False)
+        self._pump()
+        return added
+
+    def _pump(self) -> None:
+        with self._lock:
+            while not self._closed and self._queue and self._active < self.policy.max_concurrency:
+                if not self._budget.available():
+                    self._defer()
+                    return
+                batch: list[int] = []
+                while self._queue and len(batch) < self.policy.batch_size:
+                    mid, _ = self._queue.popitem(last=False)
+                    batch.append(mid)
+                self._inflight.update(batch)
+                self._active += 1
+                self._executor.submit(self._run_batch, batch)
+
+    def _defer(self) -> None:
+        """Pump again once the budget window has room (caller holds the lock)."""
+        if self._retry is not None:
+            return
+        self.counters["deferred"] += len(self._queue)
+        self._retry = threading.Timer(self._budget.retry_in() + 0.05, self._retry_pump)
+        self._retry.daemon = True
+        self._retry.start()
+
+    def _retry_pump(self) -> None:
+        with self._lock:
+            self._retry = None
+        self._pump()
+
+    def _run_batch(self, batch: list[int]) -> None:
+        try:
+            by_account: dict[str, list] = {}
+            # get_body_fetch_targets_sqlite skips already-cached bodies
+            for t in get_body_fetch_targets_sqlite(self.db_path, batch):
+                if str(t.provider_msg_id or "").isdigit():
+                    by_account.setdefault(t.email, []).append(t)
+
+            for account_email, targets in by_account.items():
+                cfg = self.account_for(account_email)
+                if cfg is None:
+                    continue
+                try:
+                    self._fetch_for_account(cfg, targets)
+                except Exception:
+                    # best effort: the message is still fetched on open
+                    with self._lock:
+                        self.counters["failed"] += len(targets)
+        finally:
+            with self._lock:
+                self._inflight.difference_update(batch)
+                self._active -= 1
+            self._pump()
+
+    def _fetch_for_account(self, cfg: ImapAccountConfig, targets: list) -> None:
+        id_for_uid = {int(t.provider_msg_id): int(t.id) for t in targets}
+        res = self._fetch(
+            cfg,
+            list(id_for_uid),
+            max_size=self.policy.max_message_bytes,
+            batch_size=self.policy.batch_size,
+        )
+        bodies = {
+            id_for_uid[uid]: (b["body_text"], b["body_html"])
+            for uid, b in res["bodies"].items()
+            if uid in id_for_uid
+        }
+        save_bodies_sqlite(self.db_path, bodies)
+        with self._lock:
+            self._budget.spend(res["bytes"])
+            for mid in bodies:
+                self._prefetched[mid] = None
+                self._prefetched.move_to_end(mid)
+            while len(self._prefetched) > PREFETCHED_KEPT:
+                self._prefetched.popitem(last=False)
+            self.counters["fetched"] += len(bodies)
+            self.counters["bytes"] += res["bytes"]
+            self.counters["bytes_saved"] += res.get("bytes_saved", 0)
+            self.counters["too_large"] += len(res["too_large"])
+
+    # --------------------------
+    # Metrics
+    # --------------------------
+    def record_open(self, message_id: int, cached: bool) -> bool:
+        """
+        Call when the user opens a message; `cached` says whether its body was
+        already stored. Re-opening a message read before doesn't count either
+        way. Returns True on a prefetch hit.
+        """
+        mid = int(message_id)
+        with self._lock:
+            hit = mid in self._prefetched
+            self._prefetched.pop(mid, None)
+            if hit or not cached:
+                self.counters["opens"] += 1
+                self.counters["hits"] += int(hit)
+        return hit
+
+    def stats(self) -> dict:
+        with self._lock:
+            opens = self.counters["opens"]
+            return {
+                **self.counters,
+                "queued": len(self._queue),
+                "inflight": len(self._inflight),
+                "hit_rate": (self.counters["hits"] / opens) if opens else 0.0,
+                "bytes_last_minute": self._budget.used(),
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            self._closed = True
+            self._queue.clear()
+            if self._retry is not None:
+                self._retry.cancel()
+                self._retry = None
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        self._executor.shutdown(wait=wait, cancel_futures=True)
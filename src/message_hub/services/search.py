@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+from message_hub.metrics import timed
+from message_hub.services.message_rows import LIST_COLUMNS, MessageListRow, list_row_factory
+from message_hub.storage.sqlite_conn import connection_manager
+
+# bm25 column weights, in messages_fts column order: subject, from_addr, snippet, body
+SEARCH_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+_WEIGHTS = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+
+# Scoring every match of a common word costs ~2 ms per 1000 rows, so only the
+# newest RANK_WINDOW matches (by rowid, i.e. by arrival) are ranked.
+RANK_WINDOW = 5000
+
+_WORD = re.compile(r"\w", re.UNICODE)
+
+
+def fts_query(text: str) -> str | None:
+    """
+    User input -> FTS5 MATCH expression, or None if there is nothing to search.
+    Every word must match and the last one matches as a prefix (search as you
+    type). Words are quoted, so FTS5 operators or punctuation typed by the
+    user are searched for, never parsed.
+    """
+    words = [w for w in text.split() if _WORD.search(w)]
+    if not words:
+        return None
+    quoted = ['"' + w.replace('"', '""') + '"' for w in words]
+    if not text[-1:].isspace():
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+@timed("db_query_seconds", query="search")
+def search_messages_sqlite(
+    db_path: Path, text: str, limit: int = 50, offset: int = 0
+) -> list[MessageListRow]:
+    """
+    Messages matching `text` (subject, sender, snippet and cached bodies).
+    The newest RANK_WINDOW matches come first, best match first (bm25);
+    any older matches follow, newest first. Paginate with limit/offset.
+    """
+    match = fts_query(text)
+    if match is None:
+        return []
+    limit, offset = int(limit), int(offset)
+
+    cur = connection_manager(db_path).read().cursor()
+    cur.row_factory = None
+    cutoff = cur.execute(
+        "SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?"
+        " ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+        (match, RANK_WINDOW - 1),
+    ).fetchone()
+    cutoff = cutoff[0] if cutoff else 0  # 0: fewer matches than the window, rank them all
+
+    ids: list[int] = []
+    if offset < RANK_WINDOW or not cutoff:
+        ids += [
+            r[0]
+            for r in cur.execute(
+                f"""
+                SELECT rowid FROM messages_fts
+                WHERE messages_fts MATCH ? AND rowid >= ?
+                ORDER BY bm25(messages_fts, {_WEIGHTS}), rowid DESC
+                LIMIT ? OFFSET ?
+                """,
+                (match, cutoff, limit, offset),
+            )
+        ]
+    if cutoff and len(ids) < limit:
+        ids += [
+            r[0]
+            for r in cur.execute(
+                "SELECT rowid FROM messages_fts WHERE messages_fts MATCH ? AND rowid < ? "
+                "ORDER BY rowid DESC LIMIT ? OFFSET ?",
+                (match, cutoff, limit - len(ids), max(0, offset - RANK_WINDOW)),
+            )
+        ]
+    if not ids:
+        return []
+
+    cur.row_factory = list_row_factory
+    marks = ", ".join("?" * len(ids))
+    sql = f"SELECT {LIST_COLUMNS} FROM messages WHERE id IN ({marks})"
+    by_id = {m.id: m for m in cur.execute(sql, ids)}
+    return [by_id[i] for i in ids if i in by_id]
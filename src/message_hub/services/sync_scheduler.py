@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from message_hub.connectors.imap_connector import ImapAccountConfig
+from message_hub.metrics import metrics
+from message_hub.services.imap_sync import sync_imap_flags, sync_imap_headers
+
+SyncFn = Callable[[ImapAccountConfig], dict]
+
+
+@dataclass
+class _Backoff:
+    failures: int = 0
+    retry_at: float = 0.0
+    last_error: str | None = None
+
+
+class SyncScheduler:
+    """
+    Runs each account's sync on its own worker thread with its own session.
+
+    - at most `max_concurrency` accounts sync at the same time
+    - an account not done `timeout` seconds after the tick submitted it is
+      reported as timed out and no longer holds up the tick. If it is running,
+      its thread finishes on its own and the account is not resubmitted until
+      it does; if it is still queued behind busy workers (e.g. hung
+      stragglers), it is cancelled and simply submitted again next tick
+    - failing accounts are skipped with exponential backoff plus jitter
+      (`backoff_base` * 2^(failures-1), capped at `backoff_max`)
+    - one account's exception never aborts the others
+
+    A tick therefore takes as long as the slowest account, not the sum.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        max_concurrency: int = 4,
+        timeout: float = 120.0,
+        backoff_base: float = 5.0,
+        backoff_max: float = 600.0,
+        jitter: float = 0.2,
+        header_limit: int = 50,
+        sync_fn: SyncFn | None = None,
+        connector=None,
+    ):
+        if sync_fn is None and session_factory is None:
+            raise ValueError("SyncScheduler needs a session_factory or a sync_fn")
+        self.session_factory = session_factory
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.header_limit = header_limit
+        self.connector = connector  # None: imap_connector's threaded functions
+        self._sync_fn = sync_fn or self.sync_account
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="sync")
+        self._lock = threading.Lock()
+        self._backoff: dict[str, _Backoff] = {}
+        self._running: dict[str, Future] = {}
+
+    # --------------------------
+    # Per-account work
+    # --------------------------
+    def sync_account(self, cfg: ImapAccountConfig) -> dict:
+        """Header sync + flag sync for one account, on a session of its own."""
+        with self.session_factory() as session:
+            stats = sync_imap_headers(
+                session, cfg, limit=self.header_limit, connector=self.connector
+            )
+            flags = sync_imap_flags(session, cfg, connector=self.connector)
+        stats["updated"] = flags["updated"] + flags["vanished"]
+        return stats
+
+    # --------------------------
+    # Scheduling
+    # --------------------------
+    def run_once(self, accounts: list[ImapAccountConfig], force: bool = False) -> dict:
+        """
+        Sync `accounts` concurrently and block until each finished or timed out.
+        Accounts in backoff are skipped unless `force` is set.
+
+        Returns aggregated counters plus a per-account breakdown under "accounts".
+        """
+        t0 = time.monotonic()
+        total = {
+            "fetched": 0,
+            "inserted": 0,
+            "skipped": 0,
+            "updated": 0,
+            "inserted_ids": [],
+            "accounts": {},
+            "failed": [],
+            "timed_out": [],
+            "backed_off": [],
+        }
+
+        submitted: dict[str, float] = {}
+        pending: dict[Future, ImapAccountConfig] = {}
+        now = time.monotonic()
+        with self._lock:
+            for cfg in accounts:
+                if cfg.email in self._running:
+                    continue  # still busy (possibly a timed-out straggler)
+                bo = self._backoff.get(cfg.email)
+                if bo and not force and now < bo.retry_at:
+                    total["backed_off"].append(cfg.email)
+                    continue
+                submitted[cfg.email] = now
+                fut = self._executor.submit(self._run_account, cfg)
+                self._running[cfg.email] = fut
+                pending[fut] = cfg
+
+        while pending:
+            timeout = self._next_wait(pending, submitted)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                cfg = pending.pop(fut)
+                self._record(total, cfg, fut, submitted)
+            now = time.monotonic()
+            for fut, cfg in list(pending.items()):
+                elapsed = now - submitted[cfg.email]
+                if elapsed <= self.timeout:
+                    continue
+                pending.pop(fut)
+                total["timed_out"].append(cfg.email)
+                if fut.cancel():
+                    # never got a worker: not the account's fault, so no backoff
+                    with self._lock:
+                        self._running.pop(cfg.email, None)
+                    total["accounts"][cfg.email] = {
+                        "ok": False,
+                        "error": "timeout (queued)",
+                        "elapsed": elapsed,
+                    }
+                    continue
+                total["accounts"][cfg.email] = {"ok": False, "error": "timeout", "elapsed": elapsed}
+                self._note_failure(cfg.email, "timeout")
+
+        total["elapsed"] = time.monotonic() - t0
+        return total
+
+    def _run_account(self, cfg: ImapAccountConfig) -> dict:
+        try:
+            return self._sync_fn(cfg)
+        finally:
+            with self._lock:
+                self._running.pop(cfg.email, None)
+
+    def _next_wait(
+        self, pending: dict[Future, ImapAccountConfig], submitted: dict[str, float]
+    ) -> float:
+        now = time.monotonic()
+        return max(0.01, min(submitted[cfg.email] + self.timeout - now for cfg in pending.values()))
+
+    def _record(
+        self, total: dict, cfg: ImapAccountConfig, fut: Future, submitted: dict[str, float]
+    ) -> None:
+        elapsed = time.monotonic() - submitted[cfg.email]
+        err = fut.exception()
+        if err is not None:
+            total["failed"].append(cfg.email)
+            total["accounts"][cfg.email] = {"ok": False, "error": repr(err), "elapsed": elapsed}
+            self._note_failure(cfg.email, repr(err))
+            return
+
+        stats = fut.result() or {}
+        with self._lock:
+            self._backoff.pop(cfg.email, None)
+        for key in ("fetched", "inserted", "skipped", "updated"):
+            total[key] += int(stats.get(key, 0))
+        total["inserted_ids"].extend(stats.get("inserted_ids", ()))
+        total["accounts"][cfg.email] = {
+            "ok": True,
+            "elapsed": elapsed,
+            **{k: v for k, v in stats.items() if k != "inserted_ids"},
+        }
+
+    def _note_failure(self, email: str, error: str) -> None:
+        metrics().inc(
+            "sync_failures_total",
+            account=email,
+            reason="timeout" if error == "timeout" else "error",
+        )
+        with self._lock:
+            bo = self._backoff.setdefault(email, _Backoff())
+            bo.failures += 1
+            bo.last_error = error
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (bo.failures - 1))
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+            bo.retry_at = time.monotonic() + delay
+
+    def backoff_state(self) -> dict[str, dict]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                email: {
+                    "failures": bo.failures,
+                    "retry_in": max(0.0, bo.retry_at - now),
+                    "last_error": bo.last_error,
+                }
+                for email, bo in self._backoff.items()
+            }
+
+    def forget(self, email: str) -> None:
+        """Drop backoff state, e.g. after the user re-entered credentials."""
+        with self._lock:
+            self._backoff.pop(email, None)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import zlib
+
+# Codecs stored in message_bodies.codec. Tiny bodies often grow under zlib,
+# so each row keeps whichever encoding is smaller.
+CODEC_ZLIB = "zlib"
+CODEC_RAW = "raw"
+
+ZLIB_LEVEL = 6
+
+
+def encode_body(value: str | None) -> tuple[bytes | None, str]:
+    """
+    str -> (blob, codec). None stays None (no text/html part).
+    """
+    if value is None:
+        return None, CODEC_RAW
+    raw = value.encode("utf-8")
+    packed = zlib.compress(raw, ZLIB_LEVEL)
+    if len(packed) < len(raw):
+        return packed, CODEC_ZLIB
+    return raw, CODEC_RAW
+
+
+def decode_body(blob: bytes | None, codec: str) -> str | None:
+    if blob is None:
+        return None
+    if codec == CODEC_ZLIB:
+        blob = zlib.decompress(blob)
+    elif codec != CODEC_RAW:
+        raise ValueError(f"Unknown body codec {codec!r}")
+    return bytes(blob).decode("utf-8")
+
+
+def body_row(message_id: int, body_text: str | None, body_html: str | None) -> tuple:
+    """
+    Parameters for INSERT_BODY_SQL.
+    """
+    text_blob, text_codec = encode_body(body_text)
+    html_blob, html_codec = encode_body(body_html)
+    size = sum(len(v.encode("utf-8")) for v in (body_text, body_html) if v is not None)
+    return int(message_id), text_blob, text_codec, html_blob, html_codec, size
+
+
+INSERT_BODY_SQL = """
+    INSERT OR REPLACE INTO message_bodies
+        (message_id, text_z, text_codec, html_z, html_codec, raw_size)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# A body is dropped with its message (SQLite only enforces FK cascades with
+# PRAGMA foreign_keys, which this app does not turn on).
+DELETE_TRIGGER_SQL = """
+    CREATE TRIGGER IF NOT EXISTS messages_ad_bodies AFTER DELETE ON messages
+    BEGIN
+        DELETE FROM message_bodies WHERE message_id = old.id;
+    END
+"""
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from message_hub.storage.sqlite_conn import connection_manager, existing_manager
+
+
+@dataclass(frozen=True)
+class MessageChange:
+    """
+    What a committed write did to `messages`.
+
+    `reset` means "too much to list" (e.g. a UIDVALIDITY resync wiped a
+    folder): listeners should reload instead of patching rows.
+    """
+
+    inserted: tuple[int, ...] = ()
+    updated: tuple[int, ...] = ()
+    deleted: tuple[int, ...] = ()
+    reset: bool = False
+
+    def __bool__(self) -> bool:
+        return bool(self.inserted or self.updated or self.deleted or self.reset)
+
+
+ChangeListener = Callable[[MessageChange], None]
+
+
+class ChangeBus:
+    """
+    In-process publish/subscribe for committed message changes.
+
+    Writers publish *after* their commit, so a listener that re-queries the
+    ids sees the new rows. Listeners run synchronously on the publishing
+    thread (usually a sync worker): hand off to your own thread, don't block.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: list[ChangeListener] = []
+        self.published = 0
+
+    def subscribe(self, listener: ChangeListener) -> Callable[[], None]:
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        return unsubscribe
+
+    def publish(self, change: MessageChange) -> None:
+        if not change:
+            return
+        with self._lock:
+            listeners = list(self._listeners)
+            self.published += 1
+        for listener in listeners:
+            try:
+                listener(change)
+            except Exception:
+                pass  # a broken listener must not fail the write that published
+
+    def publish_messages(
+        self,
+        inserted: Iterable[int] = (),
+        updated: Iterable[int] = (),
+        deleted: Iterable[int] = (),
+        reset: bool = False,
+    ) -> None:
+        self.publish(
+            MessageChange(
+                inserted=tuple(int(i) for i in inserted),
+                updated=tuple(int(i) for i in updated),
+                deleted=tuple(int(i) for i in deleted),
+                reset=reset,
+            )
+        )
+
+
+_BUS = ChangeBus()
+
+
+def change_bus() -> ChangeBus:
+    """Process-wide bus shared by the sync services and the UI."""
+    return _BUS
+
+
+def commit_own(session: Session) -> None:
+    """
+    Commit a sync session. Its data_version bump is recorded (see
+    SqliteConnectionManager.own_commit), so DataVersionWatcher doesn't take
+    the write for another process's; listeners hear about it on the bus.
+    """
+    db = session.get_bind().url.database
+    manager = existing_manager(Path(db)) if db and db != ":memory:" else None
+    if manager is None:
+        session.commit()  # nobody watches this file's data_version
+        return
+    with manager.own_commit():
+        session.commit()
+
+
+class DataVersionWatcher:
+    """
+    Detects commits made by other processes (e.g. the sync CLI) without
+    reading any table. PRAGMA data_version is read on the shared writer (see
+    SqliteConnectionManager.data_version), so this process's writes through
+    it (marks, body saves) don't count, and sync sessions commit with
+    commit_own() so theirs are skipped too.
+    """
+
+    def __init__(self, db_path: Path):
+        self._manager = connection_manager(db_path)
+        self._version = self._manager.data_version()
+
+    def changed(self) -> bool:
+        """True if another process committed anything since the last call."""
+        self._version, changed = self._manager.changed_since(self._version)
+        return changed
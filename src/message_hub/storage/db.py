@@ -4,10 +4,12 @@ import os
 from dataclasses import dataclass
 from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
+from message_hub.storage.sqlite_conn import apply_pragmas
+
 DEFAULT_APP_DIR = Path(os.getenv("MESSAGE_HUB_HOME", str(Path.home() / ".message_hub")))
 DEFAULT_DB_PATH = DEFAULT_APP_DIR / "message_hub.sqlite"
 
@@ -27,9 +29,12 @@ def ensure_parent_dir(db_path: Path) -> None:
 
 def make_engine(cfg: DatabaseConfig) -> Engine:
     ensure_parent_dir(cfg.db_path)
-    return create_engine(cfg.url,
+    engine = create_engine(cfg.url,
     query_cache_size=0,
      future=True)
+    # same WAL/synchronous/cache settings as the raw sqlite3 helpers use
+    event.listen(engine, "connect", lambda dbapi_conn, _record: apply_pragmas(dbapi_conn))
+    return engine
 
 
 def make_session_factory(engine: Engine):
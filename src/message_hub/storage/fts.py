@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from message_hub.connectors.mime_text import html_to_text
+
+# Full-text index over the inbox (SQLite FTS5), one row per message with
+# rowid = messages.id. Header columns are kept in sync by triggers on
+# messages; the body column is filled whenever a body is saved, since
+# message_bodies only holds compressed blobs the triggers can't read.
+
+# prefix='2 3' keeps short search-as-you-type prefixes on the index
+CREATE_FTS_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        subject, from_addr, snippet, body,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+"""
+
+FTS_TRIGGERS_SQL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_ai_fts AFTER INSERT ON messages
+    BEGIN
+        INSERT INTO messages_fts (rowid, subject, from_addr, snippet)
+        VALUES (new.id, new.subject, new.from_addr, new.snippet);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_au_fts
+    AFTER UPDATE OF subject, from_addr, snippet ON messages
+    BEGIN
+        UPDATE messages_fts
+        SET subject = new.subject, from_addr = new.from_addr, snippet = new.snippet
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_ad_fts AFTER DELETE ON messages
+    BEGIN
+        DELETE FROM messages_fts WHERE rowid = old.id;
+    END
+    """,
+)
+
+INDEX_BODY_SQL = "UPDATE messages_fts SET body = ? WHERE rowid = ?"
+
+# Enough for any real text part; keeps huge newsletters from bloating the index.
+MAX_INDEXED_BODY_CHARS = 64 * 1024
+
+
+def body_search_text(body_text: str | None, body_html: str | None) -> str | None:
+    """
+    What gets indexed for a body: the text part, else the HTML part's text.
+    """
+    text = body_text if body_text and body_text.strip() else None
+    if text is None and body_html:
+        text = html_to_text(body_html)
+    return text[:MAX_INDEXED_BODY_CHARS] if text else None
+
+
+def index_body_row(message_id: int, body_text: str | None, body_html: str | None) -> tuple:
+    """
+    Parameters for INDEX_BODY_SQL.
+    """
+    return body_search_text(body_text, body_html), int(message_id)
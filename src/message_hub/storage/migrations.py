@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from message_hub.storage.bodies import DELETE_TRIGGER_SQL, INSERT_BODY_SQL, body_row, decode_body
+from message_hub.storage.fts import CREATE_FTS_SQL, FTS_TRIGGERS_SQL, INDEX_BODY_SQL, index_body_row
+from message_hub.storage.models import Base, Message, MessageBody, ThreadRef
+
+# Schema versioning for the local SQLite database.
+#
+# The applied version lives in PRAGMA user_version and is bumped right after
+# each step. A crash between the two (sqlite3 autocommits DDL) leaves the old
+# version behind and the step simply runs again on the next start.
+#
+# Step 1 also creates any missing tables from the current models, so a fresh
+# database may already contain what a later step adds. Every step must
+# therefore be idempotent (create ... if missing, add a column only if absent).
+
+# A step may return True to ask for a VACUUM once all steps are done.
+Migration = Callable[[Connection], "bool | None"]
+
+
+def _create_tables(conn: Connection) -> None:
+    Base.metadata.create_all(conn)
+
+
+def _create_message_indexes(conn: Connection) -> None:
+    for index in Message.__table__.indexes:
+        if not has_index(conn, index.name):
+            index.create(conn)
+
+
+def _move_bodies_out(conn: Connection) -> bool:
+    MessageBody.__table__.create(conn, checkfirst=True)
+    conn.exec_driver_sql(DELETE_TRIGGER_SQL)
+    if not has_column(conn, "messages", "body_text"):
+        return False
+
+    # ids first, then bodies in chunks: only one chunk of bodies is in memory at a time
+    ids = conn.exec_driver_sql(
+        "SELECT id FROM messages WHERE body_text IS NOT NULL OR body_html IS NOT NULL ORDER BY id"
+    ).scalars().all()
+    for start in range(0, len(ids), 500):
+        chunk = ids[start : start + 500]
+        marks = ", ".join("?" * len(chunk))
+        rows = conn.exec_driver_sql(
+            f"SELECT id, body_text, body_html FROM messages WHERE id IN ({marks})", tuple(chunk)
+        ).all()
+        conn.exec_driver_sql(
+            INSERT_BODY_SQL, [body_row(mid, text, html) for mid, text, html in rows]
+        )
+
+    try:
+        conn.exec_driver_sql("ALTER TABLE messages DROP COLUMN body_text")
+        conn.exec_driver_sql("ALTER TABLE messages DROP COLUMN body_html")
+    except Exception:
+        # SQLite < 3.35 has no DROP COLUMN: leave the columns, but empty
+        conn.exec_driver_sql("UPDATE messages SET body_text = NULL, body_html = NULL")
+    return bool(ids)
+
+
+def _create_search_index(conn: Connection) -> None:
+    conn.exec_driver_sql(CREATE_FTS_SQL)
+    for trigger in FTS_TRIGGERS_SQL:
+        conn.exec_driver_sql(trigger)
+
+    # (re)build from scratch, so a half-done earlier run is harmless
+    conn.exec_driver_sql("DELETE FROM messages_fts")
+    conn.exec_driver_sql(
+        "INSERT INTO messages_fts (rowid, subject, from_addr, snippet) "
+        "SELECT id, subject, from_addr, snippet FROM messages"
+    )
+    sql = "SELECT message_id FROM message_bodies ORDER BY message_id"
+    ids = conn.exec_driver_sql(sql).scalars().all()
+    for start in range(0, len(ids), 500):
+        chunk = ids[start : start + 500]
+        marks = ", ".join("?" * len(chunk))
+        rows = conn.exec_driver_sql(
+            "SELECT message_id, text_z, text_codec, html_z, html_codec FROM message_bodies"
+            f" WHERE message_id IN ({marks})",
+            tuple(chunk),
+        ).all()
+        conn.exec_driver_sql(
+            INDEX_BODY_SQL,
+            [
+                index_body_row(
+                    mid, decode_body(text_z, text_codec), decode_body(html_z, html_codec)
+                )
+                for mid, text_z, text_codec, html_z, html_codec in rows
+            ],
+        )
+
+
+def _create_thread_index(conn: Connection) -> None:
+    # existing rows carry no Message-ID, so they stay unthreaded (thread_id NULL)
+    ThreadRef.__table__.create(conn, checkfirst=True)
+    _create_message_indexes(conn)
+
+
+def _add_seen_pending(conn: Connection) -> None:
+    if not has_column(conn, "messages", "seen_pending"):
+        conn.exec_driver_sql(
+            "ALTER TABLE messages ADD COLUMN seen_pending BOOLEAN NOT NULL DEFAULT 0"
+        )
+
+
+MIGRATIONS: list[tuple[int, str, Migration]] = [
+    (1, "create tables", _create_tables),
+    (2, "inbox sort-key and filter indexes", _create_message_indexes),
+    (3, "compressed message_bodies table", _move_bodies_out),
+    (4, "full-text search index", _create_search_index),
+    (5, "conversation threading index", _create_thread_index),
+    (6, "pending read marker", _add_seen_pending),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def has_index(conn: Connection, name: str) -> bool:
+    # sqlite_master rather than inspect(): SQLAlchemy can't reflect expression indexes
+    row = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :n"), {"n": name}
+    )
+    return row.first() is not None
+
+
+def get_schema_version(conn: Connection) -> int:
+    return int(conn.exec_driver_sql("PRAGMA user_version").scalar() or 0)
+
+
+def ensure_schema(engine: Engine) -> dict:
+    """
+    Bring the database up to LATEST_VERSION. Safe to call on every start.
+
+    Returns {"from_version", "to_version", "applied": [names]}.
+    Raises RuntimeError if the database was written by a newer schema.
+    """
+    with engine.connect() as conn:
+        start = get_schema_version(conn)
+    if start > LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema version {start} is newer than this app supports ({LATEST_VERSION})"
+        )
+
+    applied: list[str] = []
+    vacuum = False
+    for version, name, step in MIGRATIONS:
+        if version <= start:
+            continue
+        with engine.begin() as conn:
+            vacuum = bool(step(conn)) or vacuum
+            # PRAGMA takes no bound parameters; version is our own int
+            conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+        applied.append(name)
+
+    if vacuum:
+        # give the space of moved data back to the filesystem (can't run inside a transaction)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+
+    return {"from_version": start, "to_version": max(start, LATEST_VERSION), "applied": applied}
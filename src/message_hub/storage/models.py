@@ -2,7 +2,20 @@ from __future__ import annotations
 
 import datetime as dt
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+    false,
+    func,
+    literal_column,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -59,10 +72,9 @@ class Message(Base):
 
     date_utc: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
 
-    body_text: Mapped[str | None] = mapped_column(Text, nullable=True)
-    body_html: Mapped[str | None] = mapped_column(Text, nullable=True)
-
     is_read: Mapped[bool] = mapped_column(Boolean, default=False)
+    # read here, \Seen not yet stored on the server (pushed by sync_imap_flags)
+    seen_pending: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false())
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=lambda: dt.datetime.utcnow())
 
     account: Mapped["Account"] = relationship(back_populates="messages")
@@ -71,6 +83,59 @@ class Message(Base):
     __table_args__ = (UniqueConstraint("account_id", "provider_msg_id", name="uq_messages_account_provider_msg_id"),)
 
 
+# Inbox sort key (see services.message_repo): newest first, undated last, id breaks ties.
+# SQLite walks these indexes backwards for the DESC order, so list pages and the
+# "newest message" probe are index seeks instead of a scan + sort.
+INBOX_SORT_KEY = (
+    func.coalesce(Message.date_utc, literal_column("''")),
+    Message.created_at,
+    Message.id,
+)
+
+Index("ix_messages_inbox", *INBOX_SORT_KEY)
+Index("ix_messages_account_inbox", Message.account_id, *INBOX_SORT_KEY)
+Index("ix_messages_folder_inbox", Message.folder_id, *INBOX_SORT_KEY)
+Index("ix_messages_unread_inbox", *INBOX_SORT_KEY, sqlite_where=Message.is_read == false())
+Index("ix_messages_thread", Message.account_id, Message.thread_id)
+
+
+class MessageBody(Base):
+    """
+    Fetched bodies, kept out of `messages` so list queries stay narrow.
+    Blobs are encoded per storage.bodies (zlib or raw UTF-8). A row means
+    "fetched" even when both parts are NULL (a message without text parts).
+    """
+
+    __tablename__ = "message_bodies"
+
+    message_id: Mapped[int] = mapped_column(
+        ForeignKey("messages.id", ondelete="CASCADE"), primary_key=True
+    )
+    text_z: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    text_codec: Mapped[str] = mapped_column(String(16), default="raw")
+    html_z: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    html_codec: Mapped[str] = mapped_column(String(16), default="raw")
+    raw_size: Mapped[int] = mapped_column(Integer, default=0)  # uncompressed bytes, text + html
+
+
+class ThreadRef(Base):
+    """
+    Conversation index (see services.conversations): every Message-ID seen
+    in an account, as a message's own id or in its References/In-Reply-To,
+    mapped to the thread it belongs to.
+    """
+
+    __tablename__ = "thread_map"
+
+    account_id: Mapped[int] = mapped_column(
+        ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True
+    )
+    ref: Mapped[str] = mapped_column(String(512), primary_key=True)  # "<local@domain>"
+    thread_id: Mapped[str] = mapped_column(String(256))
+
+    __table_args__ = (Index("ix_thread_map_thread", "account_id", "thread_id"),)
+
+
 class SyncState(Base):
     __tablename__ = "sync_state"
 
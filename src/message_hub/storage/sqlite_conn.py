@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import weakref
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from message_hub.metrics import metrics
+
+# Applied to every connection: ours and the SQLAlchemy engine's (see storage.db).
+# WAL lets readers run while the sync writer holds its transaction open;
+# synchronous=NORMAL is durable across app crashes in WAL mode and only risks
+# the last transactions on power loss.
+PRAGMAS: tuple[tuple[str, object], ...] = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("busy_timeout", 5000),  # ms to wait for the write lock instead of failing
+    ("cache_size", -16000),  # KiB (negative) -> ~16 MB page cache per connection
+    ("mmap_size", 256 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+)
+
+CACHED_STATEMENTS = 256
+OWN_COMMITS_KEPT = 64  # own_commit() steps remembered for changed_since()
+
+
+def apply_pragmas(conn) -> None:
+    """
+    Apply PRAGMAS to a DB-API sqlite3 connection.
+    """
+    cur = conn.cursor()
+    try:
+        for name, value in PRAGMAS:
+            cur.execute(f"PRAGMA {name} = {value}")
+            if name == "journal_mode":
+                cur.fetchall()  # returns the new mode as a row
+    finally:
+        cur.close()
+
+
+class _Reader:
+    """
+    A thread's reader, kept in the manager's threading.local. Python drops a
+    thread's locals when its thread state goes away, which also happens for
+    threads it doesn't own (Qt pool workers, seen as threading._DummyThread,
+    which reports itself alive forever); a finalizer then closes the connection.
+    """
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _close_reader(conn: sqlite3.Connection, readers: set, lock: threading.Lock) -> None:
+    with lock:
+        readers.discard(conn)
+    conn.close()
+
+
+class SqliteConnectionManager:
+    """
+    Long-lived connections for one database file.
+
+    - `read()` returns this thread's reader (opened once, query_only)
+    - `write()` hands out the single writer under a lock and commits on exit
+      (rolls back on error)
+
+    Connections keep a statement cache (`cached_statements`), so the same SQL
+    text is prepared once per connection instead of once per call.
+    """
+
+    def __init__(self, db_path: Path, cached_statements: int = CACHED_STATEMENTS):
+        self.db_path = Path(db_path)
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._version_lock = threading.Lock()
+        self._own_steps: dict[int, int] = {}  # data_version before -> after one of our commits
+        self._writer: sqlite3.Connection | None = None
+        self._readers: set[sqlite3.Connection] = set()
+        self.opened = 0
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            str(self.db_path),
+            # a reader may be closed from another thread (close(), finalizer)
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        apply_pragmas(conn)
+        self.opened += 1
+        return conn
+
+    # --------------------------
+    # Readers
+    # --------------------------
+    def read(self) -> sqlite3.Connection:
+        reader = getattr(self._local, "reader", None)
+        if reader is not None:
+            return reader.conn
+        conn = self._open()
+        conn.execute("PRAGMA query_only = 1")
+        reader = _Reader(conn)
+        with self._lock:
+            self._readers.add(conn)
+        weakref.finalize(reader, _close_reader, conn, self._readers, self._lock)
+        self._local.reader = reader
+        return conn
+
+    # --------------------------
+    # Writer
+    # --------------------------
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        with metrics().timer("db_write_seconds"), self._write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            conn = self._writer
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+
+    def data_version(self) -> int:
+        """
+        PRAGMA data_version of the writer. SQLite changes it only for commits
+        made through *other* connections, never for the writer's own.
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            return int(self._writer.execute("PRAGMA data_version").fetchone()[0])
+
+    @contextmanager
+    def own_commit(self) -> Iterator[None]:
+        """
+        Wrap a commit this process makes on a connection other than the writer
+        (a SQLAlchemy session). data_version moves for it as for any other
+        connection's commit; the step it took is recorded so changed_since()
+        can tell it from another process's.
+        """
+        with self._version_lock:
+            before = self.data_version()
+            yield
+            after = self.data_version()
+            if after != before:
+                self._own_steps[before] = after
+                while len(self._own_steps) > OWN_COMMITS_KEPT:
+                    del self._own_steps[next(iter(self._own_steps))]
+
+    def changed_since(self, version: int) -> tuple[int, bool]:
+        """
+        (current data_version, whether a commit not wrapped in own_commit()
+        moved it away from `version`).
+        """
+        with self._version_lock:
+            current = self.data_version()
+            seen = version
+            for _ in range(len(self._own_steps)):
+                if seen == current or seen not in self._own_steps:
+                    break
+                seen = self._own_steps.pop(seen)
+            return current, seen != current
+
+    def close(self) -> None:
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self._local = threading.local()
+
+
+_MANAGERS: dict[Path, SqliteConnectionManager] = {}
+_MANAGERS_LOCK = threading.Lock()
+
+
+def connection_manager(db_path: Path) -> SqliteConnectionManager:
+    """
+    Process-wide manager for `db_path` (one per database file).
+    """
+    key = Path(db_path).resolve()
+    with _MANAGERS_LOCK:
+        mgr = _MANAGERS.get(key)
+        if mgr is None:
+            mgr = _MANAGERS[key] = SqliteConnectionManager(key)
+        return mgr
+
+
+def existing_manager(db_path: Path) -> SqliteConnectionManager | None:
+    """The manager for `db_path` if one was created, without opening anything."""
+    with _MANAGERS_LOCK:
+        return _MANAGERS.get(Path(db_path).resolve())
+
+
+def close_all_managers() -> None:
+    with _MANAGERS_LOCK:
+        managers = list(_MANAGERS.values())
+        _MANAGERS.clear()
+    for mgr in managers:
+        mgr.close()
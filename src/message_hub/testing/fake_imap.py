@@ -0,0 +1,683 @@
+from __future__ import annotations
+
+import queue
+import re
+import socket
+import socketserver
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from functools import lru_cache, partial
+
+from message_hub.connectors.imap_connector import ImapAccountConfig
+from message_hub.connectors.imap_parse import compress_uid_set
+from message_hub.testing.synthetic_mail import (
+    MailProfile,
+    SyntheticMessage,
+    make_message,
+    uid_from_message_id,
+)
+
+# In-process stand-in for an IMAP server, for end-to-end tests and sync
+# benchmarks without a live account. It listens on a localhost port, so the
+# real clients (imaplib via the pool, AsyncImapClient, the IDLE watcher) run
+# their actual wire paths against it.
+#
+# Supported: LOGIN (any credentials), CAPABILITY, ENABLE, SELECT/EXAMINE,
+# STATUS, NOOP, LOGOUT, IDLE, UID SEARCH (ALL, UID <set>, SEEN/UNSEEN,
+# HEADER Message-ID), UID FETCH (UID FLAGS MODSEQ RFC822.SIZE BODYSTRUCTURE
+# INTERNALDATE RFC822[.HEADER|.TEXT] BODY[.PEEK][section]<partial>, with
+# CHANGEDSINCE/VANISHED), UID STORE of \Seen, CONDSTORE and QRESYNC.
+#
+# `latency` delays every response by that many seconds after its command
+# arrived (one round trip; pipelined commands overlap, as on a real link) and
+# `bandwidth` caps server -> client bytes per second.
+
+DEFAULT_CAPABILITIES = (
+    "IMAP4rev1",
+    "IDLE",
+    "CONDSTORE",
+    "QRESYNC",
+    "ENABLE",
+    "UIDPLUS",
+    "LITERAL+",
+)
+MESSAGE_CACHE_SIZE = 4096
+
+_LITERAL_RE = re.compile(rb"\{(\d+)(\+)?\}\r?\n$")
+_FETCH_ATT_RE = re.compile(
+    r"(BODY(?:\.PEEK)?)\[([^\]]*)\](?:<(\d+)(?:\.(\d+))?>)?|([A-Z0-9.]+)", re.IGNORECASE
+)
+_FIELDS_RE = re.compile(r"HEADER\.FIELDS(\.NOT)?\s*\(([^)]*)\)", re.IGNORECASE)
+
+
+class FakeMailbox:
+    """
+    A synthetic mailbox of `size` messages with UIDs 1..size. Message bodies
+    are generated on demand (see testing.synthetic_mail); only UIDs, flag
+    overrides and mod-sequences are kept, so a million messages cost a few MB.
+
+    The mutators (append, set_seen, expunge) are what a test or benchmark
+    uses to play "another client changed the mailbox"; sessions that have
+    it selected hear about it at their next NOOP or while idling.
+    """
+
+    def __init__(
+        self,
+        size: int = 10_000,
+        uidvalidity: int = 1,
+        seed: int = 0,
+        read_ratio: float = 0.7,
+        profile: MailProfile | None = None,
+    ):
+        self.uids = array("L", range(1, size + 1))
+        self.uidnext = size + 1
+        self.uidvalidity = uidvalidity
+        self.seed = seed
+        self.read_ratio = read_ratio
+        self.highestmodseq = 1
+        # uid -> \Seen, where it differs from the generated default
+        self._seen: dict[int, bool] = {}
+        self._modseq: dict[int, int] = {}  # uid -> mod-sequence of its last flag change
+        self._vanished: dict[int, int] = {}  # expunged uid -> mod-sequence of the expunge
+        self._listeners: dict[int, deque] = {}  # id(queue) -> queue of pending untagged lines
+        self._lock = threading.RLock()
+        self.message = lru_cache(maxsize=MESSAGE_CACHE_SIZE)(
+            partial(make_message, seed=seed, profile=profile)
+        )
+
+    # --------------------------
+    # Reading
+    # --------------------------
+    @property
+    def exists(self) -> int:
+        return len(self.uids)
+
+    def seq(self, uid: int) -> int:
+        return bisect_left(self.uids, uid) + 1
+
+    def __contains__(self, uid: int) -> bool:
+        i = bisect_left(self.uids, uid)
+        return i < len(self.uids) and self.uids[i] == uid
+
+    def is_seen(self, uid: int) -> bool:
+        seen = self._seen.get(uid)
+        if seen is None:
+            seen = (uid * 2654435761) % 1000 < self.read_ratio * 1000
+        return seen
+
+    def modseq(self, uid: int) -> int:
+        return self._modseq.get(uid, 1)
+
+    def flags(self, uid: int) -> str:
+        return "(\\Seen)" if self.is_seen(uid) else "()"
+
+    def resolve(self, uid_set: str) -> list[int]:
+        """Existing UIDs in an IMAP UID set ("1:4,7", "120:*"), ascending."""
+        top = self.uids[-1] if self.uids else 0
+        out: set[int] = set()
+        for part in uid_set.split(","):
+            lo, _, hi = part.partition(":")
+            a = top if lo == "*" else int(lo)
+            b = a if not hi else (top if hi == "*" else int(hi))
+            a, b = min(a, b), max(a, b)
+            out.update(self.uids[bisect_left(self.uids, a) : bisect_right(self.uids, b)])
+        return sorted(out)
+
+    def changed_since(self, modseq: int, uids: list[int] | None = None) -> list[int]:
+        with self._lock:
+            changed = [u for u, m in self._modseq.items() if m > modseq]
+        if uids is not None:
+            wanted = set(uids)
+            changed = [u for u in changed if u in wanted]
+        return sorted(u for u in changed if u in self)
+
+    def vanished_since(self, modseq: int) -> list[int]:
+        with self._lock:
+            return sorted(u for u, m in self._vanished.items() if m > modseq)
+
+    # --------------------------
+    # Changes made "elsewhere"
+    # --------------------------
+    def append(self, count: int = 1) -> list[int]:
+        with self._lock:
+            new = list(range(self.uidnext, self.uidnext + count))
+            self.uids.extend(new)
+            self.uidnext += count
+            self._notify(f"* {self.exists} EXISTS\r\n".encode())
+        return new
+
+    def set_seen(self, uids, seen: bool = True) -> list[int]:
+        """Set or clear \\Seen; returns the UIDs whose flags actually changed."""
+        changed: list[int] = []
+        with self._lock:
+            for uid in uids:
+                if uid not in self or self.is_seen(uid) == seen:
+                    continue
+                self.highestmodseq += 1
+                self._seen[uid] = seen
+                self._modseq[uid] = self.highestmodseq
+                changed.append(uid)
+                self._notify(
+                    f"* {self.seq(uid)} FETCH (UID {uid} FLAGS {self.flags(uid)}"
+                    f" MODSEQ ({self.highestmodseq}))\r\n".encode()
+                )
+        return changed
+
+    def expunge(self, uids) -> None:
+        with self._lock:
+            for uid in sorted(set(uids), reverse=True):
+                i = bisect_left(self.uids, uid)
+                if i < len(self.uids) and self.uids[i] == uid:
+                    self.highestmodseq += 1
+                    self._vanished[uid] = self.highestmodseq
+                    self._modseq.pop(uid, None)
+                    del self.uids[i]
+                    self._notify(f"* {i + 1} EXPUNGE\r\n".encode())
+
+    def subscribe(self) -> deque:
+        q: deque = deque(maxlen=10_000)
+        with self._lock:
+            self._listeners[id(q)] = q
+        return q
+
+    def unsubscribe(self, q: deque) -> None:
+        with self._lock:
+            self._listeners.pop(id(q), None)
+
+    def _notify(self, line: bytes) -> None:
+        for q in self._listeners.values():
+            q.append(line)
+
+
+class FakeImapServer:
+    """
+    Serves `mailboxes` ({name: FakeMailbox}, or one mailbox as INBOX) on
+    127.0.0.1. Use as a context manager; `config()` gives the account
+    settings the connectors need, `stats()` what crossed the wire.
+    """
+
+    def __init__(
+        self,
+        mailboxes: dict[str, FakeMailbox] | FakeMailbox | None = None,
+        latency: float = 0.0,
+        bandwidth: float | None = None,
+        capabilities: tuple[str, ...] = DEFAULT_CAPABILITIES,
+    ):
+        if mailboxes is None:
+            mailboxes = FakeMailbox()
+        if isinstance(mailboxes, FakeMailbox):
+            mailboxes = {"INBOX": mailboxes}
+        self.mailboxes = mailboxes
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.capabilities = tuple(capabilities)
+        self._server: _TCPServer | None = None
+        self._thread: threading.Thread | None = None
+        self._sessions: set[_Session] = set()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    # --------------------------
+    # Lifecycle
+    # --------------------------
+    def start(self) -> FakeImapServer:
+        self._server = _TCPServer(("127.0.0.1", 0), _Session)
+        self._server.fake = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="fake-imap",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        for session in list(self._sessions):
+            session.close()
+        self._server.server_close()
+        self._server = None
+
+    def __enter__(self) -> FakeImapServer:
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def config(
+        self, email: str = "me@fake.example", mailbox: str = "INBOX", **kw
+    ) -> ImapAccountConfig:
+        return ImapAccountConfig(
+            host="127.0.0.1",
+            port=self.port,
+            ssl=False,
+            email=email,
+            password="x",
+            mailbox=mailbox,
+            **kw,
+        )
+
+    # --------------------------
+    # Accounting
+    # --------------------------
+    def stats(self) -> dict:
+        """{"connections", "round_trips", "bytes_in", "bytes_out", "commands": {name: n}}"""
+        with self._stats_lock:
+            return dict(self._stats, commands=dict(self._commands))
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats = {"connections": 0, "round_trips": 0, "bytes_in": 0, "bytes_out": 0}
+            self._commands: Counter = Counter()
+
+    def _count(self, key: str, n: int = 1, command: str | None = None) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+            if command:
+                self._commands[command] += 1
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    fake: FakeImapServer
+
+
+class _Bad(Exception):
+    pass
+
+
+def _tokens(s: str) -> list[str]:
+    """Command arguments: atoms, "quoted" strings (unquoted) and (lists) / [sections] kept whole."""
+    out: list[str] = []
+    i, n = 0, len(s)
+    while i < n:
+        c = s[i]
+        if c == " ":
+            i += 1
+        elif c == '"':
+            j, buf = i + 1, []
+            while j < n and s[j] != '"':
+                if s[j] == "\\" and j + 1 < n:
+                    j += 1
+                buf.append(s[j])
+                j += 1
+            out.append("".join(buf))
+            i = j + 1
+        else:
+            j, depth, quoted = i, 0, False
+            while j < n and (s[j] != " " or depth or quoted):
+                if s[j] == '"':
+                    quoted = not quoted
+                elif not quoted and s[j] in "([":
+                    depth += 1
+                elif not quoted and s[j] in ")]":
+                    depth -= 1
+                j += 1
+            out.append(s[i:j])
+            i = j
+    return out
+
+
+def _unparen(s: str) -> str:
+    return s[1:-1] if s.startswith("(") and s.endswith(")") else s
+
+
+class _Session(socketserver.BaseRequestHandler):
+    server: _TCPServer
+
+    def setup(self) -> None:
+        self.fake = self.server.fake
+        # responses go out in several writes; don't let Nagle + delayed ACK add 40 ms to each
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.selected: FakeMailbox | None = None
+        self.events: deque | None = None
+        self.qresync = False
+        self.inbox: queue.Queue = queue.Queue()
+        self._wlock = threading.Lock()
+        self._free_at = 0.0
+        self.fake._sessions.add(self)
+        self.fake._count("connections")
+
+    def finish(self) -> None:
+        self._select(None)
+        self.fake._sessions.discard(self)
+
+    def close(self) -> None:
+        try:
+            self.request.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    # --------------------------
+    # Wire
+    # --------------------------
+    def send(self, data: bytes) -> None:
+        bandwidth = self.fake.bandwidth
+        if bandwidth:
+            now = time.monotonic()
+            self._free_at = max(now, self._free_at) + len(data) / bandwidth
+            time.sleep(max(0.0, self._free_at - now))
+        with self._wlock:
+            self.request.sendall(data)
+        self.fake._count("bytes_out", len(data))
+
+    def _reader(self) -> None:
+        """Queues complete command lines (literals inlined) with their arrival time."""
+        f = self.request.makefile("rb")
+        try:
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                size = len(line)
+                while m := _LITERAL_RE.search(line):
+                    if not m.group(2):
+                        self.send(b"+ go ahead\r\n")
+                    literal = f.read(int(m.group(1)))
+                    rest = f.readline()
+                    size += len(literal) + len(rest)
+                    text = (
+                        literal.decode(errors="replace").replace("\\", "\\\\").replace('"', '\\"')
+                    )
+                    line = line[: m.start()] + b'"' + text.encode() + b'"' + rest
+                self.fake._count("bytes_in", size)
+                self.inbox.put((time.monotonic(), line.rstrip(b"\r\n").decode(errors="replace")))
+        except OSError:
+            pass
+        finally:
+            self.inbox.put(None)
+
+    def handle(self) -> None:
+        self.send(
+            f"* OK [CAPABILITY {' '.join(self.fake.capabilities)}] fake IMAP ready\r\n".encode()
+        )
+        threading.Thread(target=self._reader, name="fake-imap-reader", daemon=True).start()
+        while True:
+            entry = self.inbox.get()
+            if entry is None:
+                return
+            arrived, line = entry
+            tag, _, rest = line.partition(" ")
+            name, _, args = rest.partition(" ")
+            name = name.upper()
+            if not tag or not name:
+                continue  # e.g. a DONE after the IDLE it ended
+            if name == "UID":
+                sub, _, args = args.partition(" ")
+                name = f"UID {sub.upper()}"
+
+            delay = arrived + self.fake.latency - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.fake._count("round_trips", command=name)
+            handler = getattr(self, "cmd_" + name.replace(" ", "_").lower(), None)
+            try:
+                if handler is None:
+                    raise _Bad(f"unknown command {name}")
+                status, text = handler(tag, args) or ("OK", f"{name} completed")
+            except _Bad as exc:
+                status, text = "BAD", str(exc)
+            except OSError:
+                return
+            self.send(f"{tag} {status} {text}\r\n".encode())
+            if name == "LOGOUT":
+                return
+
+    def untagged(self, text: str) -> None:
+        self.send(f"* {text}\r\n".encode())
+
+    def _flush_events(self) -> None:
+        while self.events:
+            self.send(self.events.popleft())
+
+    def _select(self, box: FakeMailbox | None) -> None:
+        if self.selected is not None and self.events is not None:
+            self.selected.unsubscribe(self.events)
+        self.selected, self.events = box, (box.subscribe() if box is not None else None)
+
+    def _mailbox(self, name: str) -> FakeMailbox | None:
+        for key, box in self.fake.mailboxes.items():
+            if key == name or (key.upper() == "INBOX" and name.upper() == "INBOX"):
+                return box
+        return None
+
+    def _need_selected(self) -> FakeMailbox:
+        if self.selected is None:
+            raise _Bad("no mailbox selected")
+        return self.selected
+
+    # --------------------------
+    # Any state
+    # --------------------------
+    def cmd_capability(self, tag, args):
+        self.untagged("CAPABILITY " + " ".join(self.fake.capabilities))
+
+    def cmd_noop(self, tag, args):
+        self._flush_events()
+
+    def cmd_logout(self, tag, args):
+        self.untagged("BYE fake IMAP logging out")
+
+    def cmd_login(self, tag, args):
+        if len(_tokens(args)) != 2:
+            raise _Bad("LOGIN needs user and password")
+
+    def cmd_enable(self, tag, args):
+        enabled = [c for c in _tokens(args) if c.upper() in self.fake.capabilities]
+        self.qresync = self.qresync or "QRESYNC" in (c.upper() for c in enabled)
+        self.untagged("ENABLED " + " ".join(enabled))
+
+    def cmd_select(self, tag, args, readonly: bool = False):
+        tokens = _tokens(args)
+        box = self._mailbox(tokens[0]) if tokens else None
+        if box is None:
+            self._select(None)
+            return "NO", "no such mailbox"
+        self._select(box)
+        self.untagged("FLAGS (\\Answered \\Flagged \\Deleted \\Seen \\Draft)")
+        self.untagged(f"{box.exists} EXISTS")
+        self.untagged("0 RECENT")
+        self.untagged(f"OK [UIDVALIDITY {box.uidvalidity}] UIDs valid")
+        self.untagged(f"OK [UIDNEXT {box.uidnext}] predicted next UID")
+        if "CONDSTORE" in self.fake.capabilities:
+            self.untagged(f"OK [HIGHESTMODSEQ {box.highestmodseq}] highest")
+        return "OK", f"[{'READ-ONLY' if readonly else 'READ-WRITE'}] SELECT completed"
+
+    def cmd_examine(self, tag, args):
+        return self.cmd_select(tag, args, readonly=True)
+
+    def cmd_status(self, tag, args):
+        tokens = _tokens(args)
+        box = self._mailbox(tokens[0]) if tokens else None
+        if box is None:
+            return "NO", "no such mailbox"
+        values = {
+            "MESSAGES": box.exists,
+            "UIDNEXT": box.uidnext,
+            "UIDVALIDITY": box.uidvalidity,
+            "HIGHESTMODSEQ": box.highestmodseq,
+            "RECENT": 0,
+        }
+        items = _unparen(tokens[1] if len(tokens) > 1 else "").upper().split()
+        if any(i not in values for i in items):
+            raise _Bad("unsupported STATUS item")
+        body = " ".join(f"{i} {values[i]}" for i in items)
+        self.untagged(f'STATUS "{tokens[0]}" ({body})')
+
+    def cmd_idle(self, tag, args):
+        self.send(b"+ idling\r\n")
+        while True:
+            self._flush_events()
+            try:
+                entry = self.inbox.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if entry is None:
+                self.inbox.put(None)  # let handle() see the disconnect
+                raise OSError("client went away while idling")
+            if entry[1].strip().upper() == "DONE":
+                return "OK", "IDLE terminated"
+
+    # --------------------------
+    # UID commands
+    # --------------------------
+    def cmd_uid_search(self, tag, args):
+        box = self._need_selected()
+        tokens = [t for tok in _tokens(args) for t in _tokens(_unparen(tok))]
+        if len(tokens) >= 2 and tokens[0].upper() == "CHARSET":
+            tokens = tokens[2:]
+        result: set[int] | None = None
+        i = 0
+        while i < len(tokens):
+            key = tokens[i].upper()
+            if key == "ALL":
+                found = None
+            elif key == "UID" and i + 1 < len(tokens):
+                found = set(box.resolve(tokens[i + 1]))
+                i += 1
+            elif key in ("SEEN", "UNSEEN"):
+                found = {u for u in box.uids if box.is_seen(u) == (key == "SEEN")}
+            elif key == "HEADER" and i + 2 < len(tokens) and tokens[i + 1].upper() == "MESSAGE-ID":
+                uid = uid_from_message_id(tokens[i + 2], box.seed)
+                found = {uid} if uid is not None and uid in box else set()
+                i += 2
+            else:
+                raise _Bad(f"unsupported search key {tokens[i]}")
+            if found is not None:
+                result = found if result is None else result & found
+            i += 1
+        uids = box.uids if result is None else sorted(result)
+        self.untagged("SEARCH" + "".join(f" {u}" for u in uids))
+
+    def cmd_uid_fetch(self, tag, args):
+        box = self._need_selected()
+        tokens = _tokens(args)
+        if len(tokens) < 2:
+            raise _Bad("UID FETCH needs a set and items")
+        uids = box.resolve(tokens[0])
+        atts = _FETCH_ATT_RE.findall(_unparen(tokens[1]))
+        modifiers = _unparen(tokens[2]).upper().split() if len(tokens) > 2 else []
+
+        changedsince = None
+        if "CHANGEDSINCE" in modifiers:
+            changedsince = int(modifiers[modifiers.index("CHANGEDSINCE") + 1])
+            if "VANISHED" in modifiers:
+                if not self.qresync:
+                    raise _Bad("VANISHED needs ENABLE QRESYNC")
+                requested = tokens[0]
+                gone = [u for u in box.vanished_since(changedsince) if _in_set(u, requested)]
+                if gone:
+                    self.untagged(f"VANISHED (EARLIER) {compress_uid_set(gone)}")
+            uids = box.changed_since(changedsince, uids)
+
+        for uid in uids:
+            self.send(self._fetch_response(box, uid, atts, with_modseq=changedsince is not None))
+
+    def _fetch_response(
+        self, box: FakeMailbox, uid: int, atts: list[tuple], with_modseq: bool
+    ) -> bytes:
+        msg: SyntheticMessage | None = None
+        simple = {a[4].upper() for a in atts}
+        # BODY[...] and RFC822[.TEXT] set \Seen (BODY.PEEK[...] and RFC822.HEADER don't)
+        body_read = any(a[0].upper() == "BODY" for a in atts)
+        marks_seen = body_read or bool(simple & {"RFC822", "RFC822.TEXT"})
+        if marks_seen and not box.is_seen(uid):
+            box.set_seen([uid])
+            if "FLAGS" not in simple:
+                atts = list(atts) + [("", "", "", "", "FLAGS")]
+        if with_modseq and "MODSEQ" not in simple:
+            atts = list(atts) + [("", "", "", "", "MODSEQ")]
+
+        pieces: list[bytes] = [f"UID {uid}".encode()]
+        for body, section, start, length, simple in atts:
+            key = simple.upper()
+            if key == "UID":
+                continue
+            if key == "FLAGS":
+                pieces.append(f"FLAGS {box.flags(uid)}".encode())
+                continue
+            if key == "MODSEQ":
+                pieces.append(f"MODSEQ ({box.modseq(uid)})".encode())
+                continue
+            msg = msg or box.message(uid)
+            if key == "RFC822.SIZE":
+                pieces.append(f"RFC822.SIZE {msg.size}".encode())
+            elif key in ("BODYSTRUCTURE", "BODY"):
+                pieces.append(f"{key} {msg.bodystructure}".encode())
+            elif key == "INTERNALDATE":
+                pieces.append(b'INTERNALDATE "01-Jan-2024 00:00:00 +0000"')
+            elif key in ("RFC822", "RFC822.HEADER", "RFC822.TEXT"):
+                whole = {"RFC822": msg.raw, "RFC822.HEADER": msg.header, "RFC822.TEXT": msg.text}
+                data = whole[key]
+                pieces.append(f"{key} {{{len(data)}}}\r\n".encode() + data)
+            elif body:
+                data = self._section(msg, section)
+                name = f"BODY[{section}]"
+                if start:
+                    end = int(start) + int(length) if length else None
+                    data = data[int(start) : end]
+                    name += f"<{start}>"
+                pieces.append(f"{name} {{{len(data)}}}\r\n".encode() + data)
+            else:
+                raise _Bad(f"unsupported fetch item {simple}")
+        return f"* {box.seq(uid)} FETCH (".encode() + b" ".join(pieces) + b")\r\n"
+
+    @staticmethod
+    def _section(msg: SyntheticMessage, section: str) -> bytes:
+        spec = section.strip().upper()
+        if spec == "":
+            return msg.raw
+        if spec == "HEADER":
+            return msg.header
+        if spec == "TEXT":
+            return msg.text
+        m = _FIELDS_RE.match(section.strip())
+        if m:
+            return msg.header_fields(m.group(2).split(), exclude=bool(m.group(1)))
+        return msg.part(spec)
+
+    def cmd_uid_store(self, tag, args):
+        box = self._need_selected()
+        tokens = _tokens(args)
+        if len(tokens) < 3:
+            raise _Bad("UID STORE needs a set, an action and flags")
+        uids = box.resolve(tokens[0])
+        action = tokens[1].upper()
+        silent = action.endswith(".SILENT")
+        action = action.removesuffix(".SILENT")
+        flags = _unparen(tokens[2]).upper().split()
+        if action not in ("FLAGS", "+FLAGS", "-FLAGS"):
+            raise _Bad(f"unsupported STORE action {tokens[1]}")
+        if action == "-FLAGS":
+            seen = False if "\\SEEN" in flags else None
+        else:
+            seen = "\\SEEN" in flags if action == "FLAGS" else (True if "\\SEEN" in flags else None)
+        if seen is not None:
+            box.set_seen(uids, seen)
+        if not silent:
+            for uid in uids:
+                self.untagged(
+                    f"{box.seq(uid)} FETCH (UID {uid} FLAGS {box.flags(uid)}"
+                    f" MODSEQ ({box.modseq(uid)}))"
+                )
+
+
+def _in_set(uid: int, uid_set: str) -> bool:
+    for part in uid_set.split(","):
+        lo, _, hi = part.partition(":")
+        a = int(lo) if lo != "*" else uid
+        b = a if not hi else (int(hi) if hi != "*" else max(uid, a))
+        if min(a, b) <= uid <= max(a, b):
+            return True
+    return False
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import random
+import time
+from dataclasses import dataclass, field
+from itertools import accumulate
+from pathlib import Path
+
+from message_hub.connectors.mime_text import normalize_snippet
+from message_hub.storage.bodies import INSERT_BODY_SQL, body_row
+from message_hub.storage.db import DatabaseConfig, make_engine
+from message_hub.storage.fts import FTS_TRIGGERS_SQL, body_search_text
+from message_hub.storage.migrations import ensure_schema
+from message_hub.storage.sqlite_conn import SqliteConnectionManager, connection_manager
+from message_hub.testing.synthetic_mail import (
+    WORDS,
+    MailProfile,
+    body_html,
+    body_text,
+    message_id,
+    sender,
+    thread_root,
+    thread_subject,
+)
+
+# A filled local store, as header sync and body fetches would have left it:
+# accounts with a few folders each, messages with snippets, threads
+# (thread_id + thread_map), a share of cached bodies (compressed, and in the
+# FTS index) and a mostly-read history. Deterministic for a given seed;
+# rows go in oldest first, so ids follow arrival like they do after a sync.
+#
+# Writes go straight through sqlite3 in large transactions. The FTS insert
+# trigger is suspended during the load and each message is indexed once,
+# body included, instead of a trigger insert plus a body UPDATE (which
+# re-tokenizes the whole row); most of the remaining time is still FTS.
+
+SNIPPET_WORDS = 40  # words generated for messages without a cached body
+_NOW = dt.datetime(2024, 6, 1)
+_INSERT_MESSAGE_SQL = """
+    INSERT INTO messages (account_id, folder_id, provider_msg_id, thread_id, from_addr, to_addrs,
+                          subject, snippet, date_utc, is_read, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_REF_SQL = "INSERT OR IGNORE INTO thread_map (account_id, ref, thread_id) VALUES (?, ?, ?)"
+_INSERT_FTS_SQL = (
+    "INSERT INTO messages_fts (rowid, subject, from_addr, snippet, body) VALUES (?, ?, ?, ?, ?)"
+)
+_FTS_INSERT_TRIGGER = "messages_ai_fts"  # FTS_TRIGGERS_SQL[0]
+
+
+@dataclass
+class StoreProfile:
+    """What the generated store holds (message shapes come from `mail`)."""
+
+    accounts: int = 3
+    folders: tuple[str, ...] = ("INBOX", "Archive", "Sent", "Newsletters")
+    folder_weights: tuple[float, ...] = (0.55, 0.3, 0.1, 0.05)
+    read_ratio: float = 0.85
+    body_ratio: float = 0.3  # messages whose body was fetched (and indexed)
+    mail: MailProfile = field(default_factory=MailProfile)
+
+
+def account_email(account: int) -> str:
+    return f"user{account}@synthetic.example"
+
+
+def _stamp(value: dt.datetime) -> str:
+    # SQLAlchemy's DateTime format on SQLite, so rows compare like synced ones
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def populate_store(
+    db_path: Path,
+    messages: int,
+    seed: int = 0,
+    profile: StoreProfile | None = None,
+    batch_size: int = 10_000,
+) -> dict:
+    """
+    Create (or migrate) the store at `db_path` and fill it with `messages`
+    synthetic messages. The store must not hold messages yet.
+    """
+    profile = profile or StoreProfile()
+    t0 = time.perf_counter()
+
+    engine = make_engine(DatabaseConfig(db_path=Path(db_path)))
+    ensure_schema(engine)
+    engine.dispose()
+
+    mgr = connection_manager(db_path)
+    with mgr.write() as conn:
+        if conn.execute("SELECT EXISTS (SELECT 1 FROM messages)").fetchone()[0]:
+            raise ValueError(f"{db_path} already holds messages")
+        created = _stamp(_NOW)
+        account_ids: list[int] = []
+        folder_ids: list[list[int]] = []
+        for a in range(profile.accounts):
+            account_id = conn.execute(
+                "INSERT INTO accounts (provider, email, created_at) VALUES ('imap', ?, ?)",
+                (account_email(a), created),
+            ).lastrowid
+            account_ids.append(account_id)
+            folder_ids.append(
+                [
+                    conn.execute(
+                        "INSERT INTO folders (account_id, provider_folder_id, name)"
+                        " VALUES (?, ?, ?)",
+                        (account_id, name, name),
+                    ).lastrowid
+                    for name in profile.folders
+                ]
+            )
+
+    with mgr.write() as conn:
+        conn.execute(f"DROP TRIGGER IF EXISTS {_FTS_INSERT_TRIGGER}")
+    try:
+        bodies, unread = _fill(mgr, messages, seed, profile, account_ids, folder_ids, batch_size)
+    finally:
+        with mgr.write() as conn:
+            conn.execute(FTS_TRIGGERS_SQL[0])
+
+    return {
+        "accounts": profile.accounts,
+        "folders": profile.accounts * len(profile.folders),
+        "messages": messages,
+        "bodies": bodies,
+        "unread": unread,
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def _fill(
+    mgr: SqliteConnectionManager,
+    messages: int,
+    seed: int,
+    profile: StoreProfile,
+    account_ids: list[int],
+    folder_ids: list[list[int]],
+    batch_size: int,
+) -> tuple[int, int]:
+    """Insert the messages, oldest first; returns (bodies, unread)."""
+    mail = profile.mail
+    cum_weights = list(accumulate(profile.folder_weights))
+    folder_picks = range(len(profile.folders))
+    step = dt.timedelta(minutes=mail.minutes_apart)
+    bodies = unread = 0
+
+    for start in range(1, messages + 1, batch_size):
+        rows: list[tuple] = []
+        refs: list[tuple] = []
+        texts: dict[int, tuple[str, str | None]] = {}  # position in batch -> (text, html)
+        for n in range(start, min(start + batch_size, messages + 1)):
+            rnd = random.Random(seed * 1_000_003 + n)
+            a = (n - 1) % profile.accounts
+            uid = (n - 1) // profile.accounts + 1
+            box_seed = seed * 1000 + a
+            account_id = account_ids[a]
+
+            msg_id = message_id(uid, box_seed)
+            thread_id = message_id(thread_root(uid, mail), box_seed)
+            name, addr = sender(rnd.randrange(max(1, mail.senders)))
+            date = _NOW - step * (messages - n)
+            is_read = rnd.random() < profile.read_ratio
+
+            has_body = rnd.random() < profile.body_ratio
+            count = rnd.randint(*mail.body_words)
+            words = rnd.choices(WORDS, k=count if has_body else min(count, SNIPPET_WORDS))
+            text = body_text(words)
+            if has_body:
+                html = body_html(words) if rnd.random() < mail.html_ratio else None
+                texts[len(rows)] = (text, html)
+
+            rows.append(
+                (
+                    account_id,
+                    folder_ids[a][rnd.choices(folder_picks, cum_weights=cum_weights)[0]],
+                    str(uid),
+                    thread_id,
+                    f"{name} <{addr}>",
+                    account_email(a),
+                    thread_subject(uid, box_seed, mail),
+                    normalize_snippet(text),
+                    _stamp(date),
+                    is_read,
+                    _stamp(date + dt.timedelta(seconds=rnd.randrange(120))),
+                )
+            )
+            refs.append((account_id, msg_id, thread_id))
+            unread += not is_read
+
+        with mgr.write() as conn:
+            # single writer on a store that only grows: the batch gets the next ids
+            first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM messages").fetchone()[0]
+            conn.executemany(_INSERT_MESSAGE_SQL, rows)
+            conn.executemany(_INSERT_REF_SQL, refs)
+            conn.executemany(
+                INSERT_BODY_SQL, [body_row(first_id + i, t, h) for i, (t, h) in texts.items()]
+            )
+            conn.executemany(
+                _INSERT_FTS_SQL,
+                [
+                    (
+                        first_id + i,
+                        r[6],
+                        r[4],
+                        r[7],
+                        body_search_text(*texts[i]) if i in texts else None,
+                    )
+                    for i, r in enumerate(rows)
+                ],
+            )
+        bodies += len(texts)
+    return bodies, unread
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Fill a Message Hub store with synthetic mail.")
+    ap.add_argument("db_path", type=Path)
+    ap.add_argument("--messages", type=int, default=100_000)
+    ap.add_argument("--accounts", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    stats = populate_store(
+        args.db_path, args.messages, args.seed, StoreProfile(accounts=args.accounts)
+    )
+    print(
+        ", ".join(f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}" for k, v in stats.items())
+    )
+
+
+if __name__ == "__main__":
+    main()
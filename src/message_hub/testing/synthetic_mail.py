@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import base64
+import datetime as dt
+import quopri
+import random
+import re
+from dataclasses import dataclass, field
+from email.header import Header
+from email.utils import format_datetime
+
+# Deterministic synthetic mail: message `uid` of a mailbox with a given seed
+# is always the same bytes, so even a million-message mailbox needs no
+# storage; messages are built when something asks for them.
+#
+# Shapes follow what a real inbox holds: threads (In-Reply-To/References),
+# a pool of recurring senders, some RFC 2047 encoded subjects and names,
+# trace headers (Received, DKIM) that HEADER.FIELDS fetches skip, and a mix
+# of text-only, text + HTML and text + HTML + attachment bodies.
+
+WORDS = (
+    "meeting report invoice project update review schedule budget deadline team client draft "
+    "proposal summary agenda notes follow-up question answer thanks please attached quarterly "
+    "release build deploy server database ticket customer order shipment delivery payment "
+    "contract renewal feedback design roadmap sprint planning retro lunch friday monday café "
+    "naïve Grüße déjà-vu résumé smörgåsbord"
+).split()
+NAMES = (
+    "Alice Martin",
+    "Bob Stone",
+    "Carol Diaz",
+    "Jörg Müller",
+    "François Dupont",
+    "Åsa Ek",
+    "Zoë Smith",
+    "GitHub",
+)
+_ZONES = (dt.UTC, dt.timezone(dt.timedelta(hours=-7)), dt.timezone(dt.timedelta(hours=2)))
+_EPOCH = dt.datetime(2020, 1, 1, tzinfo=dt.UTC)
+_MSG_ID_RE = re.compile(r"<(\d+)\.(\d+)@fake\.example>")
+
+
+@dataclass
+class MailProfile:
+    """What the generated messages look like."""
+
+    thread_size: int = 4  # messages per conversation
+    senders: int = 500  # distinct From values
+    encoded_ratio: float = 0.15  # subjects / names sent as RFC 2047 encoded words
+    html_ratio: float = 0.6  # text + HTML alternative
+    attachment_ratio: float = 0.15  # ... plus an attachment
+    attachment_bytes: int = 40_000
+    body_words: tuple[int, int] = (40, 400)
+    minutes_apart: int = 10  # Date: spacing between consecutive UIDs
+
+
+@dataclass
+class MimeLeaf:
+    maintype: str
+    subtype: str
+    params: dict[str, str]
+    encoding: str
+    payload: bytes  # transfer-encoded, as on the wire
+    filename: str | None = None  # set for attachments
+
+
+@dataclass
+class MimeMultipart:
+    subtype: str
+    boundary: str
+    children: list = field(default_factory=list)
+
+
+def _quoted(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _param_list(params: dict[str, str]) -> str:
+    if not params:
+        return "NIL"
+    return "(" + " ".join(f"{_quoted(k.upper())} {_quoted(v)}" for k, v in params.items()) + ")"
+
+
+def content_headers(node) -> bytes:
+    """Content-* header lines of a MIME entity (its .MIME section)."""
+    if isinstance(node, MimeMultipart):
+        return f'Content-Type: multipart/{node.subtype}; boundary="{node.boundary}"\r\n'.encode()
+    params = "".join(f'; {k}="{v}"' for k, v in node.params.items())
+    lines = [
+        f"Content-Type: {node.maintype}/{node.subtype}{params}",
+        f"Content-Transfer-Encoding: {node.encoding}",
+    ]
+    if node.filename:
+        lines.append(f'Content-Disposition: attachment; filename="{node.filename}"')
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def render(node) -> bytes:
+    """Body of a MIME entity (without its own headers)."""
+    if isinstance(node, MimeLeaf):
+        return node.payload
+    out = [b"This is a multi-part message in MIME format.\r\n"]
+    for child in node.children:
+        part = content_headers(child) + b"\r\n" + render(child)
+        out.append(f"--{node.boundary}\r\n".encode() + part + b"\r\n")
+    out.append(f"--{node.boundary}--\r\n".encode())
+    return b"".join(out)
+
+
+def bodystructure(node) -> str:
+    """RFC 3501 BODYSTRUCTURE of a MIME tree."""
+    if isinstance(node, MimeMultipart):
+        children = "".join(bodystructure(c) for c in node.children)
+        boundary = _quoted(node.boundary)
+        return f'({children} "{node.subtype.upper()}" ("BOUNDARY" {boundary}) NIL NIL NIL)'
+    head = (
+        f'("{node.maintype.upper()}" "{node.subtype.upper()}" {_param_list(node.params)} NIL NIL '
+        f'"{node.encoding.upper()}" {len(node.payload)}'
+    )
+    if node.maintype == "text":
+        lines = node.payload.count(b"\n")
+        return f"{head} {lines} NIL NIL NIL NIL)"
+    disposition = (
+        f'("ATTACHMENT" ("FILENAME" {_quoted(node.filename)}))' if node.filename else "NIL"
+    )
+    return f"{head} NIL {disposition} NIL NIL)"
+
+
+@dataclass
+class SyntheticMessage:
+    uid: int
+    header: bytes  # header block, blank line included (BODY[HEADER])
+    tree: MimeLeaf | MimeMultipart
+    text: bytes = b""  # BODY[TEXT]
+
+    def __post_init__(self):
+        self.text = render(self.tree)
+
+    @property
+    def raw(self) -> bytes:
+        return self.header + self.text
+
+    @property
+    def size(self) -> int:
+        return len(self.header) + len(self.text)
+
+    @property
+    def bodystructure(self) -> str:
+        return bodystructure(self.tree)
+
+    def header_fields(self, names: list[str], exclude: bool = False) -> bytes:
+        """BODY[HEADER.FIELDS (...)] / BODY[HEADER.FIELDS.NOT (...)]."""
+        wanted = {n.lower() for n in names}
+        fields: list[bytes] = []
+        for line in self.header.split(b"\r\n"):
+            if not line:
+                continue
+            if line[:1] in (b" ", b"\t") and fields:
+                fields[-1] += b"\r\n" + line
+            else:
+                fields.append(line)
+        keep = [f for f in fields if (f.split(b":", 1)[0].decode().lower() in wanted) != exclude]
+        return b"".join(f + b"\r\n" for f in keep) + b"\r\n"
+
+    def part(self, section: str) -> bytes:
+        """BODY[1], BODY[1.2], BODY[2.MIME]... (b"" for a section that doesn't exist)."""
+        node = self.tree
+        numbers = section.split(".")
+        mime = numbers[-1].upper() == "MIME"
+        if mime:
+            numbers = numbers[:-1]
+        for n in numbers:
+            if not n.isdigit():
+                return b""
+            if isinstance(node, MimeMultipart):
+                i = int(n) - 1
+                if not 0 <= i < len(node.children):
+                    return b""
+                node = node.children[i]
+            elif n != "1":  # a single-part body is its own part 1
+                return b""
+        if mime:
+            return content_headers(node) + b"\r\n"
+        return render(node)
+
+
+def message_id(uid: int, seed: int = 0) -> str:
+    return f"<{uid}.{seed}@fake.example>"
+
+
+def uid_from_message_id(value: str, seed: int = 0) -> int | None:
+    m = _MSG_ID_RE.search(value)
+    return int(m.group(1)) if m and int(m.group(2)) == seed else None
+
+
+def message_date(uid: int, profile: MailProfile) -> dt.datetime:
+    """UTC Date: of message `uid`; later UIDs are newer."""
+    return _EPOCH + dt.timedelta(minutes=uid * profile.minutes_apart)
+
+
+def _encoded(text: str, rnd: random.Random, ratio: float) -> str:
+    if text.isascii() and rnd.random() >= ratio:
+        return text
+    return Header(text, "utf-8").encode(linesep="\r\n")
+
+
+def thread_root(uid: int, profile: MailProfile) -> int:
+    """First UID of the conversation `uid` belongs to."""
+    return uid - (uid - 1) % max(1, profile.thread_size)
+
+
+def thread_subject(uid: int, seed: int, profile: MailProfile) -> str:
+    root = thread_root(uid, profile)
+    topic = " ".join(random.Random(seed * 1_000_003 + root).sample(WORDS, 3)).capitalize()
+    return f"{'Re: ' if uid != root else ''}{topic} #{root}"
+
+
+def sender(i: int) -> tuple[str, str]:
+    """(display name, address) of sender number `i`."""
+    return NAMES[i % len(NAMES)], f"user{i}@example{i % 17}.com"
+
+
+def body_text(words: list[str]) -> str:
+    return "".join(" ".join(words[i : i + 10]) + "\n" for i in range(0, len(words), 10))
+
+
+def body_html(words: list[str]) -> str:
+    paragraphs = "".join(f"<p>{' '.join(words[i : i + 40])}</p>" for i in range(0, len(words), 40))
+    return f"<html><head><style>p {{ margin: 0 }}</style></head><body>{paragraphs}</body></html>"
+
+
+def _sender(i: int, profile: MailProfile) -> str:
+    name, addr = sender(i)
+    # seeded by the sender, so a sender's From is the same in every message
+    return f"{_encoded(name, random.Random(i), profile.encoded_ratio)} <{addr}>"
+
+
+def _text_part(words: list[str]) -> MimeLeaf:
+    payload = quopri.encodestring(body_text(words).encode()).replace(b"\n", b"\r\n")
+    return MimeLeaf("text", "plain", {"charset": "utf-8"}, "quoted-printable", payload)
+
+
+def _html_part(words: list[str]) -> MimeLeaf:
+    payload = base64.encodebytes(body_html(words).encode()).replace(b"\n", b"\r\n")
+    return MimeLeaf("text", "html", {"charset": "utf-8"}, "base64", payload)
+
+
+def make_message(uid: int, seed: int = 0, profile: MailProfile | None = None) -> SyntheticMessage:
+    """Message `uid` of the synthetic mailbox `seed`."""
+    profile = profile or MailProfile()
+    rnd = random.Random(seed * 1_000_003 + uid)
+
+    root = thread_root(uid, profile)
+    subject = thread_subject(uid, seed, profile)
+    sent = message_date(uid, profile).astimezone(_ZONES[uid % len(_ZONES)])
+
+    lines = [
+        f"Received: from mx{uid % 7}.example.net (mx{uid % 7}.example.net [192.0.2.{uid % 250}])",
+        f"\tby fake.example with ESMTPS id {uid:x}; {format_datetime(sent)}",
+        "DKIM-Signature: v=1; a=rsa-sha256; c=relaxed/relaxed; d=example.net; s=sel;",
+        "\tb=" + base64.b64encode(rnd.randbytes(192)).decode(),
+        f"Subject: {_encoded(subject, rnd, profile.encoded_ratio)}",
+        f"From: {_sender(rnd.randrange(max(1, profile.senders)), profile)}",
+        "To: me@fake.example",
+        f"Date: {format_datetime(sent)}",
+        f"Message-ID: {message_id(uid, seed)}",
+    ]
+    if uid != root:
+        refs = [message_id(u, seed) for u in range(root, uid)]
+        lines.append(f"In-Reply-To: {refs[-1]}")
+        lines.append("References: " + "\r\n ".join(refs[:1] + refs[1:][-9:]))
+    lines.append("MIME-Version: 1.0")
+
+    words = rnd.choices(WORDS, k=rnd.randint(*profile.body_words))
+    kind = rnd.random()
+    if kind < profile.attachment_ratio:
+        name = f"report-{uid}.pdf"
+        payload = base64.encodebytes(rnd.randbytes(profile.attachment_bytes))
+        payload = payload.replace(b"\n", b"\r\n")
+        attachment = MimeLeaf("application", "pdf", {"name": name}, "base64", payload, name)
+        alternative = MimeMultipart(
+            "alternative", f"alt-{uid}", [_text_part(words), _html_part(words)]
+        )
+        tree = MimeMultipart("mixed", f"mix-{uid}", [alternative, attachment])
+    elif kind < profile.attachment_ratio + profile.html_ratio:
+        tree = MimeMultipart("alternative", f"alt-{uid}", [_text_part(words), _html_part(words)])
+    else:
+        tree = _text_part(words)
+
+    header = ("\r\n".join(lines) + "\r\n").encode() + content_headers(tree) + b"\r\n"
+    return SyntheticMessage(uid=uid, header=header, tree=tree)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from PySide6.QtCore import QObject, Signal
+
+from message_hub.connectors.aio_imap import AsyncImapEngine, EngineConnector
+from message_hub.connectors.imap_connector import ImapAccountConfig
+
+
+class AsyncEngineBridge(QObject):
+    """
+    Hooks an AsyncImapEngine up to the GUI.
+
+    IDLE notifications arrive on the engine's loop thread; emitting a signal
+    from there is queued onto the receiver's thread. Sync, flag, prefetch and
+    open traffic goes through `connector`, whose blocking calls the existing
+    worker threads make as they would with imap_connector.
+    """
+
+    mailbox_changed = Signal(str)  # account email
+
+    def __init__(self, engine: AsyncImapEngine | None = None, parent: QObject | None = None):
+        super().__init__(parent)
+        self.engine = engine or AsyncImapEngine()
+        self.connector = EngineConnector(self.engine)
+
+    def watch(self, cfg: ImapAccountConfig) -> None:
+        self.engine.watch(cfg, lambda c, events: self.mailbox_changed.emit(c.email))
+
+    def stop(self) -> None:
+        self.engine.stop()
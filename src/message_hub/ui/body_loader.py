@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+from PySide6.QtCore import QObject, QThreadPool, Signal, Slot
+
+from message_hub.ui.workers import FunctionWorker
+
+# load(message_id, *args) -> message row with its body (runs on a pool thread)
+BodyLoadFn = Callable[..., Any]
+
+
+class BodyLoader(QObject):
+    """
+    Loads message bodies on the thread pool for the reading pane.
+
+    Only the most recently requested message is "wanted":
+    - requesting a message that is already in flight does not fetch it again
+    - requests still queued for other messages are taken back off the pool
+    - results that arrive for a message the user already left are dropped
+      (the load still cached the body, so opening it later is instant)
+    """
+
+    loaded = Signal(int, object)  # message_id, message row
+    failed = Signal(int, str)  # message_id, error text
+
+    def __init__(self, load: BodyLoadFn, threadpool: QThreadPool | None = None, parent=None):
+        super().__init__(parent)
+        self._load = load
+        self.threadpool = threadpool or QThreadPool.globalInstance()
+        self._inflight: dict[int, FunctionWorker] = {}
+        self._wanted: int | None = None
+        self.started = 0
+        self.dropped = 0
+
+    @property
+    def wanted(self) -> int | None:
+        return self._wanted
+
+    def is_loading(self, message_id: int) -> bool:
+        return int(message_id) in self._inflight
+
+    def request(self, message_id: int, *args) -> None:
+        mid = int(message_id)
+        self._wanted = mid
+        self._take_queued(keep=mid)
+        if mid in self._inflight:
+            return
+
+        worker = FunctionWorker(self._run, mid, args)
+        worker.setAutoDelete(False)  # we keep it around for tryTake()
+        worker.signals.finished.connect(self._on_finished)
+        self._inflight[mid] = worker
+        self.started += 1
+        self.threadpool.start(worker)
+
+    def cancel(self) -> None:
+        """Forget the wanted message and unqueue everything not yet running."""
+        self._wanted = None
+        self._take_queued(keep=None)
+
+    def _take_queued(self, keep: int | None) -> None:
+        for mid, worker in list(self._inflight.items()):
+            if mid != keep and self.threadpool.tryTake(worker):
+                del self._inflight[mid]
+
+    def _run(self, mid: int, args: tuple):
+        # errors travel with their message id, so a stale failure can be dropped too
+        try:
+            return mid, self._load(mid, *args), None
+        except Exception as e:
+            return mid, None, repr(e)
+
+    @Slot(object)
+    def _on_finished(self, result) -> None:
+        mid, msg, error = result
+        self._inflight.pop(mid, None)
+        if mid != self._wanted:
+            self.dropped += 1
+        elif error is not None:
+            self.failed.emit(mid, error)
+        else:
+            self.loaded.emit(mid, msg)
@@ -32,11 +32,23 @@ class MessageDetail(QWidget):
         self.date.setText("")
         self.body.setPlainText("")
 
-    def set_message(self, msg):
+    def _set_headers(self, msg):
         self.subject.setText(msg.subject or "(no subject)")
         self.from_.setText(f"From: {msg.from_addr or 'unknown'}")
         self.date.setText(f"Date: {msg.date_utc or ''}")
 
+    def set_loading(self, msg):
+        """
+        Show the headers (and the preview, if any) right away while the body
+        is fetched in the background.
+        """
+        self._set_headers(msg)
+        snippet = (getattr(msg, "snippet", None) or "").strip()
+        self.body.setPlainText(f"{snippet}\n\nLoading message…" if snippet else "Loading message…")
+
+    def set_message(self, msg):
+        self._set_headers(msg)
+
         # Get body content - preserve None vs empty string distinction
         body_html = getattr(msg, "body_html", None)
         body_text = getattr(msg, "body_text", None)
@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QRect, QSize, Qt
+from PySide6.QtGui import QColor, QFont, QIcon, QPainter, QPen
+from PySide6.QtWidgets import QListView, QStyle, QStyledItemDelegate, QStyleOptionViewItem
+
+from message_hub.services.message_repo import cursor_for
+
+# fetch_page(after, limit) -> the `limit` rows following row `after`
+# (None = from the top), in inbox order
+PageFetcher = Callable[[Any | None, int], list[Any]]
+
+MessageIdRole = Qt.ItemDataRole.UserRole
+MessageRole = Qt.ItemDataRole.UserRole + 1
+NewestUnreadRole = Qt.ItemDataRole.UserRole + 2
+
+
+def _date_text(m) -> str:
+    date = getattr(m, "date_utc", None) or ""
+    if hasattr(date, "strftime"):
+        return date.strftime("%Y-%m-%d %H:%M")
+    return str(date)[:16]
+
+
+class MessageListModel(QAbstractListModel):
+    """
+    Inbox rows, loaded lazily page by page (canFetchMore/fetchMore) and
+    updated in place: `apply_rows` diffs a fresh window against the loaded
+    rows and emits only row inserts, removes and dataChanged, so the view
+    keeps its scroll position and selection.
+    """
+
+    def __init__(
+        self,
+        fetch_page: PageFetcher,
+        page_size: int = 200,
+        sort_key: Callable[[Any], tuple] = cursor_for,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self._fetch_page = fetch_page
+        self.page_size = page_size
+        self._sort_key = sort_key
+        self._rows: list[Any] = []
+        self._row_of: dict[int, int] = {}
+        self._exhausted = False
+
+    # --------------------------
+    # Qt model API
+    # --------------------------
+    def rowCount(self, parent: QModelIndex | None = None) -> int:
+        return 0 if parent is not None and parent.isValid() else len(self._rows)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not (0 <= index.row() < len(self._rows)):
+            return None
+        m = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return (
+                f"{m.subject or '(no subject)'}  |  {m.from_addr or 'unknown'}  |  {_date_text(m)}"
+            )
+        if role == MessageIdRole:
+            return int(m.id)
+        if role == MessageRole:
+            return m
+        if role == NewestUnreadRole:
+            return index.row() == 0 and not bool(m.is_read)
+        return None
+
+    def canFetchMore(self, parent: QModelIndex | None = None) -> bool:
+        return not (parent is not None and parent.isValid()) and not self._exhausted
+
+    def fetchMore(self, parent: QModelIndex | None = None) -> None:
+        if (parent is not None and parent.isValid()) or self._exhausted:
+            return
+        rows = self._fetch_page(self._rows[-1] if self._rows else None, self.page_size)
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        rows = [r for r in rows if int(r.id) not in self._row_of]
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+        self._reindex(first)
+
+    # --------------------------
+    # Helpers for the window
+    # --------------------------
+    @property
+    def newest_id(self) -> int | None:
+        return int(self._rows[0].id) if self._rows else None
+
+    def row_for_id(self, message_id: int) -> int | None:
+        return self._row_of.get(int(message_id))
+
+    def message_at(self, row: int):
+        return self._rows[row] if 0 <= row < len(self._rows) else None
+
+    def reload(self) -> None:
+        """
+        Re-read the first page and apply the diff. Loaded rows below it are
+        kept as they are: changes made here reach them through apply_changes,
+        and scrolling down fetches what follows.
+        """
+        page = self._fetch_page(None, self.page_size)
+        if len(page) < self.page_size:
+            self._exhausted = True  # the first page is the whole list
+            self.apply_rows(page)
+            return
+
+        # keep the rows that followed the page's last already-loaded row
+        ids = {int(r.id) for r in page}
+        loaded = [self._row_of[i] for i in ids if i in self._row_of]
+        tail = [r for r in self._rows[max(loaded) + 1 :] if int(r.id) not in ids] if loaded else []
+        self._exhausted = False  # the next fetchMore finds out
+        self.apply_rows(page + tail)
+
+    def reset(self) -> None:
+        """Drop the loaded rows and load the first page again (e.g. a new search)."""
+        self.beginResetModel()
+        self._rows = []
+        self._row_of = {}
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def set_read(self, message_id: int, is_read: bool = True) -> None:
+        row = self.row_for_id(message_id)
+        if row is None or bool(self._rows[row].is_read) == is_read:
+            return
+        self._rows[row].is_read = is_read
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx)
+
+    def apply_rows(self, new_rows: list[Any]) -> None:
+        """
+        Turn the loaded rows into `new_rows` with minimal model signals:
+        removed runs -> removeRows, new runs -> insertRows, edited rows ->
+        dataChanged. Falls back to a reset only if surviving rows changed
+        their relative order (e.g. a message's date was corrected).
+        """
+        new_ids = [int(r.id) for r in new_rows]
+        new_set = set(new_ids)
+        old_set = set(self._row_of)
+
+        kept = [int(r.id) for r in self._rows if int(r.id) in new_set]
+        if kept != [i for i in new_ids if i in old_set]:
+            self.beginResetModel()
+            self._rows = list(new_rows)
+            self.endResetModel()
+            self._reindex(0)
+            return
+
+        # 1) removals, bottom-up so row numbers stay valid
+        i = len(self._rows) - 1
+        while i >= 0:
+            if int(self._rows[i].id) in new_set:
+                i -= 1
+                continue
+            j = i
+            while j > 0 and int(self._rows[j - 1].id) not in new_set:
+                j -= 1
+            self.beginRemoveRows(QModelIndex(), j, i)
+            del self._rows[j : i + 1]
+            self.endRemoveRows()
+            i = j - 1
+
+        # 2) inserts + in-place updates, top-down
+        pos = k = 0
+        changed: list[int] = []
+        while k < len(new_rows):
+            if pos < len(self._rows) and int(self._rows[pos].id) == new_ids[k]:
+                if self._rows[pos] != new_rows[k]:
+                    self._rows[pos] = new_rows[k]
+                    changed.append(pos)
+                pos += 1
+                k += 1
+                continue
+            start = k
+            while k < len(new_rows) and (
+                pos >= len(self._rows) or new_ids[k] != int(self._rows[pos].id)
+            ):
+                k += 1
+            self.beginInsertRows(QModelIndex(), pos, pos + (k - start) - 1)
+            self._rows[pos:pos] = new_rows[start:k]
+            self.endInsertRows()
+            pos += k - start
+
+        self._reindex(0)
+
+        # the "newest unread" marker follows row 0, so rows 0..1 may repaint too
+        changed.extend(r for r in (0, 1) if r < len(self._rows))
+        for row in sorted(set(changed)):
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx)
+
+    def apply_changes(self, rows: Iterable[Any], deleted_ids: Iterable[int] = ()) -> None:
+        """
+        Patch the loaded rows with re-queried `rows` (new or edited messages)
+        and drop `deleted_ids`, without re-reading the window. New rows that
+        sort below the loaded window are left for fetchMore.
+        """
+        fresh = {int(r.id): r for r in rows}
+        gone = {int(i) for i in deleted_ids} - fresh.keys()
+
+        # edits that keep their place are patched in place
+        changed: list[int] = []
+        for mid, row in list(fresh.items()):
+            pos = self._row_of.get(mid)
+            if pos is None or self._sort_key(self._rows[pos]) != self._sort_key(row):
+                continue
+            if self._rows[pos] != row:
+                self._rows[pos] = row
+                changed.append(mid)
+            del fresh[mid]
+
+        # deleted rows and rows whose sort key moved come out (bottom-up) ...
+        doomed = sorted(
+            (self._row_of[i] for i in gone | fresh.keys() if i in self._row_of), reverse=True
+        )
+        for pos in doomed:
+            self.beginRemoveRows(QModelIndex(), pos, pos)
+            del self._rows[pos]
+            self.endRemoveRows()
+
+        # ... and new/moved rows go in at their sorted position
+        for row in sorted(fresh.values(), key=self._sort_key, reverse=True):
+            pos = self._insert_pos(self._sort_key(row))
+            if pos == len(self._rows) and not self._exhausted:
+                continue
+            self.beginInsertRows(QModelIndex(), pos, pos)
+            self._rows.insert(pos, row)
+            self.endInsertRows()
+
+        self._reindex(0)
+        rows_to_paint = {self._row_of[i] for i in changed if i in self._row_of}
+        rows_to_paint.update(r for r in (0, 1) if r < len(self._rows))
+        for row in sorted(rows_to_paint):
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx)
+
+    def _insert_pos(self, key: tuple) -> int:
+        """Row index where `key` goes to keep the rows in descending key order."""
+        lo, hi = 0, len(self._rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._sort_key(self._rows[mid]) > key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _reindex(self, start: int) -> None:
+        if start == 0:
+            self._row_of = {}
+        for n in range(start, len(self._rows)):
+            self._row_of[int(self._rows[n].id)] = n
+
+
+class MessageDelegate(QStyledItemDelegate):
+    """
+    Paints one inbox row: subject (bold when unread), sender, date, a divider
+    and the bulb icon on the newest unread message. Rows have a fixed height
+    so the view can use uniform item sizes.
+    """
+
+    PADDING = 8
+
+    def __init__(self, icon_new: QIcon, parent=None):
+        super().__init__(parent)
+        self.icon_new = icon_new
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        return QSize(option.rect.width(), option.fontMetrics.height() + 2 * self.PADDING + 1)
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex) -> None:
+        m = index.data(MessageRole)
+        if m is None:
+            return super().paint(painter, option, index)
+
+        painter.save()
+        rect = option.rect
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(rect, QColor(0, 120, 215, 51))
+
+        x = rect.left() + self.PADDING
+        icon_size = option.fontMetrics.height()
+        if index.data(NewestUnreadRole):
+            self.icon_new.paint(painter, QRect(x, rect.top() + self.PADDING, icon_size, icon_size))
+        x += icon_size + self.PADDING
+
+        date = _date_text(m)
+        date_w = option.fontMetrics.horizontalAdvance(date) + self.PADDING
+        text_rect = QRect(x, rect.top(), rect.right() - x - date_w, rect.height() - 1)
+
+        font = QFont(option.font)
+        font.setBold(not bool(m.is_read))
+        painter.setFont(font)
+        painter.setPen(option.palette.text().color())
+        text = f"{m.subject or '(no subject)'}  |  {m.from_addr or 'unknown'}"
+        elided = painter.fontMetrics().elidedText(
+            text, Qt.TextElideMode.ElideRight, text_rect.width()
+        )
+        painter.drawText(
+            text_rect, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, elided
+        )
+
+        # preview in the space the subject line leaves
+        used = (
+            painter.fontMetrics().horizontalAdvance(elided) if elided == text else text_rect.width()
+        )
+        painter.setFont(option.font)
+        snippet = getattr(m, "snippet", None)
+        if snippet and used + 2 * self.PADDING < text_rect.width():
+            snippet_rect = text_rect.adjusted(used + self.PADDING, 0, 0, 0)
+            painter.setPen(option.palette.placeholderText().color())
+            elided = painter.fontMetrics().elidedText(
+                f"– {snippet}", Qt.TextElideMode.ElideRight, snippet_rect.width()
+            )
+            painter.drawText(
+                snippet_rect, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, elided
+            )
+            painter.setPen(option.palette.text().color())
+
+        date_rect = QRect(
+            rect.right() - date_w, rect.top(), date_w - self.PADDING // 2, rect.height() - 1
+        )
+        painter.drawText(
+            date_rect, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignRight, date
+        )
+
+        painter.setPen(QPen(QColor(0, 0, 0, 46)))
+        painter.drawLine(rect.left(), rect.bottom(), rect.right(), rect.bottom())
+        painter.restore()
+
+
+class MessageListView(QListView):
+    """QListView that shows a hint while the inbox is empty."""
+
+    def __init__(self, placeholder: str = "", parent=None):
+        super().__init__(parent)
+        self.placeholder = placeholder
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QListView.SelectionMode.SingleSelection)
+        self.setStyleSheet("QListView { outline: 0; }")
+
+    def paintEvent(self, event) -> None:
+        super().paintEvent(event)
+        model = self.model()
+        if self.placeholder and (model is None or model.rowCount() == 0):
+            painter = QPainter(self.viewport())
+            painter.setPen(self.palette().placeholderText().color())
+            painter.drawText(
+                self.viewport().rect().adjusted(8, 8, -8, -8),
+                Qt.AlignmentFlag.AlignTop
+                | Qt.AlignmentFlag.AlignHCenter
+                | Qt.TextFlag.TextWordWrap,
+                self.placeholder,
+            )
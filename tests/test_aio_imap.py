@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from message_hub.connectors import aio_imap
+from message_hub.connectors.imap_connector import ImapAccountConfig
+
+
+def _header(uid: int) -> bytes:
+    return f"Subject: m{uid}\r\nFrom: a@example.com\r\n\r\n".encode()
+
+
+async def _handle(reader, writer, log):
+    writer.write(b"* OK fake ready\r\n")
+    idle_tag = None
+    while line := await reader.readline():
+        log.append(line)
+        if line.strip() == b"DONE":
+            writer.write(idle_tag + b" OK IDLE done\r\n")
+            continue
+        tag, cmd, *rest = line.strip().split(b" ")
+        cmd = cmd.upper()
+        if cmd == b"CAPABILITY":
+            writer.write(b"* CAPABILITY IMAP4rev1 IDLE\r\n")
+        elif cmd == b"STATUS":
+            writer.write(b'* STATUS "INBOX" (MESSAGES 3 UIDNEXT 4 UIDVALIDITY 7)\r\n')
+        elif cmd == b"UID" and rest[0] == b"SEARCH":
+            writer.write(b"* SEARCH 1 2 3\r\n")
+        elif cmd == b"UID" and rest[0] == b"FETCH":
+            lo, _, hi = rest[1].partition(b":")
+            for uid in range(int(lo), int(hi or lo) + 1):
+                body = _header(uid)
+                writer.write(
+                    b"* %d FETCH (UID %d FLAGS (\\Seen) BODY[HEADER.FIELDS (SUBJECT FROM)] {%d}\r\n"
+                    % (uid, uid, len(body))
+                )
+                writer.write(body + b")\r\n")
+        elif cmd == b"IDLE":
+            idle_tag = tag
+            writer.write(b"+ idling\r\n* 4 EXISTS\r\n")
+            await writer.drain()
+            continue
+        writer.write(tag + b" OK done\r\n")
+        await writer.drain()
+        if cmd == b"LOGOUT":
+            break
+    writer.close()
+
+
+async def _scenario():
+    log = []
+    server = await asyncio.start_server(lambda r, w: _handle(r, w, log), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    cfg = ImapAccountConfig(
+        host="127.0.0.1", email="a@example.com", password='p"w', ssl=False, port=port
+    )
+
+    client = aio_imap.AsyncImapClient(cfg)
+    await client.open()
+    assert "IDLE" in client.capabilities
+
+    res = await aio_imap.fetch_new_headers(client, limit=3, batch_size=2)
+    events = await client.idle(timeout=5, debounce=0.05)
+    await client.close()
+    server.close()
+    return log, res, events
+
+
+def test_pipelined_header_fetch_and_idle():
+    log, res, events = asyncio.run(_scenario())
+
+    assert res["full"] is True and res["uidvalidity"] == 7 and res["last_uid"] == 3
+    assert [it["provider_msg_id"] for it in res["items"]] == ["3", "2", "1"]
+    assert res["items"][0]["subject"] == "m3" and res["items"][0]["is_read"] is True
+    assert events == ["EXISTS"]
+
+    assert [line.split(b" ", 1)[1] for line in log if b"UID SEARCH" in line] == [
+        b"UID SEARCH UID 1:*\r\n"
+    ]
+    sent = [line for line in log if b"UID FETCH" in line]
+    assert [line.split(b" ")[3] for line in sent] == [b"1:2", b"3"]
+    assert b'LOGIN "a@example.com" "p\\"w"' in log[0]
+
+
+async def _dropped_idle():
+    async def handle(reader, writer):
+        writer.write(b"* OK fake ready\r\n")
+        while line := await reader.readline():
+            tag, cmd, *_ = line.strip().split(b" ")
+            if cmd.upper() == b"IDLE":
+                writer.write(b"+ idling\r\n")
+                await writer.drain()
+                await asyncio.sleep(0.05)
+                break  # connection lost mid-IDLE
+            writer.write(tag + b" OK done\r\n")
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    client = aio_imap.AsyncImapClient(
+        ImapAccountConfig(host="127.0.0.1", email="a", password="p", ssl=False, port=port)
+    )
+    await client.open()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        with pytest.raises(ConnectionError):
+            await client.idle(timeout=30)
+    finally:
+        server.close()
+    return loop.time() - started
+
+
+def test_idle_raises_when_the_connection_drops():
+    assert asyncio.run(_dropped_idle()) < 5
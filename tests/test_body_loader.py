@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import QCoreApplication, QThreadPool  # noqa: E402
+
+from message_hub.ui.body_loader import BodyLoader  # noqa: E402
+
+
+@pytest.fixture(scope="module", autouse=True)
+def qt_app():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    yield app
+
+
+class Gate:
+    """Load function whose calls block until released."""
+
+    def __init__(self, fail: set[int] = frozenset()):
+        self.calls: list[int] = []
+        self.release = threading.Event()
+        self.fail = fail
+
+    def __call__(self, mid):
+        self.calls.append(mid)
+        self.release.wait(5)
+        if mid in self.fail:
+            raise RuntimeError("imap down")
+        return f"body-{mid}"
+
+
+def _pump(loader: BodyLoader, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while loader._inflight and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+        time.sleep(0.005)
+    QCoreApplication.processEvents()
+
+
+@pytest.fixture
+def pool():
+    pool = QThreadPool()
+    pool.setMaxThreadCount(1)
+    yield pool
+    pool.waitForDone(5000)
+
+
+def _loader(load, pool):
+    loader = BodyLoader(load, pool)
+    got, failed = [], []
+    loader.loaded.connect(lambda mid, msg: got.append((mid, msg)))
+    loader.failed.connect(lambda mid, err: failed.append(mid))
+    return loader, got, failed
+
+
+def test_same_message_is_fetched_once(pool):
+    gate = Gate()
+    loader, got, _ = _loader(gate, pool)
+    loader.request(1)
+    loader.request(1)
+    gate.release.set()
+    _pump(loader)
+
+    assert gate.calls == [1]
+    assert got == [(1, "body-1")]
+
+
+def test_stale_results_are_dropped_and_queued_requests_unqueued(pool):
+    gate = Gate()
+    loader, got, _ = _loader(gate, pool)
+    loader.request(1)  # occupies the only thread
+    deadline = time.monotonic() + 5
+    while not gate.calls and time.monotonic() < deadline:
+        time.sleep(0.005)
+    loader.request(2)  # queued behind 1
+    loader.request(3)  # user moved on again: 2 is taken back off the queue
+    assert not loader.is_loading(2)
+
+    gate.release.set()
+    _pump(loader)
+
+    assert gate.calls == [1, 3]
+    assert got == [(3, "body-3")]
+    assert loader.dropped == 1
+
+
+def test_failures_only_reported_for_the_wanted_message(pool):
+    gate = Gate(fail={4, 5})
+    loader, got, failed = _loader(gate, pool)
+    loader.request(4)
+    loader.cancel()
+    loader.request(5)
+    gate.release.set()
+    _pump(loader)
+
+    assert failed == [5]
+    assert got == []
@@ -0,0 +1,91 @@
+import sqlite3
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from message_hub.storage.changes import ChangeBus, DataVersionWatcher, MessageChange, commit_own
+from message_hub.storage.db import DatabaseConfig, make_engine
+from message_hub.storage.sqlite_conn import connection_manager
+
+
+def test_bus_delivers_until_unsubscribed_and_isolates_listeners():
+    bus = ChangeBus()
+    seen = []
+
+    def broken(change):
+        raise RuntimeError("listener bug")
+
+    bus.subscribe(broken)
+    unsubscribe = bus.subscribe(seen.append)
+
+    bus.publish_messages(inserted=[3, 4])
+    bus.publish_messages()  # nothing changed -> not published
+    unsubscribe()
+    bus.publish_messages(deleted=[1])
+
+    assert seen == [MessageChange(inserted=(3, 4))]
+    assert bus.published == 2
+
+
+def test_data_version_sees_commits_from_other_connections(tmp_path):
+    path = tmp_path / "dv.sqlite"
+    other = sqlite3.connect(path)
+    other.execute("CREATE TABLE t (x)")
+    other.commit()
+
+    watcher = DataVersionWatcher(path)
+    assert not watcher.changed()
+
+    other.execute("INSERT INTO t VALUES (1)")
+    assert not watcher.changed()  # not committed yet
+    other.commit()
+    assert watcher.changed()
+    assert not watcher.changed()
+
+    other.close()
+    connection_manager(path).close()
+
+
+def test_data_version_ignores_our_own_writer(tmp_path):
+    path = tmp_path / "own.sqlite"
+    with connection_manager(path).write() as conn:
+        conn.execute("CREATE TABLE t (x)")
+    watcher = DataVersionWatcher(path)
+
+    with connection_manager(path).write() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")  # e.g. a prefetched body being saved
+    assert not watcher.changed()
+
+    other = sqlite3.connect(path)
+    other.execute("INSERT INTO t VALUES (2)")
+    other.commit()
+    other.close()
+    assert watcher.changed()
+    connection_manager(path).close()
+
+
+def test_data_version_skips_only_our_own_session_commits(tmp_path):
+    path = tmp_path / "sessions.sqlite"
+    engine = make_engine(DatabaseConfig(db_path=path))
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x)"))
+    watcher = DataVersionWatcher(path)
+
+    def sync_write(x):
+        with Session(engine) as session:
+            session.execute(text("INSERT INTO t VALUES (:x)"), {"x": x})
+            commit_own(session)
+
+    sync_write(1)
+    assert not watcher.changed()
+
+    other = sqlite3.connect(path)
+    other.execute("INSERT INTO t VALUES (2)")
+    other.commit()
+    other.close()
+    sync_write(3)  # lands before the next check: must not hide the other process's commit
+    assert watcher.changed()
+    assert not watcher.changed()
+
+    engine.dispose()
+    connection_manager(path).close()
@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import event, select
+
+from message_hub.services import imap_sync
+from message_hub.services.conversations import thread_keys
+from message_hub.services.message_ingest import ingest_headers
+from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
+from message_hub.storage.models import Base, Message, ThreadRef
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = make_engine(DatabaseConfig(db_path=tmp_path / "threads.sqlite"))
+    Base.metadata.create_all(engine)
+    with make_session_factory(engine)() as s:
+        yield s
+    engine.dispose()
+
+
+@pytest.fixture
+def ingest(session):
+    acc = imap_sync.get_or_create_account(session, "imap", "me@example.com")
+    fld = imap_sync.get_or_create_folder(session, acc.id, "INBOX", "INBOX")
+
+    def _ingest(*items):
+        ingest_headers(session, acc.id, fld.id, list(items))
+        session.commit()
+
+    return _ingest
+
+
+def _hdr(uid, msg_id=None, in_reply_to=None, references=None):
+    return {
+        "provider_msg_id": str(uid),
+        "message_id": msg_id,
+        "in_reply_to": in_reply_to,
+        "references": references,
+    }
+
+
+def _threads(session) -> dict[str, str | None]:
+    return dict(session.execute(select(Message.provider_msg_id, Message.thread_id)).all())
+
+
+def test_thread_keys_root_first_without_self_reference():
+    keys = thread_keys(_hdr(1, "<c@x>", "<b@x>", "<a@x>\r\n <b@x> <c@x>"))
+    assert keys == ["<a@x>", "<b@x>", "<c@x>"]
+    assert thread_keys(_hdr(1, "<b@x>", "<a@x> (Alice's message)")) == ["<a@x>", "<b@x>"]
+    assert thread_keys(_hdr(1)) == []
+
+
+def test_replies_join_the_root_thread_in_any_arrival_order(session, ingest):
+    # newest first, as a header sync delivers them
+    ingest(
+        _hdr(3, "<c@x>", "<b@x>", "<a@x> <b@x>"),
+        _hdr(2, "<b@x>", "<a@x>", "<a@x>"),
+        _hdr(9, "<z@x>"),
+        _hdr(8),  # no Message-ID at all
+    )
+    ingest(_hdr(1, "<a@x>"))  # the root turns up later (other folder, older backfill)
+
+    assert _threads(session) == {"3": "<a@x>", "2": "<a@x>", "1": "<a@x>", "9": "<z@x>", "8": None}
+
+
+def test_message_linking_two_threads_merges_them(session, ingest):
+    ingest(_hdr(1, "<a@x>"))
+    ingest(_hdr(2, "<b@x>", "<a-lost@x>"))  # broken chain: looks like its own thread
+    assert _threads(session) == {"1": "<a@x>", "2": "<a-lost@x>"}
+
+    ingest(_hdr(3, "<c@x>", references="<a@x> <a-lost@x> <b@x>"))
+    assert set(_threads(session).values()) == {"<a@x>"}
+    assert set(session.scalars(select(ThreadRef.thread_id))) == {"<a@x>"}
+
+    ingest(_hdr(4, "<d@x>", "<b@x>"))
+    assert _threads(session)["4"] == "<a@x>"
+
+
+def test_one_index_lookup_per_batch(session, ingest):
+    ingest(_hdr(1, "<root@x>"))
+    statements = []
+    event.listen(session.bind, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    ingest(*[_hdr(u, f"<m{u}@x>", "<root@x>", f"<root@x> <m{u - 1}@x>") for u in range(2, 52)])
+
+    lookups = [s for s in statements if "FROM thread_map" in s]
+    assert len(lookups) == 1  # primary-key probes for the batch's ids, whatever the mailbox size
+    assert set(_threads(session).values()) == {"<root@x>"}
@@ -0,0 +1,182 @@
+import asyncio
+import base64
+import threading
+import time
+
+import pytest
+from sqlalchemy import select
+
+from message_hub.connectors import aio_imap, imap_pool
+from message_hub.connectors.imap_connector import fetch_full_message
+from message_hub.connectors.imap_idle import ImapIdleWatcher
+from message_hub.connectors.imap_parse import parse_bodystructure, text_parts
+from message_hub.services.imap_sync import sync_imap_flags, sync_imap_headers
+from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
+from message_hub.storage.models import Base, Message
+from message_hub.testing.fake_imap import FakeImapServer, FakeMailbox
+from message_hub.testing.synthetic_mail import make_message, uid_from_message_id
+
+
+@pytest.fixture
+def box():
+    return FakeMailbox(size=300)
+
+
+@pytest.fixture
+def server(box, monkeypatch):
+    # the default pool keys sessions by host/email, not port: use a fresh one per server
+    monkeypatch.setattr(imap_pool, "_default_pool", imap_pool.ImapConnectionPool())
+    with FakeImapServer(box) as srv:
+        yield srv
+        imap_pool.default_pool().close_all()
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = make_engine(DatabaseConfig(db_path=tmp_path / "fake.sqlite"))
+    Base.metadata.create_all(engine)
+    with make_session_factory(engine)() as s:
+        yield s
+    engine.dispose()
+
+
+def _uids(session) -> set[int]:
+    return {int(u) for u in session.scalars(select(Message.provider_msg_id))}
+
+
+def test_synthetic_messages_are_deterministic_and_threaded():
+    a, b = make_message(6, seed=3), make_message(6, seed=3)
+    assert a.raw == b.raw
+    assert make_message(6, seed=4).raw != a.raw
+    assert uid_from_message_id(a.header_fields(["In-Reply-To"]).decode(), seed=3) == 5
+
+
+def test_generated_bodystructure_points_at_the_text_parts(box):
+    uid = next(u for u in box.uids if make_message(u).bodystructure.startswith("(("))
+    msg = box.message(uid)
+    text, html = text_parts(parse_bodystructure(f"1 (UID {uid} BODYSTRUCTURE {msg.bodystructure})"))
+    assert (text.content_type, html.content_type) == ("text/plain", "text/html")
+    assert b"<html>" in base64.b64decode(msg.part(html.section))
+
+
+def test_header_sync_first_incremental_and_quiet(server, box, session):
+    cfg = server.config()
+    assert sync_imap_headers(session, cfg, limit=50)["inserted"] == 50
+    assert _uids(session) == set(box.uids[-50:])
+
+    new = box.append(5)
+    server.reset_stats()
+    res = sync_imap_headers(session, cfg)
+    assert res["inserted"] == 5 and set(new) <= _uids(session)
+    assert server.stats()["round_trips"] == 3  # STATUS, UID SEARCH, UID FETCH
+
+    server.reset_stats()
+    assert sync_imap_headers(session, cfg)["fetched"] == 0
+    assert server.stats()["round_trips"] == 1  # STATUS only
+
+
+def test_flag_sync_follows_seen_and_expunge(server, box, session):
+    cfg = server.config()
+    sync_imap_headers(session, cfg, limit=20)
+    sync_imap_flags(session, cfg)  # records HIGHESTMODSEQ
+
+    latest = list(box.uids[-20:])
+    unread = [u for u in latest if not box.is_seen(u)]
+    box.set_seen(unread[:2])
+    box.expunge(latest[:3])
+    res = sync_imap_flags(session, cfg)
+
+    assert res["mode"] == "qresync"
+    assert res["vanished"] == 3
+    assert _uids(session) == set(latest[3:])
+    read = dict(session.execute(select(Message.provider_msg_id, Message.is_read)).all())
+    assert all(read[str(u)] for u in unread[:2] if u not in latest[:3])
+
+
+def test_full_message_skips_attachments_and_marks_seen(server, box):
+    uid = next(u for u in reversed(box.uids) if b"application/pdf" in box.message(u).text)
+    box.set_seen([uid], False)
+
+    res = fetch_full_message(server.config(), str(uid))
+    assert res["body_text"]
+    assert res["bytes_saved"] > 30_000
+    assert box.is_seen(uid)
+
+
+def test_async_full_message_marks_seen_like_the_threaded_one(server, box):
+    uid = next(u for u in reversed(box.uids) if b"application/pdf" in box.message(u).text)
+    box.set_seen([uid], False)
+
+    async def fetch():
+        client = aio_imap.AsyncImapClient(server.config())
+        await client.open()
+        try:
+            return await aio_imap.fetch_full_message(client, str(uid))
+        finally:
+            await client.close()
+
+    assert asyncio.run(fetch())["body_text"]
+    assert box.is_seen(uid)
+
+
+def test_idle_watcher_hears_new_mail(server, box):
+    heard = threading.Event()
+    events: list[str] = []
+
+    def on_change(cfg, evs):
+        events.extend(evs)
+        heard.set()
+
+    watcher = ImapIdleWatcher(server.config(), on_change, debounce=0.05)
+    watcher.start()
+    try:
+        for _ in range(50):  # wait for IDLE to be in place before appending
+            if box._listeners:
+                break
+            time.sleep(0.05)
+        box.append(1)
+        assert heard.wait(5)
+    finally:
+        watcher.stop()
+    assert watcher.mode == "idle" and "EXISTS" in events
+
+
+def test_header_sync_skips_past_expunged_arrivals(server, box, session):
+    cfg = server.config()
+    sync_imap_headers(session, cfg, limit=10)
+    box.expunge(box.append(2))
+
+    assert sync_imap_headers(session, cfg)["fetched"] == 0
+    server.reset_stats()
+    assert sync_imap_headers(session, cfg)["fetched"] == 0
+    assert server.stats()["round_trips"] == 1  # STATUS only, no UID SEARCH
+
+
+def test_engine_connector_syncs_like_the_threaded_one(server, box, session):
+    engine = aio_imap.AsyncImapEngine().start()
+    imap = aio_imap.EngineConnector(engine)
+    cfg = server.config()
+    try:
+        sync_imap_headers(session, cfg, limit=20, connector=imap)
+        sync_imap_flags(session, cfg, connector=imap)  # records HIGHESTMODSEQ
+
+        latest = list(box.uids[-20:])
+        unread = [u for u in latest if not box.is_seen(u)]
+        box.set_seen(unread[:2])
+        box.expunge(latest[:3])
+        new = box.append(2)
+        assert sync_imap_headers(session, cfg, connector=imap)["inserted"] == 2
+        res = sync_imap_flags(session, cfg, connector=imap)
+        assert (res["mode"], res["vanished"]) == ("qresync", 3)
+        assert _uids(session) == set(latest[3:]) | set(new)
+        read = dict(session.execute(select(Message.provider_msg_id, Message.is_read)).all())
+        assert all(read[str(u)] for u in unread[:2] if u not in latest[:3])
+
+        box.set_seen(new, False)
+        bodies = imap.fetch_bodies(cfg, new)
+        assert set(bodies["bodies"]) == set(new) and bodies["bytes"] > 0
+        assert not any(box.is_seen(u) for u in new)  # prefetch peeks
+        imap.mark_seen(cfg, new[:1])
+        assert box.is_seen(new[0])
+    finally:
+        engine.stop()
@@ -0,0 +1,82 @@
+import datetime as dt
+from email.utils import parsedate_to_datetime
+
+import pytest
+
+from message_hub.connectors import header_decode
+from message_hub.connectors.header_decode import (
+    cache_info,
+    decode_address_header,
+    decode_mime_header,
+    parse_date_utc,
+    parse_dates,
+)
+
+DATES = [
+    "Tue, 14 May 2024 09:12:45 +0200",
+    "14 May 2024 09:12:45 -0700",  # no weekday
+    "Tue, 4 Jun 24 23:59:01 GMT",  # 2-digit year, 1-digit day
+    "Mon, 1 Jan 2024 00:00 +0000 (UTC)",  # no seconds, comment
+    "Thu, 7 Mar 2024 08:00:00 +0530 (IST)",
+    "Sun,  3 Mar 2024 01:02:03 +0100",
+    "Tue, 14 May 99 09:12:45 PDT",
+    "Wed, 31 Dec 1969 19:00:00 EST",
+    "Fri, 02 Feb 2024 10:00:00 -0000",
+    "2 Feb 2024 10:00:00",  # no zone
+    "Tue, 14 May 2024 09:12:45 CEST",  # unknown zone name: stdlib
+    "Sat, 30 Feb 2024 10:00:00 +0100",  # invalid day
+    "Tue, 14 May 2024 24:00:00 +0200",
+    "2024-05-14T09:12:45Z",
+    "garbage",
+]
+
+
+def _stdlib(raw):
+    try:
+        d = parsedate_to_datetime(raw)
+    except Exception:
+        return None
+    return d if d.tzinfo is None else d.astimezone(dt.UTC).replace(tzinfo=None)
+
+
+@pytest.mark.parametrize("raw", DATES)
+def test_date_parser_matches_stdlib(raw):
+    assert parse_date_utc(raw) == _stdlib(raw)
+
+
+def test_parse_dates_batch():
+    parsed = parse_dates(["Tue, 14 May 2024 09:12:45 +0200", None, ""])
+    assert parsed == [dt.datetime(2024, 5, 14, 7, 12, 45), None, None]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("Quarterly report", "Quarterly report"),
+        ("=?utf-8?b?R3LDvMOfZQ==?= aus =?utf-8?q?K=C3=B6ln?=", "Grüße aus Köln"),
+        ("=?iso-8859-1?q?caf=E9?=", "café"),
+        ("=?x-unknown?q?caf=C3=A9?=", "café"),  # unknown charset: read as UTF-8
+        ("Grüße, raw", "Grüße, raw"),
+    ],
+)
+def test_decode_mime_header(value, expected):
+    assert decode_mime_header(value) == expected
+
+
+def test_ascii_fast_path_skips_decode_header(monkeypatch):
+    def boom(value):
+        raise AssertionError("decode_header called")
+
+    monkeypatch.setattr(header_decode, "decode_header", boom)
+    assert decode_mime_header("Alice <alice@example.com>") == "Alice <alice@example.com>"
+
+
+def test_sender_cache_hits_on_repeats():
+    header_decode._decode_address.cache_clear()
+    for _ in range(3):
+        assert (
+            decode_address_header("=?utf-8?q?J=C3=B6rg?= <j@example.com>") == "Jörg <j@example.com>"
+        )
+    info = cache_info()["from"]
+    assert (info["hits"], info["misses"]) == (2, 1)
+    assert info["maxsize"] == header_decode.FROM_CACHE_SIZE
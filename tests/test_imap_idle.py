@@ -0,0 +1,61 @@
+import socket
+import threading
+
+from message_hub.connectors.imap_connector import ImapAccountConfig
+from message_hub.connectors.imap_idle import ImapIdleWatcher, _SocketLineReader
+
+
+class SocketImap:
+    """Just enough of imaplib.IMAP4 for the IDLE loop: a socket, tags and send()."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._n = 0
+
+    def _new_tag(self):
+        self._n += 1
+        return f"T{self._n}".encode()
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+
+def _server(sock, script):
+    f = sock.makefile("rb")
+    for expect, reply in script:
+        line = f.readline()
+        assert expect in line, (expect, line)
+        sock.sendall(reply)
+
+
+def test_idle_once_reports_exists_and_finishes_with_done():
+    client, server = socket.socketpair()
+    script = [
+        (b"T1 IDLE", b"+ idling\r\n* 5 EXISTS\r\n* 1 RECENT\r\n"),
+        (b"DONE", b"* 3 FETCH (FLAGS (\\Seen))\r\nT1 OK IDLE terminated\r\n"),
+    ]
+    t = threading.Thread(target=_server, args=(server, script), daemon=True)
+    t.start()
+
+    cfg = ImapAccountConfig(host="h", email="a@example.com", password="x")
+    watcher = ImapIdleWatcher(cfg, on_change=lambda c, e: None, debounce=0.05)
+    events = watcher._idle_once(SocketImap(client), _SocketLineReader(client))
+    t.join(2)
+
+    assert events == ["EXISTS", "FETCH"]
+    client.close()
+    server.close()
+
+
+def test_idle_once_renews_without_events():
+    client, server = socket.socketpair()
+    script = [(b"T1 IDLE", b"+ idling\r\n"), (b"DONE", b"T1 OK\r\n")]
+    t = threading.Thread(target=_server, args=(server, script), daemon=True)
+    t.start()
+
+    cfg = ImapAccountConfig(host="h", email="a@example.com", password="x")
+    watcher = ImapIdleWatcher(cfg, on_change=lambda c, e: None, renew_after=0.1)
+    assert watcher._idle_once(SocketImap(client), _SocketLineReader(client)) == []
+    t.join(2)
+    client.close()
+    server.close()
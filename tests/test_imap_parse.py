@@ -0,0 +1,127 @@
+from message_hub.connectors.imap_connector import _fetch_headers_for_uids
+from message_hub.connectors.imap_parse import (
+    compress_uid_set,
+    iter_fetch_items,
+    parse_bodystructure,
+    text_parts,
+)
+
+
+def _header(subject: str) -> bytes:
+    return (
+        f"Subject: {subject}\r\nFrom: a@example.com\r\nDate: Mon, 1 Jan 2024 10:00:00 +0000\r\n"
+        f"Message-ID: <{subject}@example.com>\r\nReferences: <root@example.com>\r\n\r\n"
+    ).encode()
+
+
+def test_compress_uid_set():
+    assert compress_uid_set([]) == ""
+    assert compress_uid_set([5]) == "5"
+    assert compress_uid_set([103, 101, 102, 107, 109, 110]) == "101:103,107,109:110"
+
+
+def test_iter_fetch_items_multi_response():
+    data = [
+        (b"1 (UID 101 FLAGS (\\Seen) RFC822.HEADER {10}", b"Subject: a"),
+        b")",
+        (b"2 (UID 102 RFC822.HEADER {10}", b"Subject: b"),
+        b" FLAGS ())",
+        b"3 (UID 103 FLAGS (\\Answered \\Seen))",
+    ]
+    items = list(iter_fetch_items(data))
+    assert [i.uid for i in items] == [101, 102, 103]
+    assert [i.is_read for i in items] == [True, False, True]
+    assert items[0].sections == {"RFC822.HEADER": b"Subject: a"}
+    assert items[2].sections == {}
+
+
+def test_iter_fetch_items_multiple_literals_per_message():
+    data = [
+        (b"7 (UID 9 BODY[HEADER.FIELDS (SUBJECT FROM)] {3}", b"abc"),
+        (b" BODY[TEXT]<0> {2}", b"hi"),
+        b" RFC822.SIZE 1234)",
+    ]
+    (item,) = iter_fetch_items(data)
+    assert item.uid == 9
+    assert item.size == 1234
+    assert item.sections == {"BODY[HEADER.FIELDS (SUBJECT FROM)]": b"abc", "BODY[TEXT]<0>": b"hi"}
+
+
+class BatchImap:
+    def __init__(self, uids):
+        self.uids = uids
+        self.commands = []
+
+    def uid(self, command, uid_set, items):
+        self.commands.append((command, uid_set))
+        wanted = set()
+        for part in uid_set.split(","):
+            lo, _, hi = part.partition(":")
+            wanted.update(range(int(lo), int(hi or lo) + 1))
+        data = []
+        for seq, u in enumerate(self.uids, start=1):
+            if u in wanted:
+                head = f"{seq} (UID {u} FLAGS () BODY[HEADER.FIELDS (SUBJECT FROM DATE)] {{0}}"
+                data.append((head.encode(), _header(f"m{u}")))
+                data.append((b" BODY[TEXT]<0> {0}", f"Body of m{u}\r\n".encode()))
+                data.append(b")")
+        return "OK", data
+
+
+def test_headers_fetched_in_chunks():
+    imap = BatchImap(list(range(1, 11)))
+    results = _fetch_headers_for_uids(imap, list(range(1, 11)), batch_size=4)
+    assert imap.commands == [("fetch", "1:4"), ("fetch", "5:8"), ("fetch", "9:10")]
+    assert [r["provider_msg_id"] for r in results] == [str(u) for u in range(10, 0, -1)]
+    assert results[0]["subject"] == "m10"
+    assert results[0]["is_read"] is False
+    assert results[0]["snippet"] == "Body of m10"
+    assert results[0]["message_id"] == "<m10@example.com>"
+    assert results[0]["references"] == "<root@example.com>"
+
+
+def test_bodystructure_sections_and_text_parts():
+    meta = (
+        '1 (UID 5 BODYSTRUCTURE ((("TEXT" "PLAIN" ("CHARSET" "iso-8859-1") NIL NIL'
+        ' "QUOTED-PRINTABLE" 120 4 NIL NIL NIL)'
+        '("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "BASE64" 800 10 NIL NIL NIL)'
+        ' "ALTERNATIVE" ("BOUNDARY" "b1") NIL NIL)'
+        '("MESSAGE" "RFC822" NIL NIL NIL "7BIT" 900 NIL'
+        ' ("text" "plain" NIL NIL NIL "7bit" 20 1) 30 NIL NIL NIL)'
+        '("APPLICATION" "PDF" ("NAME" "x.pdf") NIL NIL "BASE64" 26000000 NIL'
+        ' ("ATTACHMENT" ("FILENAME" "x.pdf")) NIL)'
+        ' "MIXED" ("BOUNDARY" "b0") NIL NIL))'
+    )
+    parts = parse_bodystructure(meta)
+
+    assert [(p.section, p.content_type) for p in parts] == [
+        ("1.1", "text/plain"),
+        ("1.2", "text/html"),
+        ("2", "message/rfc822"),
+        ("2.1", "text/plain"),
+        ("3", "application/pdf"),
+    ]
+    text, html = text_parts(parts)
+    assert (text.section, text.charset, text.encoding) == ("1.1", "iso-8859-1", "quoted-printable")
+    assert (html.section, html.size) == ("1.2", 800)
+    assert parts[-1].is_attachment
+
+    (single,) = parse_bodystructure(
+        '1 (UID 1 BODYSTRUCTURE ("text" "calendar" NIL NIL NIL "7bit" 5 1))'
+    )
+    assert single.section == "1" and text_parts([single]) == (single, None)
+    assert parse_bodystructure("1 (UID 1 BODYSTRUCTURE (broken") is None
+
+
+def test_literal_inside_bodystructure_is_inlined():
+    data = [
+        (
+            b'1 (UID 7 BODYSTRUCTURE (("text" "plain" NIL NIL NIL "7bit" 5 1)'
+            b'("application" "pdf" ("name" {7}',
+            "r\u00e9.pdf".encode(),
+        ),
+        b') NIL NIL "base64" 10 NIL ("attachment" NIL) NIL) "mixed"))',
+    ]
+    (item,) = iter_fetch_items(data)
+    assert item.uid == 7 and item.sections == {}
+    assert parse_bodystructure(item.meta)[1].params == {"name": "r\u00e9.pdf"}
@@ -0,0 +1,135 @@
+import imaplib
+
+import pytest
+
+from message_hub.connectors.imap_connector import ImapAccountConfig, _with_session
+from message_hub.connectors.imap_pool import ImapConnectionPool, PoolTimeout
+
+
+class FakeImap:
+    opened = 0
+
+    def __init__(self, cfg):
+        FakeImap.opened += 1
+        self.cfg = cfg
+        self.logins = 0
+        self.selected = []
+        self.noops = 0
+        self.alive = True
+        self.logged_out = False
+
+    def login(self, user, password):
+        self.logins += 1
+        return "OK", [b"logged in"]
+
+    def select(self, mailbox):
+        self.selected.append(mailbox)
+        return "OK", [b"1"]
+
+    def noop(self):
+        self.noops += 1
+        if not self.alive:
+            raise imaplib.IMAP4.abort("socket closed")
+        return "OK", [b""]
+
+    def logout(self):
+        self.logged_out = True
+        return "BYE", [b""]
+
+
+@pytest.fixture(autouse=True)
+def _reset_counter():
+    FakeImap.opened = 0
+
+
+def _cfg(email="a@example.com", mailbox="INBOX"):
+    return ImapAccountConfig(host="imap.example.com", email=email, password="x", mailbox=mailbox)
+
+
+def test_session_is_reused_without_relogin():
+    pool = ImapConnectionPool(connect=FakeImap)
+    with pool.session(_cfg()) as first:
+        pass
+    with pool.session(_cfg()) as second:
+        pass
+    assert first is second
+    assert FakeImap.opened == 1
+    assert first.logins == 1
+    assert first.selected == ["INBOX"]
+
+
+def test_mailbox_switch_reselects_same_session():
+    pool = ImapConnectionPool(connect=FakeImap)
+    with pool.session(_cfg()) as first:
+        pass
+    with pool.session(_cfg(mailbox="Archive")) as second:
+        pass
+    assert first is second
+    assert second.selected == ["INBOX", "Archive"]
+
+
+def test_stale_session_is_replaced_after_failed_noop():
+    pool = ImapConnectionPool(connect=FakeImap, health_check_after=0)
+    with pool.session(_cfg()) as first:
+        pass
+    first.alive = False
+    with pool.session(_cfg()) as second:
+        pass
+    assert second is not first
+    assert first.logged_out
+    assert FakeImap.opened == 2
+    assert pool.stats()["open_per_host"] == {"imap.example.com": 1}
+
+
+def test_error_discards_session():
+    pool = ImapConnectionPool(connect=FakeImap)
+    with pytest.raises(RuntimeError):
+        with pool.session(_cfg()) as imap:
+            raise RuntimeError("boom")
+    assert imap.logged_out
+    assert pool.stats() == {"idle": 0, "open_per_host": {}}
+
+
+def test_host_cap_evicts_idle_session_of_other_account():
+    pool = ImapConnectionPool(connect=FakeImap, max_per_host=1)
+    with pool.session(_cfg("a@example.com")) as a:
+        pass
+    with pool.session(_cfg("b@example.com")) as b:
+        pass
+    assert a is not b
+    assert a.logged_out
+    assert pool.stats()["open_per_host"] == {"imap.example.com": 1}
+
+
+def test_host_cap_times_out_when_all_sessions_busy():
+    pool = ImapConnectionPool(connect=FakeImap, max_per_host=1, wait_timeout=0.05)
+    with pool.session(_cfg("a@example.com")):
+        with pytest.raises(TimeoutError):
+            with pool.session(_cfg("b@example.com")):
+                pass
+
+
+def test_pool_exhaustion_is_not_retried():
+    pool = ImapConnectionPool(connect=FakeImap, max_per_host=1, wait_timeout=0.05)
+    attempts = []
+    acquire = pool._acquire
+    pool._acquire = lambda cfg: attempts.append(cfg) or acquire(cfg)
+    with pool.session(_cfg("a@example.com")):
+        attempts.clear()
+        with pytest.raises(PoolTimeout):
+            _with_session(_cfg("b@example.com"), lambda imap: None, pool)
+    assert len(attempts) == 1
+
+
+def test_dropped_session_is_retried_once():
+    pool = ImapConnectionPool(connect=FakeImap)
+    calls = []
+
+    def fn(imap):
+        calls.append(imap)
+        if len(calls) == 1:
+            raise imaplib.IMAP4.abort("socket closed")
+        return "ok"
+
+    assert _with_session(_cfg(), fn, pool) == "ok"
+    assert calls[0] is not calls[1] and calls[0].logged_out
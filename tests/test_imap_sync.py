@@ -0,0 +1,231 @@
+import pytest
+from sqlalchemy import event, func, select, update
+
+from message_hub.connectors.imap_connector import ImapAccountConfig
+from message_hub.services import imap_sync
+from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
+from message_hub.storage.models import Base, Message, SyncState
+
+
+class FakeServer:
+    """Stands in for fetch_new_headers with a mailbox of sequential UIDs."""
+
+    def __init__(self, uids, uidvalidity=1):
+        self.uids = list(uids)
+        self.uidvalidity = uidvalidity
+        self.calls = []
+
+    def __call__(self, cfg, last_uid=None, uidvalidity=None, limit=30, pool=None, batch_size=100):
+        self.calls.append((last_uid, uidvalidity))
+        full = last_uid is None or uidvalidity != self.uidvalidity
+        wanted = self.uids[-limit:] if full else [u for u in self.uids if u > last_uid]
+        return {
+            "uidvalidity": self.uidvalidity,
+            "uidnext": (max(self.uids) + 1) if self.uids else 1,
+            "last_uid": max(self.uids, default=0),
+            "full": full,
+            "items": [
+                {
+                    "provider_msg_id": str(u),
+                    "subject": f"m{u}",
+                    "from_addr": "a@x",
+                    "date_raw": None,
+                }
+                for u in reversed(wanted)
+            ],
+        }
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = make_engine(DatabaseConfig(db_path=tmp_path / "sync.sqlite"))
+    Base.metadata.create_all(engine)
+    with make_session_factory(engine)() as s:
+        yield s
+
+
+def _cfg():
+    return ImapAccountConfig(host="imap.example.com", email="a@example.com", password="x")
+
+
+def _count(session):
+    return session.execute(select(func.count(Message.id))).scalar_one()
+
+
+def test_incremental_sync_fetches_only_new_uids(session, monkeypatch):
+    server = FakeServer(range(1, 11))
+    monkeypatch.setattr(imap_sync, "fetch_new_headers", server)
+
+    stats = imap_sync.sync_imap_headers(session, _cfg(), limit=5)
+    assert stats["inserted"] == 5
+    state = session.execute(select(SyncState)).scalar_one()
+    assert imap_sync.load_cursor(state) == {"uidvalidity": 1, "last_uid": 10}
+
+    server.uids += [11, 12]
+    stats = imap_sync.sync_imap_headers(session, _cfg(), limit=5)
+    assert server.calls[-1] == (10, 1)
+    assert stats["inserted"] == 2 and stats["skipped"] == 0 and stats["fetched"] == 2
+    assert not stats["full_resync"]
+    assert _count(session) == 7
+
+
+def test_quiet_mailbox_does_no_writes(session, monkeypatch):
+    server = FakeServer(range(1, 4))
+    monkeypatch.setattr(imap_sync, "fetch_new_headers", server)
+    imap_sync.sync_imap_headers(session, _cfg())
+
+    writes = []
+    event.listen(
+        session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, stmt, *a: (
+            writes.append(stmt) if not stmt.lstrip().upper().startswith("SELECT") else None
+        ),
+    )
+    stats = imap_sync.sync_imap_headers(session, _cfg())
+    assert stats["fetched"] == 0
+    assert writes == []
+
+
+def test_uidvalidity_change_triggers_full_resync(session, monkeypatch):
+    server = FakeServer(range(1, 4))
+    monkeypatch.setattr(imap_sync, "fetch_new_headers", server)
+    imap_sync.sync_imap_headers(session, _cfg())
+
+    server.uidvalidity = 2
+    server.uids = [100, 101]
+    stats = imap_sync.sync_imap_headers(session, _cfg())
+    assert stats["full_resync"] is True
+    ids = sorted(session.execute(select(Message.provider_msg_id)).scalars())
+    assert ids == ["100", "101"]
+
+
+def test_flag_sync_applies_changes_and_vanished(session, monkeypatch):
+    server = FakeServer(range(1, 6))
+    monkeypatch.setattr(imap_sync, "fetch_new_headers", server)
+    imap_sync.sync_imap_headers(session, _cfg())
+
+    calls = []
+
+    def fake_flags(cfg, since_modseq, uidvalidity, known_uids=None, allow_scan=True, **kw):
+        calls.append((since_modseq, len(known_uids or ()), allow_scan))
+        return {
+            "mode": "qresync",
+            "uidvalidity": 1,
+            "highestmodseq": 42,
+            "changes": {2: True, 3: False, 99: True},
+            "vanished": [5],
+        }
+
+    monkeypatch.setattr(imap_sync, "fetch_flag_changes", fake_flags)
+    stats = imap_sync.sync_imap_flags(session, _cfg())
+    assert stats == {"updated": 1, "vanished": 1, "mode": "qresync"}
+
+    rows = dict(session.execute(select(Message.provider_msg_id, Message.is_read)).all())
+    assert rows == {"1": False, "2": True, "3": False, "4": False}
+
+    imap_sync.sync_imap_flags(session, _cfg())
+    assert calls == [(None, 5, True), (42, 0, False)]  # the delta needs no stored UID list
+
+
+def test_flag_scan_keeps_local_reads_until_pushed(session, monkeypatch):
+    server = FakeServer(range(1, 4))
+    monkeypatch.setattr(imap_sync, "fetch_new_headers", server)
+    imap_sync.sync_imap_headers(session, _cfg())
+    session.execute(
+        update(Message)
+        .where(Message.provider_msg_id == "2")
+        .values(is_read=True, seen_pending=True)
+    )
+    session.commit()
+
+    seen = set()
+
+    def fake_flags(cfg, since_modseq, uidvalidity, known_uids=None, allow_scan=True, **kw):
+        changes = {u: u in seen for u in known_uids}
+        return {
+            "mode": "scan",
+            "uidvalidity": 1,
+            "highestmodseq": None,
+            "changes": changes,
+            "vanished": [],
+        }
+
+    pushes = []
+
+    def refuse(cfg, uids, **kw):
+        pushes.append(sorted(uids))
+        raise RuntimeError("NO [READ-ONLY]")
+
+    monkeypatch.setattr(imap_sync, "fetch_flag_changes", fake_flags)
+    monkeypatch.setattr(imap_sync, "mark_seen", refuse)
+    assert imap_sync.sync_imap_flags(session, _cfg(), scan_interval=0)["updated"] == 0
+
+    def read_state():
+        session.expire_all()
+        return {
+            u: (r, p)
+            for u, r, p in session.execute(
+                select(Message.provider_msg_id, Message.is_read, Message.seen_pending)
+            )
+        }
+
+    assert read_state()["2"] == (True, True)
+
+    def store(cfg, uids, **kw):
+        pushes.append(sorted(uids))
+        seen.update(uids)
+
+    monkeypatch.setattr(imap_sync, "mark_seen", store)
+    imap_sync.sync_imap_flags(session, _cfg(), scan_interval=0)
+    assert pushes == [[2], [2]]
+    assert read_state()["2"] == (True, False)
+
+
+def test_ingest_headers_dedups_in_one_statement(session):
+    from message_hub.services.message_ingest import ingest_headers
+
+    acc = imap_sync.get_or_create_account(session, "imap", "a@example.com")
+    fld = imap_sync.get_or_create_folder(session, acc.id, "INBOX", "INBOX")
+    items = [{"provider_msg_id": str(u), "subject": "s"} for u in (1, 2, 2, 3)]
+    first = ingest_headers(session, acc.id, fld.id, items)
+    second = ingest_headers(
+        session, acc.id, fld.id, [{"provider_msg_id": "3"}, {"provider_msg_id": "4"}]
+    )
+    session.commit()
+    assert (first["inserted"], first["skipped"]) == (3, 1)
+    assert (second["inserted"], second["skipped"]) == (1, 1)
+    assert _count(session) == 4
+
+
+def test_sync_publishes_committed_changes(session, monkeypatch):
+    from message_hub.storage.changes import change_bus
+
+    seen = []
+    unsubscribe = change_bus().subscribe(seen.append)
+    try:
+        server = FakeServer(range(1, 4))
+        monkeypatch.setattr(imap_sync, "fetch_new_headers", server)
+        stats = imap_sync.sync_imap_headers(session, _cfg())
+        assert [c.inserted for c in seen] == [tuple(stats["inserted_ids"])]
+
+        ids = dict(session.execute(select(Message.provider_msg_id, Message.id)).all())
+        monkeypatch.setattr(
+            imap_sync,
+            "fetch_flag_changes",
+            lambda *a, **kw: {
+                "mode": "qresync",
+                "uidvalidity": 1,
+                "highestmodseq": 7,
+                "changes": {1: True},
+                "vanished": [3],
+            },
+        )
+        imap_sync.sync_imap_flags(session, _cfg())
+        assert (seen[-1].updated, seen[-1].deleted) == ((ids["1"],), (ids["3"],))
+
+        server.uidvalidity = 2
+        imap_sync.sync_imap_headers(session, _cfg())
+        assert seen[-1].reset
+    finally:
+        unsubscribe()
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import QCoreApplication  # noqa: E402
+
+from message_hub.ui.message_list import MessageIdRole, MessageListModel, NewestUnreadRole  # noqa: E402
+
+
+@pytest.fixture(scope="module", autouse=True)
+def qt_app():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    yield app
+
+
+def _row(mid: int, subject: str = "", is_read: bool = False, date: str = ""):
+    return SimpleNamespace(
+        id=mid,
+        subject=subject or f"s{mid}",
+        from_addr="a@b",
+        date_utc=date or None,
+        created_at="2024-01-01 00:00:00",
+        is_read=is_read,
+    )
+
+
+class _Store:
+    def __init__(self, ids):
+        self.rows = [_row(i) for i in ids]
+        self.calls: list[tuple[int | None, int]] = []
+
+    def page(self, after, limit: int):
+        self.calls.append((after.id if after is not None else None, limit))
+        start = 0 if after is None else [r.id for r in self.rows].index(after.id) + 1
+        return self.rows[start : start + limit]
+
+
+def _ids(model: MessageListModel) -> list[int]:
+    return [model.index(r).data(MessageIdRole) for r in range(model.rowCount())]
+
+
+def test_fetch_more_loads_pages_lazily():
+    store = _Store(range(250, 0, -1))
+    model = MessageListModel(store.page, page_size=100)
+    assert model.rowCount() == 0 and model.canFetchMore()
+
+    model.fetchMore()
+    assert model.rowCount() == 100
+    model.fetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 250
+    assert not model.canFetchMore()
+    assert store.calls == [(None, 100), (151, 100), (51, 100)]
+
+
+def test_reset_drops_the_window_and_loads_the_first_page():
+    store = _Store(range(250, 0, -1))
+    model = MessageListModel(store.page, page_size=100)
+    model.fetchMore()
+    model.fetchMore()
+    store.rows = store.rows[::-1]
+
+    model.reset()
+    assert _ids(model) == list(range(1, 101))
+    assert model.canFetchMore()
+
+
+def test_apply_rows_emits_inserts_and_removes_only():
+    store = _Store([5, 4, 3, 2, 1])
+    model = MessageListModel(store.page, page_size=10)
+    model.reload()
+
+    events: list[tuple] = []
+    model.rowsInserted.connect(lambda _p, a, b: events.append(("ins", a, b)))
+    model.rowsRemoved.connect(lambda _p, a, b: events.append(("rm", a, b)))
+    model.modelReset.connect(lambda: events.append(("reset",)))
+
+    store.rows = [_row(7), _row(6), _row(5), _row(4), _row(2), _row(1)]
+    model.reload()
+
+    assert _ids(model) == [7, 6, 5, 4, 2, 1]
+    assert events == [("rm", 2, 2), ("ins", 0, 1)]
+    assert model.row_for_id(2) == 4
+    assert model.newest_id == 7
+
+
+def test_apply_rows_updates_in_place_and_tracks_newest_unread():
+    store = _Store([3, 2, 1])
+    model = MessageListModel(store.page, page_size=10)
+    model.reload()
+    assert model.index(0).data(NewestUnreadRole)
+
+    changed: list[int] = []
+    model.dataChanged.connect(lambda a, _b: changed.append(a.row()))
+    model.set_read(3)
+    assert changed == [0]
+    assert not model.index(0).data(NewestUnreadRole)
+
+    changed.clear()
+    store.rows = [_row(3, is_read=True), _row(2, subject="edited"), _row(1)]
+    model.reload()
+    assert model.message_at(1).subject == "edited"
+    assert 1 in changed
+
+
+def test_apply_rows_resets_when_order_changes():
+    store = _Store([3, 2, 1])
+    model = MessageListModel(store.page, page_size=10)
+    model.reload()
+
+    resets: list[bool] = []
+    model.modelReset.connect(lambda: resets.append(True))
+    store.rows = [_row(1), _row(3), _row(2)]
+    model.reload()
+
+    assert resets == [True]
+    assert _ids(model) == [1, 3, 2]
+
+
+def test_apply_changes_patches_loaded_rows_without_reloading():
+    store = _Store([])
+    store.rows = [_row(i, date=f"2024-01-0{i}") for i in (8, 6, 4, 2)]
+    model = MessageListModel(store.page, page_size=10)
+    model.reload()
+    calls = len(store.calls)
+
+    events: list[tuple] = []
+    model.rowsInserted.connect(lambda _p, a, b: events.append(("ins", a, b)))
+    model.rowsRemoved.connect(lambda _p, a, b: events.append(("rm", a, b)))
+
+    model.apply_changes(
+        [
+            _row(9, date="2024-01-09"),  # new, newest
+            _row(5, date="2024-01-05"),  # new, in the middle
+            _row(6, subject="edited", date="2024-01-06"),  # edited in place
+            _row(2, date="2024-01-07"),  # date corrected: moves up
+        ],
+        deleted_ids=[4],
+    )
+
+    assert _ids(model) == [9, 8, 2, 6, 5]
+    assert model.message_at(3).subject == "edited"
+    assert ("rm", 2, 2) in events and ("ins", 0, 0) in events
+    assert model.row_for_id(5) == 4
+    assert len(store.calls) == calls  # no re-query
+
+
+def test_apply_changes_leaves_rows_below_the_window_to_fetch_more():
+    store = _Store([])
+    store.rows = [_row(i, date=f"2024-01-{i:02d}") for i in range(20, 0, -1)]
+    model = MessageListModel(store.page, page_size=5)
+    model.fetchMore()
+
+    model.apply_changes([_row(99, date="2023-12-31")])
+    assert 99 not in _ids(model)
+    assert model.rowCount() == 5
+
+
+def test_reload_rereads_only_the_first_page():
+    store = _Store(range(250, 0, -1))
+    model = MessageListModel(store.page, page_size=100)
+    model.fetchMore()
+    model.fetchMore()
+
+    store.rows = [_row(300)] + [r for r in store.rows if r.id != 200]
+    store.calls.clear()
+    model.reload()
+
+    assert store.calls == [(None, 100)]
+    assert _ids(model) == [300, *range(250, 200, -1), *range(199, 50, -1)]
+    assert model.canFetchMore()
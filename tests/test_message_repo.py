@@ -0,0 +1,123 @@
+import datetime as dt
+
+import pytest
+
+from message_hub.services.message_repo import (
+    cursor_for,
+    get_latest_messages_sqlite,
+    get_messages_by_ids_sqlite,
+    get_messages_page_sqlite,
+    get_thread_messages_sqlite,
+)
+from message_hub.services.message_rows import MessageListRow
+from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
+from message_hub.storage.models import Account, Base, Folder, Message
+from message_hub.storage.sqlite_conn import connection_manager
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "repo.sqlite"
+    engine = make_engine(DatabaseConfig(db_path=path))
+    Base.metadata.create_all(engine)
+    base = dt.datetime(2024, 1, 1)
+    with make_session_factory(engine)() as s:
+        accounts = [Account(provider="imap", email=f"u{i}@x") for i in range(2)]
+        s.add_all(accounts)
+        s.flush()
+        folders = [
+            Folder(account_id=a.id, provider_folder_id="INBOX", name="INBOX") for a in accounts
+        ]
+        s.add_all(folders)
+        s.flush()
+        for n in range(60):
+            acc = accounts[n % 2]
+            s.add(
+                Message(
+                    account_id=acc.id,
+                    folder_id=folders[n % 2].id,
+                    provider_msg_id=str(n),
+                    subject=f"m{n}",
+                    # every 10th message is undated; pairs share a date to exercise the tie-breakers
+                    date_utc=None if n % 10 == 0 else base + dt.timedelta(hours=n // 2),
+                    is_read=n % 3 == 0,
+                    created_at=base,
+                )
+            )
+        s.commit()
+    engine.dispose()
+    return path
+
+
+def _walk(db_path, page_size, **filters):
+    out, after = [], None
+    while True:
+        page = get_messages_page_sqlite(db_path, limit=page_size, after=after, **filters)
+        out.extend(page)
+        if len(page) < page_size:
+            return out
+        after = cursor_for(page[-1])
+
+
+def test_keyset_pages_cover_inbox_once_in_order(db_path):
+    everything = get_latest_messages_sqlite(db_path, limit=1000)
+    walked = _walk(db_path, 7)
+
+    assert [m.id for m in walked] == [m.id for m in everything]
+    assert len({m.id for m in walked}) == 60
+    # newest first, undated messages last
+    dated = [m.date_utc for m in walked if m.date_utc]
+    assert dated == sorted(dated, reverse=True)
+    assert all(m.date_utc is None for m in walked[len(dated) :])
+
+
+def test_filters_share_the_keyset_path(db_path):
+    unread = _walk(db_path, 4, account_id=1, unread_only=True)
+    expected = [
+        m.id
+        for m in get_latest_messages_sqlite(db_path, limit=1000)
+        if m.account_id == 1 and not m.is_read
+    ]
+
+    assert [m.id for m in unread] == expected
+    assert _walk(db_path, 5, folder_id=2) == [m for m in _walk(db_path, 5) if m.folder_id == 2]
+
+
+def test_list_rows_are_slotted_and_typed(db_path):
+    rows = get_latest_messages_sqlite(db_path, limit=5)
+
+    assert all(type(m) is MessageListRow for m in rows)
+    assert not hasattr(rows[0], "__dict__")
+    assert all(isinstance(m.is_read, bool) for m in rows)
+    assert get_messages_by_ids_sqlite(db_path, [m.id for m in rows][::-1]) == rows
+
+
+def _plans(db_path, call) -> list[str]:
+    """EXPLAIN QUERY PLAN details of the SELECTs `call` runs on this thread's reader."""
+    conn = connection_manager(db_path).read()
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [
+        " / ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+        for sql in statements
+        if sql.lstrip().upper().startswith("SELECT")
+    ]
+
+
+def test_deep_pages_and_threads_seek_their_index(db_path):
+    after = cursor_for(get_latest_messages_sqlite(db_path, limit=30)[-1])
+    cases = (({}, "ix_messages_inbox"), ({"folder_id": 2}, "ix_messages_folder_inbox"))
+    for filters, index in cases:
+        def page(filters=filters):
+            return get_messages_page_sqlite(db_path, limit=5, after=after, **filters)
+
+        (plan,) = _plans(db_path, page)
+        assert plan.startswith("SEARCH messages")
+        assert f"INDEX {index} (" in plan and "<expr><?" in plan
+
+    (plan,) = _plans(db_path, lambda: get_thread_messages_sqlite(db_path, 1, "<t@x>"))
+    assert "USING INDEX ix_messages_thread (account_id=? AND thread_id=?)" in plan
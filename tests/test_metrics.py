@@ -0,0 +1,115 @@
+import pytest
+
+from message_hub import metrics as metrics_mod
+from message_hub.connectors import imap_pool
+from message_hub.metrics import MetricsRegistry, metrics, status_text, timed
+from message_hub.services.imap_sync import sync_imap_flags, sync_imap_headers
+from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
+from message_hub.storage.models import Base
+from message_hub.testing.fake_imap import FakeImapServer, FakeMailbox
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    reg = MetricsRegistry(enabled=True)
+    monkeypatch.setattr(metrics_mod, "_REGISTRY", reg)
+    return reg
+
+
+def test_disabled_registry_records_nothing(monkeypatch):
+    reg = MetricsRegistry(enabled=False)
+    monkeypatch.setattr(metrics_mod, "_REGISTRY", reg)
+
+    @timed("call_seconds")
+    def call(x):
+        return x * 2
+
+    reg.inc("events_total")
+    reg.observe("size_bytes", 10)
+    with reg.timer("block_seconds"):
+        pass
+    assert reg.timer("a") is reg.timer("b")  # one shared no-op context manager
+    assert call(21) == 42
+    assert reg.snapshot()["counters"] == {} and reg.snapshot()["histograms"] == {}
+
+
+def test_counters_histograms_and_scoped_labels(registry):
+    registry.inc("events_total", kind="a")
+    registry.inc("events_total", 2, kind="b")
+    with registry.scope(account="x@example.com"):
+        registry.inc("events_total", kind="a")
+        with registry.scope(mailbox="INBOX"):
+            registry.observe("wait_seconds", 0.003)
+        registry.observe("wait_seconds", 0.2)
+    registry.observe("wait_seconds", 0.0001, account="y@example.com")
+
+    assert registry.total("events_total") == 4
+    assert registry.total("events_total", kind="a") == 2
+    assert registry.total("events_total", account="x@example.com") == 1
+    assert registry.label_values("account") == ["x@example.com", "y@example.com"]
+
+    hist = registry.histogram("wait_seconds", account="x@example.com")
+    assert hist.count == 2 and hist.max == 0.2 and hist.quantile(0.5) == 0.005
+    assert registry.histogram("wait_seconds").count == 3
+    assert registry.histogram("missing_seconds") is None
+
+    series = registry.snapshot()["histograms"]["wait_seconds"]
+    assert {"account": "x@example.com", "mailbox": "INBOX"} in [s["labels"] for s in series]
+
+
+def test_prometheus_export(registry, tmp_path):
+    registry.inc("syncs_total", 3, account='we"ird')
+    registry.observe("fetch_seconds", 0.002)
+    registry.observe("fetch_seconds", 7.0)
+
+    text = registry.prometheus_text()
+    assert "# TYPE message_hub_syncs_total counter" in text
+    assert 'message_hub_syncs_total{account="we\\"ird"} 3' in text
+    assert "# TYPE message_hub_fetch_seconds histogram" in text
+    assert 'message_hub_fetch_seconds_bucket{le="0.001"} 0' in text
+    assert 'message_hub_fetch_seconds_bucket{le="0.0025"} 1' in text
+    assert 'message_hub_fetch_seconds_bucket{le="+Inf"} 2' in text
+    assert "message_hub_fetch_seconds_count 2" in text
+
+    path = tmp_path / "out" / "metrics.prom"
+    registry.write_prometheus(path)
+    assert path.read_text() == text
+    assert [p.name for p in path.parent.iterdir()] == ["metrics.prom"]
+
+
+def test_sync_records_commands_phases_and_account(registry, monkeypatch, tmp_path):
+    monkeypatch.setattr(imap_pool, "_default_pool", imap_pool.ImapConnectionPool())
+    box = FakeMailbox(size=100)
+    engine = make_engine(DatabaseConfig(db_path=tmp_path / "m.sqlite"))
+    Base.metadata.create_all(engine)
+    try:
+        with FakeImapServer(box) as server, make_session_factory(engine)() as session:
+            cfg = server.config()
+            sync_imap_headers(session, cfg, limit=40)
+            box.append(3)
+            sync_imap_headers(session, cfg)
+            sync_imap_flags(session, cfg)
+            imap_pool.default_pool().close_all()
+    finally:
+        engine.dispose()
+
+    acc = {"account": cfg.email}
+    assert metrics() is registry
+    assert registry.histogram("sync_seconds", kind="headers", **acc).count == 2
+    assert registry.histogram("sync_seconds", kind="flags", **acc).count == 1
+    for phase in ("fetch", "ingest", "threading", "commit"):
+        hist = registry.histogram("sync_phase_seconds", kind="headers", phase=phase, **acc)
+        assert hist.count == 2
+    assert registry.total("sync_messages_total", result="inserted", **acc) == 43
+
+    commands = {
+        dict(s["labels"])["command"]
+        for s in registry.snapshot()["histograms"]["imap_command_seconds"]
+    }
+    assert {"LOGIN", "SELECT", "STATUS", "UID SEARCH", "UID FETCH"} <= commands
+    assert registry.histogram("imap_command_seconds", command="UID FETCH", **acc).count >= 2
+    assert registry.histogram("imap_connect_seconds", **acc).count == 1
+    assert registry.histogram("mime_parse_seconds", part="headers", **acc).count >= 2
+
+    line = status_text(registry, account=cfg.email)
+    assert line.startswith("sync 2×") and "43 new" in line and "IMAP" in line
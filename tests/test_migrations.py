@@ -0,0 +1,138 @@
+import sqlite3
+
+import pytest
+
+from message_hub.services.message_actions import get_message_sqlite, save_body_sqlite
+from message_hub.services.message_repo import INBOX_ORDER_BY
+from message_hub.storage.db import DatabaseConfig, make_engine
+from message_hub.storage.migrations import LATEST_VERSION, ensure_schema
+from message_hub.storage.sqlite_conn import connection_manager
+
+# What Base.metadata.create_all produced before migrations existed.
+LEGACY_SCHEMA = """
+CREATE TABLE accounts (id INTEGER PRIMARY KEY, provider VARCHAR(32) NOT NULL,
+    email VARCHAR(256) NOT NULL, display_name VARCHAR(256), auth_json TEXT,
+    created_at DATETIME NOT NULL);
+CREATE TABLE folders (id INTEGER PRIMARY KEY, account_id INTEGER NOT NULL,
+    provider_folder_id VARCHAR(256) NOT NULL, name VARCHAR(256) NOT NULL,
+    CONSTRAINT uq_folders_account_provider_id UNIQUE (account_id, provider_folder_id));
+CREATE TABLE messages (id INTEGER PRIMARY KEY, account_id INTEGER NOT NULL,
+    folder_id INTEGER NOT NULL, provider_msg_id VARCHAR(256) NOT NULL, thread_id VARCHAR(256),
+    from_addr VARCHAR(512), to_addrs TEXT,
+    subject VARCHAR(512), snippet TEXT, date_utc DATETIME, body_text TEXT, body_html TEXT,
+    is_read BOOLEAN NOT NULL, created_at DATETIME NOT NULL,
+    CONSTRAINT uq_messages_account_provider_msg_id UNIQUE (account_id, provider_msg_id));
+INSERT INTO accounts VALUES (1, 'imap', 'a@x', NULL, NULL, '2024-01-01 00:00:00');
+INSERT INTO folders VALUES (1, 1, 'INBOX', 'INBOX');
+INSERT INTO messages (account_id, folder_id, provider_msg_id, subject, is_read, created_at)
+    VALUES (1, 1, '7', 'kept', 0, '2024-01-01 00:00:00');
+INSERT INTO messages (account_id, folder_id, provider_msg_id, subject, body_text, body_html,
+    is_read, created_at)
+    VALUES (1, 1, '8', 'with body', 'hi',
+    '<p>' || replace(hex(zeroblob(2000)), '00', 'ab') || '</p>', 1, '2024-01-01');
+"""
+
+
+def _indexes(path):
+    with sqlite3.connect(path) as conn:
+        return {
+            r[0]
+            for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'messages'"
+            )
+        }
+
+
+def _version(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def test_fresh_database_is_created_at_latest_version(tmp_path):
+    path = tmp_path / "fresh.sqlite"
+    result = ensure_schema(make_engine(DatabaseConfig(db_path=path)))
+
+    assert result["from_version"] == 0 and result["to_version"] == LATEST_VERSION
+    assert _version(path) == LATEST_VERSION
+    assert {
+        "ix_messages_inbox",
+        "ix_messages_account_inbox",
+        "ix_messages_unread_inbox",
+    } <= _indexes(path)
+
+    # second start: nothing to do
+    assert ensure_schema(make_engine(DatabaseConfig(db_path=path)))["applied"] == []
+
+
+def test_legacy_database_is_upgraded_in_place(tmp_path):
+    path = tmp_path / "legacy.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+
+    result = ensure_schema(make_engine(DatabaseConfig(db_path=path)))
+
+    assert result["from_version"] == 0 and len(result["applied"]) == LATEST_VERSION
+    assert "ix_messages_folder_inbox" in _indexes(path)
+    with sqlite3.connect(path) as conn:
+        subjects = conn.execute("SELECT subject FROM messages ORDER BY id").fetchall()
+        assert subjects == [("kept",), ("with body",)]
+        assert conn.execute("SELECT count(*) FROM sync_state").fetchone() == (0,)
+        columns = {r[1] for r in conn.execute("PRAGMA table_info(messages)")}
+        assert "body_text" not in columns and "body_html" not in columns
+        assert conn.execute("SELECT seen_pending FROM messages").fetchall() == [(0,), (0,)]
+        # bodies moved out; the big HTML part is stored compressed
+        ((html_z, codec, raw_size),) = conn.execute(
+            "SELECT html_z, html_codec, raw_size FROM message_bodies"
+        )
+        assert codec == "zlib" and len(html_z) < 200 and raw_size == len("hi") + 4007
+
+    msg = get_message_sqlite(path, 2)
+    assert msg.has_body and msg.body_text == "hi" and msg.body_html.startswith("<p>abab")
+    assert not get_message_sqlite(path, 1).has_body
+    connection_manager(path).close()
+
+
+def test_bodies_are_deleted_with_their_message(tmp_path):
+    path = tmp_path / "cascade.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+    ensure_schema(make_engine(DatabaseConfig(db_path=path)))
+
+    save_body_sqlite(path, 1, "short", None)
+    with sqlite3.connect(path) as conn:
+        row = conn.execute("SELECT text_codec FROM message_bodies WHERE message_id = 1").fetchone()
+        assert row == ("raw",)
+        conn.execute("DELETE FROM messages")
+        assert conn.execute("SELECT count(*) FROM message_bodies").fetchone() == (0,)
+    connection_manager(path).close()
+
+
+def test_inbox_queries_use_the_sort_key_index(tmp_path):
+    path = tmp_path / "plan.sqlite"
+    ensure_schema(make_engine(DatabaseConfig(db_path=path)))
+    with sqlite3.connect(path) as conn:
+        first = " ".join(
+            r[-1]
+            for r in conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT * FROM messages ORDER BY {INBOX_ORDER_BY} LIMIT 50"
+            )
+        )
+        seek = " ".join(
+            r[-1]
+            for r in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM messages WHERE account_id = 1 "
+                "AND (COALESCE(date_utc, ''), created_at, id) < ('x', 'y', 3) "
+                f"ORDER BY {INBOX_ORDER_BY} LIMIT 50"
+            )
+        )
+    assert "ix_messages_inbox" in first and "TEMP B-TREE" not in first
+    assert "ix_messages_account_inbox" in seek and "TEMP B-TREE" not in seek
+
+
+def test_newer_database_is_refused(tmp_path):
+    path = tmp_path / "future.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.execute(f"PRAGMA user_version = {LATEST_VERSION + 1}")
+
+    with pytest.raises(RuntimeError):
+        ensure_schema(make_engine(DatabaseConfig(db_path=path)))
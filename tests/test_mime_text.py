@@ -0,0 +1,45 @@
+import base64
+from email.parser import BytesHeaderParser
+
+from message_hub.connectors.mime_text import html_to_text, normalize_snippet, snippet_from_partial
+
+
+def _headers(raw: str):
+    return BytesHeaderParser().parsebytes(raw.encode() + b"\r\n")
+
+
+def test_html_to_text_skips_markup():
+    assert html_to_text("<p>a&nbsp;b</p><script>x()</script>\n<div>c</div>") == "a b c"
+
+
+def test_snippet_from_truncated_multipart_prefers_plain_text():
+    headers = _headers('Subject: x\r\nContent-Type: multipart/alternative; boundary="b1"\r\n')
+    partial = (
+        b"--b1\r\nContent-Type: text/plain; charset=utf-8\r\n"
+        b"Content-Transfer-Encoding: base64\r\n\r\n"
+        + base64.encodebytes("Grüße aus Köln, bis morgen!".encode())
+        + b"\r\n--b1\r\nContent-Type: text/html\r\n\r\n<p>Gr"  # cut mid-part, as <0.N> does
+    )
+    assert snippet_from_partial(headers, partial) == "Grüße aus Köln, bis morgen!"
+
+
+def test_snippet_from_html_only_and_truncated_base64():
+    html = _headers(
+        "Content-Type: text/html; charset=iso-8859-1\r\n"
+        "Content-Transfer-Encoding: quoted-printable\r\n"
+    )
+    partial = b"<style>p{}</style><p>Caf=E9 at <b>noon</b></p>"
+    assert snippet_from_partial(html, partial) == "Café at noon"
+
+    b64 = _headers(
+        "Content-Type: text/plain; charset=utf-8\r\nContent-Transfer-Encoding: base64\r\n"
+    )
+    cut = base64.b64encode("héllo wörld again".encode())[:15]
+    assert snippet_from_partial(b64, cut) == "héllo w"  # 9 bytes decoded, half an ö dropped
+    assert snippet_from_partial(b64, None) is None
+
+
+def test_normalize_snippet_drops_quotes_and_cuts_at_a_word():
+    assert normalize_snippet("Sure.\r\n\r\n> old\r\n>> older\r\nBye") == "Sure. Bye"
+    assert normalize_snippet("word " * 100, max_chars=22) == "word word word word…"
+    assert normalize_snippet(" \r\n> only quoted") is None
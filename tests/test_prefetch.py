@@ -0,0 +1,238 @@
+import re
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from message_hub.connectors.imap_connector import (
+    ImapAccountConfig,
+    _fetch_bodies,
+    _fetch_full_message,
+)
+from message_hub.services import prefetch
+from message_hub.services.message_actions import get_message_sqlite
+from message_hub.services.prefetch import BodyPrefetcher, PrefetchPolicy
+from message_hub.storage.db import DatabaseConfig, make_engine
+from message_hub.storage.migrations import ensure_schema
+from message_hub.storage.sqlite_conn import connection_manager
+
+RAW = b"Subject: s\r\nContent-Type: text/plain\r\n\r\nhello\r\n"
+
+PDF_MAIL = (
+    '(("text" "plain" ("charset" "iso-8859-1") NIL NIL "quoted-printable" 9 1 NIL NIL NIL)'
+    '("application" "pdf" ("name" "big.pdf") NIL NIL "base64" 25000000 NIL ("attachment" NIL) NIL)'
+    ' "mixed")'
+)
+ALTERNATIVE = (
+    '(("text" "plain" ("charset" "utf-8") NIL NIL "base64" 8 1 NIL NIL NIL)'
+    '("text" "html" ("charset" "utf-8") NIL NIL "7bit" 5000 1 NIL NIL NIL) "alternative")'
+)
+MESSAGES = {
+    # uid: (RFC822.SIZE, BODYSTRUCTURE or None, sections)
+    1: (25_000_400, PDF_MAIL, {"1": b"caf=E9 ok"}),
+    2: (
+        300,
+        '("text" "plain" ("charset" "utf-8") NIL NIL "base64" 8 1 NIL NIL NIL)',
+        {"1": b"aMOpbGxv"},
+    ),
+    3: (len(RAW), None, {}),  # server without a usable BODYSTRUCTURE
+    4: (5200, ALTERNATIVE, {"1": b"aMOpbGxv", "2": b"<p>" + b"x" * 4993 + b"</p>"}),
+}
+
+
+class BodyImap:
+    def __init__(self, messages):
+        self.messages = messages
+        self.commands = []
+
+    def uid(self, command, uid_set, items):
+        self.commands.append((uid_set, items))
+        wanted = set()
+        for part in uid_set.split(","):
+            lo, _, hi = part.partition(":")
+            wanted.update(range(int(lo), int(hi or lo) + 1))
+        data = []
+        for seq, u in enumerate(sorted(self.messages), start=1):
+            if u not in wanted:
+                continue
+            size, structure, sections = self.messages[u]
+            if "BODYSTRUCTURE" in items:
+                extra = f" BODYSTRUCTURE {structure}" if structure else ""
+                data.append(f"{seq} (UID {u} FLAGS () RFC822.SIZE {size}{extra})".encode())
+            elif "BODY.PEEK[]" in items:
+                data.append((f"{seq} (UID {u} BODY[] {{{len(RAW)}}}".encode(), RAW))
+                data.append(b")")
+            else:
+                for n, sec in enumerate(re.findall(r"BODY(?:\.PEEK)?\[([^\]]*)\]", items)):
+                    head = f"{seq} (UID {u} " if n == 0 else " "
+                    data.append(
+                        (f"{head}BODY[{sec}] {{{len(sections[sec])}}}".encode(), sections[sec])
+                    )
+                data.append(b")")
+        return "OK", data
+
+
+def test_fetch_bodies_downloads_only_text_sections():
+    imap = BodyImap(MESSAGES)
+    res = _fetch_bodies(imap, [1, 2, 3, 4], max_size=1000, batch_size=20)
+
+    assert res["bodies"][1] == {"body_text": "café ok", "body_html": None}
+    assert res["bodies"][2]["body_text"] == "héllo"
+    assert res["bodies"][3]["body_text"] == "hello"  # whole-message fallback
+    assert res["too_large"] == [4]  # its HTML part alone is over the limit
+    # one structure round-trip, then the sections; the PDF is never requested
+    assert imap.commands == [
+        ("1:4", "(UID FLAGS RFC822.SIZE BODYSTRUCTURE)"),
+        ("1:2", "(UID BODY.PEEK[1])"),
+        ("3", "(UID BODY.PEEK[])"),
+    ]
+    assert res["bytes"] == 9 + 8 + len(RAW)
+    assert res["bytes_saved"] == (25_000_400 - 9) + (300 - 8)
+
+
+def test_full_message_fetches_text_and_html_sections():
+    imap = BodyImap(MESSAGES)
+    msg = _fetch_full_message(imap, "4")
+
+    # opening a message marks it read on the server, as the RFC822 fetch did
+    assert imap.commands[-1] == ("4", "(UID BODY[1] BODY[2])")
+    assert msg["body_text"] == "héllo" and msg["body_html"].startswith("<p>xxx")
+    assert msg["bytes_saved"] == 5200 - msg["bytes"]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "prefetch.sqlite"
+    engine = make_engine(DatabaseConfig(db_path=path))
+    ensure_schema(engine)
+    with engine.begin() as conn:
+        for acc in (1, 2):
+            conn.execute(
+                text(
+                    "INSERT INTO accounts (id, provider, email, created_at) "
+                    f"VALUES ({acc}, 'imap', 'u{acc}@x', '2024')"
+                )
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO folders (id, account_id, provider_folder_id, name) "
+                    f"VALUES ({acc}, {acc}, 'INBOX', 'INBOX')"
+                )
+            )
+        for mid in range(1, 11):
+            acc = 1 if mid <= 6 else 2
+            conn.execute(
+                text(
+                    "INSERT INTO messages (id, account_id, folder_id, provider_msg_id, is_read,"
+                    " date_utc, created_at) "
+                    f"VALUES ({mid}, {acc}, {acc}, '{100 + mid}', {int(mid % 2 == 0)},"
+                    f" '2024-01-{mid:02d}', '2024')"
+                )
+            )
+    engine.dispose()
+    yield path
+    connection_manager(path).close()
+
+
+class FakeFetch:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, cfg, uids, max_size=None, batch_size=20):
+        with self.lock:
+            self.calls.append((cfg.email, sorted(uids)))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return {
+            "bodies": {u: {"body_text": f"body {u}", "body_html": None} for u in uids},
+            "bytes": 1000 * len(uids),
+            "too_large": [],
+        }
+
+
+def _accounts(email):
+    return ImapAccountConfig(host="imap.example.com", email=email, password="x")
+
+
+def _drain(prefetcher, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        st = prefetcher.stats()
+        if not st["queued"] and not st["inflight"]:
+            return st
+        time.sleep(0.01)
+    raise AssertionError("prefetch did not finish")
+
+
+def test_top_unread_fetched_per_account_and_cached(db_path):
+    fetch = FakeFetch()
+    p = BodyPrefetcher(db_path, _accounts, PrefetchPolicy(top_unread=4, batch_size=10), fetch=fetch)
+    assert p.prefetch_top_unread() == 4  # unread = odd ids, newest first: 9, 7, 5, 3
+    st = _drain(p)
+    p.shutdown(wait=True)
+
+    assert sorted(fetch.calls) == [("u1@x", [103, 105]), ("u2@x", [107, 109])]
+    assert get_message_sqlite(db_path, 9).body_text == "body 109"
+    assert st["fetched"] == 4 and st["bytes"] == 4000
+
+    # cached bodies are no longer candidates: only unread id 1 is left
+    p2 = BodyPrefetcher(db_path, _accounts, PrefetchPolicy(top_unread=4), fetch=fetch)
+    assert p2.prefetch_top_unread() == 1
+    p2.shutdown(wait=True)
+
+
+def test_concurrency_and_bandwidth_budget(db_path):
+    fetch = FakeFetch(delay=0.05)
+    policy = PrefetchPolicy(batch_size=1, max_concurrency=2, max_bytes_per_minute=3000)
+    p = BodyPrefetcher(db_path, _accounts, policy, fetch=fetch)
+    p._budget.window = 0.5
+    p.prefetch(range(1, 11))
+    deadline = time.monotonic() + 5.0
+    st = p.stats()
+    while not (st["deferred"] and not st["inflight"]) and time.monotonic() < deadline:
+        time.sleep(0.01)
+        st = p.stats()
+
+    assert fetch.max_active <= 2
+    # the budget stops new batches once ~3000 bytes went by; the rest waits in the queue
+    assert 3 <= st["fetched"] < 10
+    assert st["deferred"] == st["queued"] == 10 - st["fetched"]
+
+    # ...and is fetched once the window has room again
+    st = _drain(p)
+    p.shutdown(wait=True)
+    assert st["fetched"] == 10
+
+
+def test_hit_rate_counts_only_opens_that_needed_a_body(db_path):
+    p = BodyPrefetcher(db_path, _accounts, PrefetchPolicy(), fetch=FakeFetch())
+    p.prefetch([1, 2])
+    _drain(p)
+
+    assert p.record_open(1, cached=True) is True  # prefetched
+    assert p.record_open(3, cached=False) is False  # had to go to the network
+    assert p.record_open(1, cached=True) is False  # re-open: ignored
+    st = p.stats()
+    p.shutdown(wait=True)
+    assert (st["opens"], st["hits"], st["hit_rate"]) == (2, 1, 0.5)
+
+
+def test_prefetched_ids_are_remembered_up_to_a_bound(db_path, monkeypatch):
+    monkeypatch.setattr(prefetch, "PREFETCHED_KEPT", 2)
+    p = BodyPrefetcher(db_path, _accounts, PrefetchPolicy(batch_size=10), fetch=FakeFetch())
+    p.prefetch([1])
+    _drain(p)
+    p.prefetch([3, 5])
+    _drain(p)
+
+    assert p.record_open(1, cached=True) is False  # evicted: counted as a miss
+    assert p.record_open(5, cached=True) is True
+    p.shutdown(wait=True)
@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+
+from message_hub.services.message_actions import save_bodies_sqlite, save_body_sqlite
+from message_hub.services.search import fts_query, search_messages_sqlite
+from message_hub.storage.db import DatabaseConfig, make_engine
+from message_hub.storage.migrations import ensure_schema
+from message_hub.storage.sqlite_conn import connection_manager
+
+MESSAGES = [
+    # id, subject, from_addr
+    (1, "Quarterly report", "Alice <alice@example.com>"),
+    (2, "Lunch?", "Bob <bob@example.com>"),
+    (3, "Re: lunch", "Carol <carol@example.com>"),
+    (4, "Invoice 2024-05", "billing@shop.example"),
+]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "search.sqlite"
+    engine = make_engine(DatabaseConfig(db_path=path))
+    ensure_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO accounts (id, provider, email, created_at) "
+                "VALUES (1, 'imap', 'me@x', '2024')"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO folders (id, account_id, provider_folder_id, name) "
+                "VALUES (1, 1, 'INBOX', 'INBOX')"
+            )
+        )
+        for mid, subject, sender in MESSAGES:
+            conn.execute(
+                text(
+                    "INSERT INTO messages (id, account_id, folder_id, provider_msg_id, subject,"
+                    " from_addr, is_read, created_at) "
+                    "VALUES (:id, 1, 1, :uid, :subject, :sender, 0, '2024')"
+                ),
+                {"id": mid, "uid": str(mid), "subject": subject, "sender": sender},
+            )
+    engine.dispose()
+    yield path
+    connection_manager(path).close()
+
+
+def _ids(db_path, query, **kw):
+    return [m.id for m in search_messages_sqlite(db_path, query, **kw)]
+
+
+def test_fts_query_quotes_words_and_prefixes_the_last():
+    assert fts_query("lunch fri") == '"lunch" "fri"*'
+    assert fts_query("lunch ") == '"lunch"'
+    assert fts_query('a" OR NEAR(') == '"a""" "OR" "NEAR("*'
+    assert fts_query("  -- ") is None
+
+
+def test_headers_are_indexed_and_follow_updates(db_path):
+    assert _ids(db_path, "lunch") == [2, 3]
+    assert _ids(db_path, "carol") == [3]
+    assert _ids(db_path, "quart") == [1]  # prefix while typing
+    assert _ids(db_path, "shop.example") == [4]
+
+    with connection_manager(db_path).write() as conn:
+        conn.execute("UPDATE messages SET subject = 'Dinner?' WHERE id = 2")
+        conn.execute("DELETE FROM messages WHERE id = 3")
+    assert _ids(db_path, "lunch") == []
+    assert _ids(db_path, "dinner") == [2]
+
+
+def test_bodies_are_indexed_on_save_and_rank_below_subjects(db_path):
+    save_body_sqlite(db_path, 1, None, "<html><style>p {}</style><p>Lunch &amp; numbers</p></html>")
+    save_bodies_sqlite(db_path, {4: ("Pay by Friday", None)})
+
+    assert _ids(db_path, "friday") == [4]
+    assert _ids(db_path, "numbers") == [1]
+    assert _ids(db_path, "style") == []  # CSS is not text
+    # subject matches outrank the body match
+    assert _ids(db_path, "lunch") == [2, 3, 1]
+    assert _ids(db_path, "lunch", limit=2, offset=1) == [3, 1]
+
+
+def test_migration_indexes_existing_messages_and_bodies(tmp_path):
+    path = tmp_path / "legacy.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE accounts (id INTEGER PRIMARY KEY, provider VARCHAR(32) NOT NULL,
+                email VARCHAR(256) NOT NULL, display_name VARCHAR(256), auth_json TEXT,
+                created_at DATETIME NOT NULL);
+            CREATE TABLE messages (id INTEGER PRIMARY KEY, account_id INTEGER NOT NULL,
+                folder_id INTEGER NOT NULL, provider_msg_id VARCHAR(256) NOT NULL,
+                thread_id VARCHAR(256), from_addr VARCHAR(512), to_addrs TEXT,
+                subject VARCHAR(512), snippet TEXT, date_utc DATETIME, body_text TEXT,
+                body_html TEXT, is_read BOOLEAN NOT NULL, created_at DATETIME NOT NULL);
+            INSERT INTO messages (account_id, folder_id, provider_msg_id, subject, body_html,
+                is_read, created_at)
+                VALUES (1, 1, '7', 'hello', '<b>zebra</b>', 0, '2024');
+            """
+        )
+    ensure_schema(make_engine(DatabaseConfig(db_path=path)))
+
+    assert _ids(path, "hello") == [1]
+    assert _ids(path, "zebra") == [1]
+    connection_manager(path).close()
+
+
+def test_older_matches_follow_the_ranked_window(db_path, monkeypatch):
+    monkeypatch.setattr("message_hub.services.search.RANK_WINDOW", 2)
+    save_body_sqlite(db_path, 4, "lunch lunch lunch", None)
+    save_body_sqlite(db_path, 1, "lunch", None)
+
+    # newest two matches (4, 3) are ranked; 2 and 1 follow newest first
+    assert _ids(db_path, "lunch") == [3, 4, 2, 1]
+    assert _ids(db_path, "lunch", limit=2, offset=1) == [4, 2]
+    assert _ids(db_path, "lunch", limit=5, offset=3) == [1]
@@ -0,0 +1,126 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from message_hub.services.message_actions import (
+    clear_seen_pending_sqlite,
+    get_message_sqlite,
+    mark_read_sqlite,
+)
+from message_hub.storage.db import DatabaseConfig, make_engine, make_session_factory
+from message_hub.storage.migrations import ensure_schema
+from message_hub.storage.sqlite_conn import SqliteConnectionManager, connection_manager
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(DatabaseConfig(db_path=tmp_path / "conn.sqlite"))
+    ensure_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO accounts (id, provider, email, created_at) "
+                "VALUES (1, 'imap', 'a@x', '2024-01-01')"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO folders (id, account_id, provider_folder_id, name) "
+                "VALUES (1, 1, 'INBOX', 'INBOX')"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO messages"
+                " (id, account_id, folder_id, provider_msg_id, is_read, created_at) "
+                "VALUES (1, 1, 1, '1', 0, '2024-01-01')"
+            )
+        )
+    yield engine
+    engine.dispose()
+
+
+def _db_path(engine):
+    return engine.url.database
+
+
+def test_pragmas_applied_to_engine_and_manager(engine):
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+
+    mgr = SqliteConnectionManager(_db_path(engine))
+    reader = mgr.read()
+    assert reader.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert reader.execute("PRAGMA mmap_size").fetchone()[0] > 0
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("UPDATE messages SET is_read = 1")  # readers are query_only
+    mgr.close()
+
+
+def test_connections_are_reused(engine):
+    mgr = SqliteConnectionManager(_db_path(engine))
+    assert mgr.read() is mgr.read()
+    with mgr.write() as w1:
+        pass
+    with mgr.write() as w2:
+        pass
+    assert w1 is w2
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(mgr.read()))
+    t.start()
+    t.join()
+    assert other[0] is not mgr.read()
+    assert mgr.opened == 3
+    mgr.close()
+
+
+def test_reader_is_closed_when_its_thread_ends(engine):
+    mgr = SqliteConnectionManager(_db_path(engine))
+    readers = []
+    for _ in range(3):
+        t = threading.Thread(target=lambda: readers.append(mgr.read()))
+        t.start()
+        t.join()
+    assert mgr._readers == set()
+    with pytest.raises(sqlite3.ProgrammingError):
+        readers[0].execute("SELECT 1")
+    mgr.close()
+
+
+def test_writer_rolls_back_on_error(engine):
+    mgr = SqliteConnectionManager(_db_path(engine))
+    with pytest.raises(ValueError):
+        with mgr.write() as conn:
+            conn.execute("UPDATE messages SET is_read = 1 WHERE id = 1")
+            raise ValueError("boom")
+    assert mgr.read().execute("SELECT is_read FROM messages WHERE id = 1").fetchone()[0] == 0
+    mgr.close()
+
+
+def test_readers_are_not_blocked_by_an_open_sync_transaction(engine):
+    path = _db_path(engine)
+    with make_session_factory(engine)() as session:
+        session.execute(text("UPDATE messages SET subject = 'pending' WHERE id = 1"))
+        # the sync writer holds its write transaction open; the UI still reads the last commit
+        msg = get_message_sqlite(path, 1)
+        assert msg.subject is None
+        session.commit()
+
+    mark_read_sqlite(path, 1)
+    msg = get_message_sqlite(path, 1)
+    assert msg.subject == "pending" and msg.is_read == 1
+    connection_manager(path).close()
+
+
+def test_local_read_stays_pending_until_the_server_has_it(engine):
+    path = _db_path(engine)
+    pending = "SELECT is_read, seen_pending FROM messages WHERE id = 1"
+    mark_read_sqlite(path, 1)
+    assert tuple(connection_manager(path).read().execute(pending).fetchone()) == (1, 1)
+    clear_seen_pending_sqlite(path, [1])
+    assert tuple(connection_manager(path).read().execute(pending).fetchone()) == (1, 0)
+    connection_manager(path).close()
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from message_hub.connectors.imap_connector import ImapAccountConfig
+from message_hub.services.sync_scheduler import SyncScheduler
+
+
+def _cfg(email):
+    return ImapAccountConfig(host="imap.example.com", email=email, password="x")
+
+
+def test_accounts_sync_concurrently_and_failures_are_isolated():
+    def sync(cfg):
+        if cfg.email == "bad@x":
+            raise RuntimeError("login failed")
+        time.sleep(0.2)
+        return {"fetched": 2, "inserted": 1, "skipped": 1, "inserted_ids": [cfg.email]}
+
+    sched = SyncScheduler(sync_fn=sync, max_concurrency=4)
+    accounts = [_cfg("a@x"), _cfg("b@x"), _cfg("c@x"), _cfg("bad@x")]
+    t0 = time.monotonic()
+    total = sched.run_once(accounts)
+    elapsed = time.monotonic() - t0
+    sched.shutdown()
+
+    assert elapsed < 0.5  # ~ the slowest account, not the sum (0.6s)
+    assert total["inserted"] == 3
+    assert sorted(total["inserted_ids"]) == ["a@x", "b@x", "c@x"]
+    assert total["failed"] == ["bad@x"]
+    assert total["accounts"]["bad@x"]["ok"] is False
+
+
+def test_failing_account_backs_off_until_forced():
+    calls = []
+
+    def sync(cfg):
+        calls.append(cfg.email)
+        raise RuntimeError("down")
+
+    sched = SyncScheduler(sync_fn=sync, backoff_base=60.0)
+    sched.run_once([_cfg("a@x")])
+    second = sched.run_once([_cfg("a@x")])
+    assert calls == ["a@x"]
+    assert second["backed_off"] == ["a@x"]
+    assert 40 < sched.backoff_state()["a@x"]["retry_in"] <= 72
+
+    sched.run_once([_cfg("a@x")], force=True)
+    assert calls == ["a@x", "a@x"]
+    assert sched.backoff_state()["a@x"]["failures"] == 2
+    sched.shutdown()
+
+
+def test_hanging_account_times_out_without_blocking_others():
+    release = threading.Event()
+
+    def sync(cfg):
+        if cfg.email == "slow@x":
+            release.wait(5)
+        return {"inserted": 1}
+
+    sched = SyncScheduler(sync_fn=sync, timeout=0.2)
+    t0 = time.monotonic()
+    total = sched.run_once([_cfg("slow@x"), _cfg("fast@x")])
+    assert time.monotonic() - t0 < 1.0
+    assert total["timed_out"] == ["slow@x"]
+    assert total["inserted"] == 1
+
+    # still running: not resubmitted on the next tick
+    again = sched.run_once([_cfg("slow@x")], force=True)
+    assert again["accounts"] == {}
+    release.set()
+    sched.shutdown(wait=True)
+
+
+def test_queued_accounts_time_out_behind_hung_workers():
+    release = threading.Event()
+    calls = []
+
+    def sync(cfg):
+        calls.append(cfg.email)
+        if cfg.email == "hung@x":
+            release.wait(5)
+        return {"inserted": 1}
+
+    sched = SyncScheduler(sync_fn=sync, max_concurrency=1, timeout=0.2)
+    t0 = time.monotonic()
+    total = sched.run_once([_cfg("hung@x"), _cfg("queued@x")])
+    assert time.monotonic() - t0 < 1.0
+    assert sorted(total["timed_out"]) == ["hung@x", "queued@x"]
+    assert total["accounts"]["queued@x"]["error"] == "timeout (queued)"
+    assert "queued@x" not in sched.backoff_state()
+
+    # the cancelled account is free to go again once a worker is
+    release.set()
+    assert sched.run_once([_cfg("queued@x")])["inserted"] == 1
+    assert calls == ["hung@x", "queued@x"]
+    sched.shutdown(wait=True)
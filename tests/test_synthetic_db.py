@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from message_hub.services.message_actions import get_message_sqlite
+from message_hub.services.message_repo import get_latest_messages_sqlite, get_thread_messages_sqlite
+from message_hub.services.search import search_messages_sqlite
+from message_hub.storage.sqlite_conn import connection_manager
+from message_hub.testing.synthetic_db import StoreProfile, populate_store
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    paths = []
+
+    def _make(name="store.sqlite", messages=300, **kw):
+        path = tmp_path / name
+        paths.append(path)
+        return path, populate_store(path, messages, **kw)
+
+    yield _make
+    for path in paths:
+        connection_manager(path).close()
+
+
+def test_store_counts_and_layout(make_store):
+    path, stats = make_store(profile=StoreProfile(accounts=2, body_ratio=0.5))
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM folders").fetchone()[0] == stats["folders"] == 8
+        assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 300
+        assert conn.execute("SELECT COUNT(*) FROM message_bodies").fetchone()[0] == stats["bodies"]
+        unread = conn.execute("SELECT SUM(is_read = 0) FROM messages").fetchone()[0]
+        assert unread == stats["unread"]
+        assert conn.execute("SELECT COUNT(*) FROM thread_map").fetchone()[0] == 300
+    assert 100 < stats["bodies"] < 200
+
+
+def test_rows_read_back_like_synced_ones(make_store):
+    path, _ = make_store()
+    latest = get_latest_messages_sqlite(path, limit=10)
+    assert [m.id for m in latest] == list(range(300, 290, -1))  # newest last in, like a sync
+    assert all(m.snippet and m.thread_id for m in latest)
+
+    thread = get_thread_messages_sqlite(path, latest[0].account_id, latest[0].thread_id)
+    assert thread[-1].id == latest[0].id
+    assert thread[0].subject == thread[-1].subject.removeprefix("Re: ")
+
+    with sqlite3.connect(path) as conn:
+        mid = conn.execute("SELECT message_id FROM message_bodies LIMIT 1").fetchone()[0]
+    msg = get_message_sqlite(path, mid)
+    assert msg.has_body and msg.body_text
+
+
+def test_bodies_are_searchable_and_triggers_restored(make_store):
+    path, _ = make_store()
+    with sqlite3.connect(path) as conn:
+        mid = conn.execute("SELECT message_id FROM message_bodies LIMIT 1").fetchone()[0]
+        word = get_message_sqlite(path, mid).body_text.split()[-1]
+    assert mid in {m.id for m in search_messages_sqlite(path, word, limit=500)}
+
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "INSERT INTO messages"
+            " (account_id, folder_id, provider_msg_id, subject, is_read, created_at) "
+            "VALUES (1, 1, 'new', 'Zanzibar', 0, '2024')"
+        )
+    assert [m.subject for m in search_messages_sqlite(path, "zanzibar")] == ["Zanzibar"]
+
+
+def test_deterministic_and_refuses_a_filled_store(make_store):
+    a, _ = make_store("a.sqlite", messages=50, seed=7)
+    b, _ = make_store("b.sqlite", messages=50, seed=7)
+    dump = (
+        "SELECT provider_msg_id, subject, from_addr, snippet, date_utc, is_read"
+        " FROM messages ORDER BY id"
+    )
+    with sqlite3.connect(a) as ca, sqlite3.connect(b) as cb:
+        assert ca.execute(dump).fetchall() == cb.execute(dump).fetchall()
+
+    with pytest.raises(ValueError):
+        populate_store(a, 10)